@@ -6,7 +6,8 @@ def main(args):
 	# to run the software three parameters are required:
 	#
 	# (i) the first specifies the real machine where to execute the algorithm
-	#     choose the solver from the available ones in the client_config.conf file
+	#     choose the solver from the available ones in the client_config.conf file, or 'local' to execute the
+	#     QPU modes offline on the local stand-in sampler
 	#
 	# (ii) the second specifies the kind of execution that we want to test
 	#      choose the mode by looking in the qltsp interface
@@ -1,22 +1,58 @@
+import os
+
 from preprocessing.preprocess import Preprocessing
 from quantum_annealing.hamiltonian_builder import HamiltonianBuilder
+from quantum_annealing.qubo_builder import QuboBuilder
+from quantum_annealing.qubo_cache import QuboCache
+from quantum_annealing.model_builder import ModelBuilder
+from quantum_annealing.encoding import VariableEncoding
 from quantum_annealing.SA_model import SA_Model
+from quantum_annealing.samplers import get_qpu_sampler
+from quantum_annealing.Tour_SA_model import Tour_SA_Model
 from quantum_annealing.Hybrid_model import Hybrid_Model
+from quantum_annealing.hybrid_decomposition import write_trace
 from quantum_annealing.results.results_visualizer import *
 from quantum_annealing.performance.time_performance import TimingPerformance
+from quantum_annealing.performance.sa_benchmark import benchmark_samplers
 from quantum_annealing.tuning.chain_strength_tuning import tune_chain_strength
 from quantum_annealing.tuning.anneal_schedule_tuning import *
+from quantum_annealing.tuning.joint_tuning import tune_joint
+from quantum_annealing.tuning.abc_calibration import calibrate_norm_dict
 from model.graph import TSP_Graph
 from dataset.parse_experiments import *
 from quantum_annealing.results.results_writer import *
 from quantum_annealing.results.results_analyzer import *
-from model.embedding import Embedding
+from quantum_annealing.postprocessing import PostProcessor
+
+# repair the infeasible samples and polish the tours of the final solves with a local search, the repaired tours are
+# attached to the results next to the raw samples, which are the ones measured by the tuning
+postprocess_samples = False
+postprocess_workers = 8
+
+# simulated annealing shards its reads across sa_workers processes, one for each core of the machine by default, None
+# executes it on a single core, while a fixed sa_seed makes its results reproducible
+sa_workers = os.cpu_count()
+sa_seed = None
+# 'neal' anneals the sparse BQM, 'dense' and 'tempering' anneal batches of replicas on the dense QUBO matrix, the latter
+# with parallel tempering, they are suited for the small problems up to n = 14
+sa_sampler = 'neal'
+
+# the normalization factors are calibrated from the durations and the charges of the instance instead of being parsed
+# from the experiments.json file, they are always calibrated for the experiments without norm_factors
+calibrate_norm_factors = False
+# execution modes that run on the QPU, whose h and J ranges bound the calibration
+qpu_modes = [1, 3, 5, 7]
+
+# round trip latency in seconds simulated by the 'local' profile for each job, so that the concurrent sweeps of the
+# tuning can be exercised offline
+local_latency = 0.0
 
 
 def init_model(solver, exp_name):
     client_conf = {
         'config_path': get_config_path(),
-        'profile': solver
+        'profile': solver,
+        'latency': local_latency
     }
     experiments = parse_experiments()
     exp = get_exp_by_name(experiments, exp_name)
@@ -88,6 +124,7 @@ def con_tuning(model, exp, client_conf):
     # tuning = 1 -> do only chain tuning
     # tuning = 2 -> do only annealing tuning
     # tuning = 3 -> do not do tuning
+    # tuning = 4 -> do chain and annealing jointly with the surrogate model
     tuning = 0
     if tuning == 0:
         chain_strength = chain_tuning(model, init_chain, num_nodes, client_conf)
@@ -101,30 +138,94 @@ def con_tuning(model, exp, client_conf):
     elif tuning == 3:
         chain_strength = init_chain
         schedule = None
+    elif tuning == 4:
+        chain_strength, schedule = tune_joint(model, num_nodes)
     else:
         raise Exception('Wrong Tuning Configuration')
 
     return chain_strength, schedule
 
 
-def build_hamiltonian(distance_matrix, charge_array, norm_dict):
-    hamiltonian_complete = HamiltonianBuilder(distance_matrix, charge_array)
-    hamiltonian = hamiltonian_complete.get_hamiltonian(norm_dict)
+def build_hamiltonian(distance_matrix, charge_array, norm_dict=None, fixed_start=None, adjacency=None, vectorized=True,
+                      use_cache=True):
+    # without a normalization dict the factors are calibrated on the instance
+    if norm_dict is None:
+        norm_dict = calibrate_norm_dict(distance_matrix, charge_array, fixed_start, adjacency)
+
+    # the symmetry reduction and the pruning of missing edges are available only for the vectorized builder
+    if (fixed_start is not None or adjacency is not None) and not vectorized:
+        raise Exception('Fixed start symmetry reduction and edge pruning require the vectorized QUBO builder')
+
+    # the vectorized builder emits directly the BQM, the pyqubo one the expression to be compiled by the ModelBuilder
+    def build():
+        if vectorized:
+            return QuboBuilder(distance_matrix, charge_array, fixed_start, adjacency).get_bqm(norm_dict)
+
+        hamiltonian_complete = HamiltonianBuilder(distance_matrix, charge_array)
+        return hamiltonian_complete.get_hamiltonian(norm_dict)
+
+    # BQMs are labelled with the integer encoding, pyqubo hamiltonians are relabelled once compiled by the ModelBuilder
+    if not use_cache:
+        encoding = VariableEncoding(distance_matrix.shape[0], fixed_start) if vectorized else None
+        return build(), encoding
+
+    # on a miss the compiled BQM is stored, so that the next executions of the same experiment skip the build
+    cache = QuboCache()
+    hamiltonian = cache.get_bqm(distance_matrix, charge_array, norm_dict,
+                                lambda: build() if vectorized else ModelBuilder(build()).BQM,
+                                {'fixed_start': fixed_start,
+                                 'adjacency': None if adjacency is None else adjacency.tolist(),
+                                 'labels': 'index'})
+    cache.report()
+
+    return hamiltonian, VariableEncoding(distance_matrix.shape[0], fixed_start)
+
+
+def get_norm_dict(exp, distance_matrix, charge_array, fixed_start, adjacency, client_conf, mode):
+    if exp.norm_factors is not None and not calibrate_norm_factors:
+        return exp.norm_factors
 
-    return hamiltonian
+    # on the QPU the calibration uses the h and J ranges of the solver shared by the QPU models, otherwise the ones of
+    # the Advantage systems
+    properties = None
+    if mode in qpu_modes:
+        properties = get_qpu_sampler(client_conf).properties
 
+    return calibrate_norm_dict(distance_matrix, charge_array, fixed_start, adjacency, properties)
 
-def simulated_annealing(hamiltonian, exp):
-    sa_model = SA_Model(hamiltonian)
+
+def init_instance(model, instance):
+    # once the instance is set every result is evaluated on it and, if enabled, its samples are post-processed
+    if instance is not None:
+        model.set_instance(*instance)
+
+        if postprocess_samples:
+            model.set_postprocessor(PostProcessor(*instance, num_workers=postprocess_workers))
+
+
+def simulated_annealing(hamiltonian, exp, encoding=None, instance=None):
+    sa_model = SA_Model(hamiltonian, encoding, sa_workers, sa_seed, sa_sampler)
+    init_instance(sa_model, instance)
     sa_result = sa_model.solve(exp.sa_experiment.num_reads, exp.sa_experiment.chain_strength, exp.label,
                                do_print=True)
 
     return sa_result
 
 
-def real_annealing(hamiltonian, exp, client_conf):
+def tour_annealing(hamiltonian, exp, encoding=None, instance=None):
+    # classical baseline annealing directly over the tours, every read is a feasible tour
+    tour_model = Tour_SA_Model(hamiltonian, encoding, seed=sa_seed)
+    init_instance(tour_model, instance)
+    tour_result = tour_model.solve(exp.sa_experiment.num_reads, exp.sa_experiment.chain_strength, exp.label,
+                                   do_print=True)
+
+    return tour_result
+
+
+def real_annealing(hamiltonian, exp, client_conf, encoding=None, instance=None):
     hybrid_sampler = False
-    qpu_model = QPU_Model(hamiltonian, client_conf, get_embedding(), hybrid_sampler)
+    qpu_model = QPU_Model(hamiltonian, client_conf, get_embedding(), hybrid_sampler, encoding)
+    init_instance(qpu_model, instance)
 
     tuned_chain, tuned_schedule = con_tuning(qpu_model, exp, client_conf)
     if tuned_schedule is not None:
@@ -146,13 +247,14 @@ def real_annealing(hamiltonian, exp, client_conf):
         anneal_range = qpu_model.get_sampler_properties("annealing_time_range")
         slope = get_annealing_slope(anneal_range)
 
-        # print number of qubits used and min,max chain lengths
-        embedding = Embedding(qpu_model.BQM, client_conf)
-        emb_graph = embedding.embedding
-        qubits_num = qubits_number(emb_graph)
-        min_chain_length, max_chain_length = chain_lengths(emb_graph)
-        print("Minor Embedding requires {}".format(qubits_num))
-        print("Minor Embedding has chains whose length is between {}-{}".format(min_chain_length, max_chain_length))
+        # print number of qubits used and min,max chain lengths of the embedding used by the solve
+        emb_graph = qpu_model.get_embedding(qpu_result.response)
+        if emb_graph is not None:
+            qubits_num = qubits_number(emb_graph)
+            min_chain_length, max_chain_length = chain_lengths(emb_graph)
+            print("Minor Embedding requires {}".format(qubits_num))
+            print("Minor Embedding has chains whose length is between {}-{}".format(min_chain_length,
+                                                                                     max_chain_length))
 
         # visualize the result on the qpu by using the inspector provided by dwave
         embedding_inspector(qpu_result)
@@ -160,9 +262,10 @@ def real_annealing(hamiltonian, exp, client_conf):
     return qpu_result
 
 
-def best_qpu(hamiltonian, exp, client_conf):
+def best_qpu(hamiltonian, exp, client_conf, encoding=None, instance=None):
     hybrid_sampler = False
-    qpu_model = QPU_Model(hamiltonian, client_conf, get_embedding(), hybrid_sampler)
+    qpu_model = QPU_Model(hamiltonian, client_conf, get_embedding(), hybrid_sampler, encoding)
+    init_instance(qpu_model, instance)
 
     # get best chain and schedule from results csv
     best_chain, best_schedule = get_best_parameters(exp.num_nodes)
@@ -175,12 +278,12 @@ def best_qpu(hamiltonian, exp, client_conf):
     return qpu_result
 
 
-def best_hybrid(hamiltonian, exp, client_conf):
+def best_hybrid(hamiltonian, exp, client_conf, encoding=None, instance=None):
     # todo: implement if necessary
     return 0
 
 
-def hybrid_annealing(hamiltonian, exp, client_conf):
+def hybrid_annealing(hamiltonian, exp, client_conf, encoding=None, instance=None):
     qpu_parameters_dict = {
         'chain_strength': exp.qpu_experiment.chain_strength,
         # 'anneal_schedule': [[0.0, 0.0], [60.0, 0.4], [140.0, 0.4], [230.0, 1.0]],
@@ -194,15 +297,26 @@ def hybrid_annealing(hamiltonian, exp, client_conf):
         'sa_reads': exp.sa_experiment.num_reads,
         'qpu_reads': exp.qpu_experiment.num_reads,
         'qpu_params': qpu_parameters_dict,
-        'max_subproblem_size': 50   # 50 is the default value, 196 is 14*14 the maximum we were able to embed
+        'max_subproblem_size': 50,   # 50 is the default value, 196 is 14*14 the maximum we were able to embed
+        # 'local' decomposes the BQM offline, 'kerberos' executes the KerberosSampler on the QPU of the client
+        'workflow': 'local',
+        'decomposition': 'energy',   # 'energy' impact or tour 'segment'
+        'subsolver': 'sa',   # 'sa', 'tabu' or 'qpu'
+        'num_subproblems': 4,
+        'subproblem_reads': 100,
+        'num_workers': 4,
+        'pool': 'thread'
     }
 
     # build hybrid model and set its parameters
-    hybrid_model = Hybrid_Model(hamiltonian, client_conf)
+    hybrid_model = Hybrid_Model(hamiltonian, client_conf, encoding)
+    init_instance(hybrid_model, instance)
     hybrid_model.set_parameters(hybrid_parameters_dict)
 
     # once the hybrid model is built we execute it
     hybrid_result = hybrid_model.solve_hybrid(True)
+    if 'trace' in hybrid_result.response.info:
+        write_trace(hybrid_result.response.info['trace'], exp.num_nodes, exp.label)
 
     return hybrid_result
 
@@ -216,11 +330,27 @@ def qltsp(solver, mode, exp_name):
     total_inspection_time, distance_matrix = model.get_qubo_D(normalization)
     charge_array = model.get_charges_Q(normalization)
 
-    # pre-tuning
-    norm_dict = exp.norm_factors
+    # pin a depot node at position 0 to remove the rotational symmetry of the tours, n-1 nodes are then enough to
+    # encode the problem in a (n-1)x(n-1) QUBO, None keeps the complete one
+    fixed_start = None
+
+    # missing edges are encoded in the instances with a large distance, by setting it here they are pruned from the
+    # QUBO and penalized as constraints instead of being weighted as durations, None keeps them weighted. The threshold
+    # is in the time unit of the instance, hence it is compared with the durations before the normalization
+    missing_distance = None
+    adjacency = None
+    if missing_distance is not None:
+        _, raw_distance_matrix = model.get_qubo_D(False)
+        adjacency = QuboBuilder.get_adjacency(raw_distance_matrix, missing_distance)
+
+    # pre-tuning, the normalization factors of the experiment or the calibrated ones
+    norm_dict = get_norm_dict(exp, distance_matrix, charge_array, fixed_start, adjacency, client_conf, mode)
 
     # build the hamiltonian
-    hamiltonian = build_hamiltonian(distance_matrix, charge_array, norm_dict)
+    hamiltonian, encoding = build_hamiltonian(distance_matrix, charge_array, norm_dict, fixed_start, adjacency)
+
+    # the instance is used to evaluate every decoded tour on the real durations and charges
+    instance = (distance_matrix, charge_array, norm_dict, adjacency)
 
     # Execution Modes:
     # 0 -> Simulated Annealing
@@ -232,52 +362,66 @@ def qltsp(solver, mode, exp_name):
     # 6 -> Best Hybrid
     # 7 -> Simulated-Best QPU
     # 8 -> Simulated-Best Hybrid
+    # 9 -> Tour-Simulated
+    # 10 -> Simulated Annealing Benchmark
     if mode == 0:
-        sa_result = simulated_annealing(hamiltonian, exp)
+        sa_result = simulated_annealing(hamiltonian, exp, encoding, instance)
         sa_solution = sa_result.get_solution()
     elif mode == 1:
-        qpu_result = real_annealing(hamiltonian, exp, client_conf)
+        qpu_result = real_annealing(hamiltonian, exp, client_conf, encoding, instance)
         qpu_solution = qpu_result.get_solution()
     elif mode == 2:
-        hybrid_result = hybrid_annealing(hamiltonian, exp, client_conf)
+        hybrid_result = hybrid_annealing(hamiltonian, exp, client_conf, encoding, instance)
         hybrid_solution = hybrid_result.get_solution()
     elif mode == 3:
-        sa_result = simulated_annealing(hamiltonian, exp)
-        qpu_result = real_annealing(hamiltonian, exp, client_conf)
+        sa_result = simulated_annealing(hamiltonian, exp, encoding, instance)
+        qpu_result = real_annealing(hamiltonian, exp, client_conf, encoding, instance)
 
         sa_solution = sa_result.get_solution()
         qpu_solution = qpu_result.get_solution()
 
         histogram_energies(sa_result.response, qpu_result.response)
     elif mode == 4:
-        sa_result = simulated_annealing(hamiltonian, exp)
-        hybrid_result = hybrid_annealing(hamiltonian, exp, client_conf)
+        sa_result = simulated_annealing(hamiltonian, exp, encoding, instance)
+        hybrid_result = hybrid_annealing(hamiltonian, exp, client_conf, encoding, instance)
 
         sa_solution = sa_result.get_solution()
         hybrid_solution = hybrid_result.get_solution()
 
         histogram_energies(sa_result.response, hybrid_result.response)
     elif mode == 5:
-        best_result = best_qpu(hamiltonian, exp, client_conf)
+        best_result = best_qpu(hamiltonian, exp, client_conf, encoding, instance)
         best_solution = best_result.get_solution()
     elif mode == 6:
-        best_result = best_hybrid(hamiltonian, exp, client_conf)
+        best_result = best_hybrid(hamiltonian, exp, client_conf, encoding, instance)
         best_solution = best_result.get_solution()
     elif mode == 7:
-        sa_result = simulated_annealing(hamiltonian, exp)
-        best_qpu_result = best_qpu(hamiltonian, exp, client_conf)
+        sa_result = simulated_annealing(hamiltonian, exp, encoding, instance)
+        best_qpu_result = best_qpu(hamiltonian, exp, client_conf, encoding, instance)
 
         sa_solution = sa_result.get_solution()
         best_solution = best_qpu_result.get_solution()
 
         histogram_energies(sa_result.response, best_qpu_result.response)
     elif mode == 8:
-        sa_result = simulated_annealing(hamiltonian, exp)
-        best_hybrid_result = best_hybrid(hamiltonian, exp, client_conf)
+        sa_result = simulated_annealing(hamiltonian, exp, encoding, instance)
+        best_hybrid_result = best_hybrid(hamiltonian, exp, client_conf, encoding, instance)
 
         sa_solution = sa_result.get_solution()
         best_solution = best_hybrid_result.get_solution()
 
         histogram_energies(sa_result.response, best_hybrid_result.response)
+    elif mode == 9:
+        sa_result = simulated_annealing(hamiltonian, exp, encoding, instance)
+        tour_result = tour_annealing(hamiltonian, exp, encoding, instance)
+
+        sa_solution = sa_result.get_solution()
+        tour_solution = tour_result.get_solution()
+
+        histogram_energies(sa_result.response, tour_result.response)
+    elif mode == 10:
+        benchmark_df = benchmark_samplers(hamiltonian, encoding, exp.num_nodes, exp.sa_experiment.num_reads,
+                                          seed=sa_seed)
+        print(benchmark_df)
     else:
         raise Exception('Wrong Execution Mode')
@@ -7,25 +7,54 @@ As far as we can understand from the documentation there are two ways of doing h
 
 To check this we should first try to execute the algorithm directly on the hybrid machine and then mix it with the
 Kerberos sampler.
+
+Since the Kerberos sampler needs a live DWaveSampler, the 'local' workflow executes instead the decomposition of
+LocalHybridRunner, which can be run and profiled offline with any of its subsolvers.
 """
 
 from src.code.quantum_annealing.model_builder import ModelBuilder
-from src.code.quantum_annealing.results.result import Result
-from dwave.system.samplers import DWaveSampler
-from hybrid.reference.kerberos import KerberosSampler
+from src.code.quantum_annealing.samplers import get_qpu_sampler
+from src.code.quantum_annealing.hybrid_decomposition import LocalHybridRunner
 
 
 class Hybrid_Model(ModelBuilder):
     hybrid_parameters = None
+    qpu_sampler = None
 
-    def __init__(self, hamiltonian, client_conf):
-        super(Hybrid_Model, self).__init__(hamiltonian)
-        self.qpu_sampler = DWaveSampler(config_file=client_conf['config_path'], profile=client_conf['profile'])
+    def __init__(self, hamiltonian, client_conf, encoding=None):
+        super(Hybrid_Model, self).__init__(hamiltonian, encoding)
+        self.client_conf = client_conf
 
     def set_parameters(self, params_dict):
         self.hybrid_parameters = params_dict
 
-    def solve_hybrid(self, do_print):
+    def __get_qpu_sampler(self):
+        # the QPU is reached only by the kerberos workflow, the local one builds it only for its qpu subsolver
+        if self.qpu_sampler is None:
+            self.qpu_sampler = get_qpu_sampler(self.client_conf)
+
+        return self.qpu_sampler
+
+    def __solve_local(self):
+        params = self.hybrid_parameters
+        runner = LocalHybridRunner(self.BQM, self.encoding,
+                                   decomposition=params.get('decomposition', 'energy'),
+                                   subsolver=params.get('subsolver', 'sa'),
+                                   client_conf=self.client_conf,
+                                   max_subproblem_size=params['max_subproblem_size'],
+                                   num_subproblems=params.get('num_subproblems', 4),
+                                   subproblem_reads=params.get('subproblem_reads', 100),
+                                   num_workers=params.get('num_workers', 4),
+                                   pool=params.get('pool', 'thread'),
+                                   max_iter=params['max_iter'],
+                                   convergence=params['convergence'])
+
+        return runner.sample(params['hybrid_num_reads'], params['qpu_params']['label'])
+
+    def __solve_kerberos(self):
+        # imported here so that the local workflow does not need dwave-hybrid
+        from hybrid.reference.kerberos import KerberosSampler
+
         sampler = KerberosSampler()
         h_response = sampler.sample(self.BQM,
                                     init_sample=None,
@@ -34,9 +63,17 @@ class Hybrid_Model(ModelBuilder):
                                     convergence=self.hybrid_parameters['convergence'],
                                     sa_reads=self.hybrid_parameters['sa_reads'],
                                     qpu_reads=self.hybrid_parameters['qpu_reads'],
-                                    qpu_sampler=self.qpu_sampler,
+                                    qpu_sampler=self.__get_qpu_sampler(),
                                     qpu_params=self.hybrid_parameters['qpu_params'])
 
-        h_result = Result(h_response, do_print=do_print)
+        return h_response
+
+    def solve_hybrid(self, do_print):
+        if self.hybrid_parameters.get('workflow', 'local') == 'local':
+            h_response = self.__solve_local()
+        else:
+            h_response = self.__solve_kerberos()
+
+        h_result = self.build_result(h_response, do_print, postprocess=True)
 
         return h_result
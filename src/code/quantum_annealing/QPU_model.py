@@ -1,21 +1,21 @@
-from dwave.system.samplers import DWaveSampler
-from dwave.system.samplers import LeapHybridSampler
 from dwave.system.composites import AutoEmbeddingComposite, EmbeddingComposite
 
+from src.code.quantum_annealing.embedding_store import get_embedding_store
 from src.code.quantum_annealing.model_builder import ModelBuilder
-from src.code.quantum_annealing.results.result import Result
+from src.code.quantum_annealing.samplers import get_hybrid_sampler, get_qpu_sampler
 
 
 class QPU_Model(ModelBuilder):
     anneal_schedule = None
+    embedded_sampler = None
 
-    def __init__(self, hamiltonian, client_conf, emb_name, hybrid):
-        super(QPU_Model, self).__init__(hamiltonian)
+    def __init__(self, hamiltonian, client_conf, emb_name, hybrid, encoding=None):
+        super(QPU_Model, self).__init__(hamiltonian, encoding)
         self.hybrid = hybrid
         if hybrid:
-            self.sampler = LeapHybridSampler(config_file=client_conf['config_path'], profile=client_conf['profile'])
+            self.sampler = get_hybrid_sampler(client_conf)
         else:
-            self.sampler = DWaveSampler(config_file=client_conf['config_path'], profile=client_conf['profile'])
+            self.sampler = get_qpu_sampler(client_conf)
         self.emb_name = emb_name
 
     def __build_embedding(self, emb_name):
@@ -26,26 +26,54 @@ class QPU_Model(ModelBuilder):
                 return AutoEmbeddingComposite(self.sampler)
             elif emb_name == 'composite':
                 return EmbeddingComposite(self.sampler)
+            elif emb_name == 'fixed':
+                return get_embedding_store().get_composite(self.BQM, self.sampler, self.encoding)
             else:
                 print("Wrong Embedding Name, provide a correct one")
 
-    def __execute_model(self, num_reads, chain_strength, label):
-        embedding = self.__build_embedding(self.emb_name)
+    def get_embedded_sampler(self):
+        # the embedded sampler is built once and shared by all the executions of the model
+        if self.embedded_sampler is None:
+            self.embedded_sampler = self.__build_embedding(self.emb_name)
+
+        return self.embedded_sampler
+
+    def get_embedding(self, response=None):
+        # only the fixed composite samples on the stored embedding, the other ones find a new embedding at every sample
+        # and the one they used is read from the response, None when it is not known
+        if self.hybrid:
+            return None
+        if self.emb_name == 'fixed':
+            return get_embedding_store().get_embedding(self.BQM, self.sampler, self.encoding)
+        if response is not None and 'embedding_context' in response.info:
+            return response.info['embedding_context']['embedding']
+
+        return None
+
+    def __execute_model(self, num_reads, chain_strength, label, return_embedding=False):
+        embedding = self.get_embedded_sampler()
 
         if self.hybrid:
             return embedding.sample(self.BQM)
         else:
+            parameters = {'num_reads': num_reads, 'chain_strength': chain_strength, 'label': label}
             if self.anneal_schedule is not None:
-                return embedding.sample(self.BQM, num_reads=num_reads, chain_strength=chain_strength, label=label,
-                                        anneal_schedule=self.anneal_schedule)
-            else:
-                return embedding.sample(self.BQM, num_reads=num_reads, chain_strength=chain_strength, label=label)
+                parameters['anneal_schedule'] = self.anneal_schedule
+            if return_embedding:
+                parameters['return_embedding'] = True
+
+            return embedding.sample(self.BQM, **parameters)
+
+    def sample(self, num_reads, chain_strength, label):
+        # raw response of the solver, used by the tuning sweeps that build the results on their own
+        return self.__execute_model(num_reads, chain_strength, label)
 
     def solve(self, num_reads, chain_strength, label, do_print):
-        qpu_response = self.__execute_model(num_reads, chain_strength, label)
+        # the response of the final solve carries the embedding used by the composite, so that it can be reported
+        qpu_response = self.__execute_model(num_reads, chain_strength, label, return_embedding=True)
 
         # once we have the responses we can build the result class and visualize the solution
-        qpu_result = Result(qpu_response, do_print=do_print)
+        qpu_result = self.build_result(qpu_response, do_print, postprocess=True)
 
         return qpu_result
 
@@ -1,22 +1,59 @@
+import time
+
+import dimod
 from neal import SimulatedAnnealingSampler
 
 from src.code.quantum_annealing.model_builder import ModelBuilder
-from src.code.quantum_annealing.results.result import Result
+from src.code.quantum_annealing.parallel_sa import sample_parallel
+from src.code.quantum_annealing.dense_annealing import DenseAnnealer
+
+sa_samplers = ['neal', 'dense', 'tempering']
 
 
 class SA_Model(ModelBuilder):
-    def __init__(self, hamiltonian):
-        super(SA_Model, self).__init__(hamiltonian)
+    def __init__(self, hamiltonian, encoding=None, num_workers=None, seed=None, sampler='neal'):
+        super(SA_Model, self).__init__(hamiltonian, encoding)
+        if sampler not in sa_samplers:
+            raise Exception('Wrong Simulated Annealing sampler')
+
+        # with workers the reads are sharded across a process pool, a single worker samples the same shards in process
+        self.num_workers = num_workers
+        self.seed = seed
+        # neal anneals the sparse BQM, dense and tempering run the replicas on the dense QUBO matrix
+        self.sampler = sampler
+
+    def __execute_dense(self, num_reads, label):
+        annealer = DenseAnnealer(self.BQM, seed=self.seed)
+
+        start = time.perf_counter_ns()
+        samples = annealer.anneal(num_reads) if self.sampler == 'dense' else annealer.temper(num_reads)
+        sampling_time = time.perf_counter_ns() - start
+
+        info = {'timing': {'sampling_ns': sampling_time}, 'problem_label': label}
+
+        return dimod.SampleSet.from_samples_bqm((samples, annealer.variables), self.BQM, info=info)
 
     def __execute_model(self, num_reads, chain_strength, label):
+        if self.sampler != 'neal':
+            return self.__execute_dense(num_reads, label)
+
+        if self.num_workers is not None:
+            return sample_parallel(self.BQM, num_reads, self.num_workers, self.seed, chain_strength=chain_strength,
+                                   label=label)
+
         sampler = SimulatedAnnealingSampler()
 
-        return sampler.sample(self.BQM, num_reads=num_reads, chain_strength=chain_strength, label=label)
+        return sampler.sample(self.BQM, num_reads=num_reads, chain_strength=chain_strength, label=label,
+                              seed=self.seed)
+
+    def sample(self, num_reads, chain_strength, label):
+        # raw response of the sampler, used by the benchmarks that time the samplers alone
+        return self.__execute_model(num_reads, chain_strength, label)
 
     def solve(self, num_reads, chain_strength, label, do_print):
         sa_response = self.__execute_model(num_reads, chain_strength, label)
 
         # once we have the responses we can build the result class and visualize the solution
-        sa_result = Result(sa_response, do_print=do_print)
+        sa_result = self.build_result(sa_response, do_print, postprocess=True)
 
         return sa_result
@@ -0,0 +1,41 @@
+import time
+
+import dimod
+
+from src.code.quantum_annealing.model_builder import ModelBuilder
+from src.code.quantum_annealing.tour_annealing import TourAnnealer, default_num_sweeps
+
+
+class Tour_SA_Model(ModelBuilder):
+    def __init__(self, hamiltonian, encoding=None, num_sweeps=default_num_sweeps, seed=None):
+        super(Tour_SA_Model, self).__init__(hamiltonian, encoding)
+        self.num_sweeps = num_sweeps
+        self.seed = seed
+
+    def __execute_model(self, num_reads, chain_strength, label):
+        # the annealing is executed over the tours, hence it needs the instance and not only the BQM
+        if self.instance is None:
+            raise Exception('Instance not provided for the annealing over the tours')
+
+        D_matrix, Q_array, norm_dict, adjacency = self.instance
+        annealer = TourAnnealer(D_matrix, Q_array, norm_dict, self.encoding.fixed_start, adjacency, self.num_sweeps,
+                                self.seed)
+
+        start = time.perf_counter_ns()
+        tours, _ = annealer.anneal(num_reads)
+        sampling_time = time.perf_counter_ns() - start
+
+        # tours are encoded as samples of the BQM, so that the response is the same of the other models
+        variables = list(self.BQM.variables)
+        samples = self.encoding.encode_tours(tours, variables)
+        info = {'timing': {'sampling_ns': sampling_time}, 'problem_label': label}
+
+        return dimod.SampleSet.from_samples_bqm((samples, variables), self.BQM, info=info)
+
+    def solve(self, num_reads, chain_strength, label, do_print):
+        tour_response = self.__execute_model(num_reads, chain_strength, label)
+
+        # once we have the responses we can build the result class and visualize the solution
+        tour_result = self.build_result(tour_response, do_print, postprocess=True)
+
+        return tour_result
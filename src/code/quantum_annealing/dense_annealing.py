@@ -0,0 +1,146 @@
+"""
+Simulated annealing and parallel tempering on the dense QUBO matrix. Up to n = 14 the QUBO has at most ~200 variables,
+hence its couplings fit a dense symmetric matrix J and many replicas can be annealed at once as the rows of a
+(replicas x variables) matrix X of binary states:
+    (i) the local fields F = h + X J of all the replicas are computed with a single matrix product, and the energy
+        change of flipping the variable i is (1 - 2 x_i) * F_i
+    (ii) the variables are colored so that no two variables of the same color are coupled, and a Metropolis sweep visits
+         the colors: all the variables of a color are flipped at once in all the replicas, since their fields do not
+         depend on each other, and the fields are updated with a (replicas x color) x (color x variables) product.
+         The one-hot QUBO of n nodes needs about 2n colors, hence a sweep is about 2n array operations and not n^2
+    (iii) with parallel tempering every chain is made of num_temperatures replicas at fixed inverse temperatures, and
+          after each sweep the states of adjacent temperatures are exchanged with the replica-exchange acceptance
+
+The read returned for each replica, or for each chain with parallel tempering, is the lowest energy state it visited.
+"""
+
+import numpy as np
+
+default_num_sweeps = 1000
+default_num_temperatures = 16
+batch_size = 1024
+
+
+def get_dense_qubo(bqm):
+    # linear vector and symmetric coupling matrix with zero diagonal, in the order of the variables of the BQM
+    linear, (rows, cols, quadratic), offset = bqm.to_numpy_vectors(variable_order=list(bqm.variables))
+    J = np.zeros((len(linear), len(linear)))
+    np.add.at(J, (rows, cols), quadratic)
+
+    return linear.astype(float), J + J.T, offset
+
+
+def get_beta_range(h, J):
+    # the hottest temperature flips the variable with the largest field half of the times, the coldest one flips the
+    # one with the smallest non zero field once in a hundred
+    fields = np.abs(h) + np.abs(J).sum(axis=1)
+    coefficients = np.abs(np.concatenate([h, J[np.triu_indices(len(h), 1)]]))
+    coefficients = coefficients[coefficients > 0]
+    if len(coefficients) == 0:
+        return 0.1, 1.0
+
+    return np.log(2) / fields.max(), np.log(100) / coefficients.min()
+
+
+def get_colors(J):
+    # greedy coloring of the coupling graph, the variables of the same color form an independent set
+    coupled = J != 0
+    colors = np.full(len(J), -1)
+    for i in np.argsort(-coupled.sum(axis=1), kind='stable'):
+        used = set(colors[coupled[i] & (colors >= 0)])
+        colors[i] = next(c for c in range(len(J)) if c not in used)
+
+    return [np.flatnonzero(colors == c) for c in range(colors.max() + 1)]
+
+
+class DenseAnnealer(object):
+    def __init__(self, bqm, num_sweeps=default_num_sweeps, beta_range=None, seed=None):
+        self.variables = list(bqm.variables)
+        self.h, self.J, self.offset = get_dense_qubo(bqm)
+        self.num_sweeps = num_sweeps
+        self.colors = get_colors(self.J)
+        self.beta_range = beta_range if beta_range is not None else get_beta_range(self.h, self.J)
+        self.rng = np.random.default_rng(seed)
+
+    def get_energies(self, X):
+        return X @ self.h + 0.5 * np.einsum('ri,ri->r', X @ self.J, X) + self.offset
+
+    def __sweep(self, X, F, betas):
+        # returns the energy change of every replica, so that the energies never need to be computed again
+        num_replicas, num_variables = X.shape
+        log_uniform = np.log(self.rng.random((num_replicas, num_variables)))
+        betas = np.reshape(betas, (-1, 1))
+        changes = np.zeros(num_replicas)
+
+        for color in self.colors:
+            # the variables of a color are not coupled, hence their fields do not change flipping each other
+            deltas = (1 - 2 * X[:, color]) * F[:, color]
+            accepted = log_uniform[:, color] < -betas * deltas
+
+            flips = np.where(accepted, 1 - 2 * X[:, color], 0.0)
+            X[:, color] += flips
+            F += flips @ self.J[color, :]
+            changes += np.where(accepted, deltas, 0.0).sum(axis=1)
+
+        return changes
+
+    def __init_states(self, num_replicas):
+        X = self.rng.integers(0, 2, (num_replicas, len(self.variables))).astype(float)
+
+        return X, self.h + X @ self.J
+
+    def anneal(self, num_reads):
+        # simulated annealing, every replica follows the same geometric schedule of inverse temperatures
+        samples = []
+        for start in range(0, num_reads, batch_size):
+            X, F = self.__init_states(min(batch_size, num_reads - start))
+            energies = self.get_energies(X)
+            best, best_energies = X.copy(), energies.copy()
+
+            for beta in np.geomspace(*self.beta_range, self.num_sweeps):
+                energies += self.__sweep(X, F, beta)
+
+                improved = energies < best_energies
+                best[improved], best_energies[improved] = X[improved], energies[improved]
+
+            samples.append(best)
+
+        return np.vstack(samples).astype(np.int8)
+
+    def temper(self, num_reads, num_temperatures=default_num_temperatures):
+        # parallel tempering, the replica (c, t) of the chain c runs at the t-th inverse temperature
+        betas = np.geomspace(*self.beta_range, num_temperatures)
+        chains_per_batch = max(1, batch_size // num_temperatures)
+
+        samples = []
+        for start in range(0, num_reads, chains_per_batch):
+            num_chains = min(chains_per_batch, num_reads - start)
+            X, F = self.__init_states(num_chains * num_temperatures)
+            replica_betas = np.tile(betas, num_chains)
+            energies = self.get_energies(X)
+            best, best_energies = X.copy(), energies.copy()
+
+            for sweep in range(self.num_sweeps):
+                energies += self.__sweep(X, F, replica_betas)
+
+                improved = energies < best_energies
+                best[improved], best_energies[improved] = X[improved], energies[improved]
+
+                # exchanges between the temperatures (t, t + 1), alternating even and odd couples at each sweep
+                lower = np.arange(sweep % 2, num_temperatures - 1, 2)
+                lower = (np.arange(num_chains)[:, None] * num_temperatures + lower[None, :]).ravel()
+                upper = lower + 1
+                log_acceptance = (replica_betas[lower] - replica_betas[upper]) * (energies[lower] - energies[upper])
+                exchanged = self.rng.random(len(lower)) < np.exp(np.minimum(0.0, log_acceptance))
+                lower, upper = lower[exchanged], upper[exchanged]
+
+                X[lower], X[upper] = X[upper], X[lower].copy()
+                F[lower], F[upper] = F[upper], F[lower].copy()
+                energies[lower], energies[upper] = energies[upper], energies[lower].copy()
+
+            # the read of each chain is the lowest energy state visited by any of its replicas
+            best_energies = best_energies.reshape(num_chains, num_temperatures)
+            chain_best = best_energies.argmin(axis=1) + np.arange(num_chains) * num_temperatures
+            samples.append(best[chain_best])
+
+        return np.vstack(samples).astype(np.int8)
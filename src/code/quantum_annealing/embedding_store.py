@@ -0,0 +1,157 @@
+"""
+Persistent store of the minor embeddings. Finding an embedding with minorminer is the most expensive step of the
+preparation of a QPU execution, while the same interaction graph is embedded over and over: in every solve of the model,
+in every point of the tuning sweeps and again when the chain lengths are reported. Hence embeddings are computed once
+and shared:
+    (i) an embedding is identified by the hash of the interaction graph of the BQM and by the target topology, that is
+        the graph of working qubits and couplers of the solver
+    (ii) on a miss num_attempts minorminer runs with different seeds are executed in parallel and the best embedding is
+         kept, the one with the shortest maximum chain and then with the lowest number of qubits
+    (iii) embeddings are saved as json files, and a stored embedding is checked against the current target graph before
+          being reused, since the working graph of a solver may change over time
+
+When the encoding of the BQM is known the structured embeddings of the grid of variables are tried first, and the
+heuristic search is executed only when none of them fits the solver.
+
+The embedded sampler is then a FixedEmbeddingComposite, so that no other embedding is computed while sampling.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import minorminer
+from dwave.embedding import is_valid_embedding
+from dwave.system.composites import FixedEmbeddingComposite
+
+from src.code.quantum_annealing.structured_embedding import EmbeddingLibrary
+
+embedding_path = '../resources/cache/embedding/'
+num_attempts = 8
+
+
+def find_embedding(source_edges, target_edges, seed):
+    return minorminer.find_embedding(source_edges, target_edges, random_seed=seed)
+
+
+def get_embedding_score(embedding):
+    # embeddings are compared on the longest chain first and then on the number of qubits used
+    chain_lengths = [len(chain) for chain in embedding.values()]
+
+    return max(chain_lengths), sum(chain_lengths)
+
+
+class EmbeddingStore(object):
+    def __init__(self, path=embedding_path, attempts=num_attempts, num_workers=None):
+        self.path = path
+        self.attempts = attempts
+        self.num_workers = num_workers
+        self.embeddings = {}
+        self.library = EmbeddingLibrary()
+
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def get_source_edges(bqm):
+        return sorted(tuple(sorted(edge)) for edge in bqm.quadratic)
+
+    @staticmethod
+    def get_key(source_edges, sampler):
+        key_hash = hashlib.sha256()
+        key_hash.update(json.dumps(source_edges).encode())
+
+        target_hash = hashlib.sha256()
+        target_hash.update(json.dumps(sampler.properties.get('topology'), sort_keys=True).encode())
+        target_hash.update(json.dumps(sorted(sampler.edgelist)).encode())
+
+        return key_hash.hexdigest()[:32] + '_' + target_hash.hexdigest()[:16]
+
+    def __file_path(self, key):
+        return os.path.join(self.path, key + '.json')
+
+    def __load(self, key, variables):
+        file_path = self.__file_path(key)
+        if not os.path.exists(file_path):
+            return None
+
+        # json keys are strings, the labels of the BQM are restored through their string representation
+        with open(file_path) as embedding_file:
+            stored = json.load(embedding_file)
+        labels = {str(v): v for v in variables}
+
+        return {labels[v]: chain for v, chain in stored.items() if v in labels}
+
+    def __store(self, key, embedding):
+        with open(self.__file_path(key), 'w') as embedding_file:
+            json.dump({str(v): [int(q) for q in chain] for v, chain in embedding.items()}, embedding_file)
+
+    def __compute(self, source_edges, target_edges):
+        seeds = list(range(self.attempts))
+        num_workers = max(1, min(self.num_workers or self.attempts, self.attempts))
+
+        if num_workers == 1:
+            embeddings = [find_embedding(source_edges, target_edges, seed) for seed in seeds]
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                embeddings = list(executor.map(find_embedding, [source_edges] * len(seeds),
+                                               [target_edges] * len(seeds), seeds))
+
+        # minorminer returns an empty dict when it fails to find an embedding
+        embeddings = [embedding for embedding in embeddings if embedding]
+        if not embeddings:
+            raise Exception('No minor embedding found in {} attempts'.format(self.attempts))
+
+        return min(embeddings, key=get_embedding_score)
+
+    def __get_structured(self, bqm, sampler, encoding):
+        if encoding is None:
+            return None
+
+        embedding = self.library.get_embedding(encoding, sampler)
+        if embedding is None:
+            return None
+
+        # the grid embedding covers every variable of the encoding, only the ones of the BQM are kept
+        return {v: embedding[v] for v in bqm.variables if v in embedding}
+
+    def get_embedding(self, bqm, sampler, encoding=None):
+        source_edges = self.get_source_edges(bqm)
+        key = self.get_key(source_edges, sampler)
+
+        if key in self.embeddings:
+            return self.embeddings[key]
+
+        embedding = self.__get_structured(bqm, sampler, encoding)
+        if embedding is None:
+            embedding = self.__load(key, bqm.variables)
+        target_edges = sampler.edgelist
+        if embedding is None or not is_valid_embedding(embedding, source_edges, target_edges):
+            embedding = self.__compute(source_edges, target_edges)
+            self.__store(key, embedding)
+
+        # isolated variables have no couplings, each of them is assigned to a free qubit
+        used = set(q for chain in embedding.values() for q in chain)
+        free = (q for q in sampler.nodelist if q not in used)
+        for v in bqm.variables:
+            if v not in embedding:
+                embedding[v] = [next(free)]
+
+        self.embeddings[key] = embedding
+
+        return embedding
+
+    def get_composite(self, bqm, sampler, encoding=None):
+        return FixedEmbeddingComposite(sampler, self.get_embedding(bqm, sampler, encoding))
+
+
+# embeddings are shared by all the models of the same process
+embedding_store = None
+
+
+def get_embedding_store():
+    global embedding_store
+    if embedding_store is None:
+        embedding_store = EmbeddingStore()
+
+    return embedding_store
@@ -0,0 +1,52 @@
+"""
+Integer encoding of the variables of the LTSP QUBO. The variable meaning "node v is visited at position j" is labelled
+with the index v * n + j, so that BQMs and samples can be handled as NumPy arrays and the index <-> (node, position)
+map is a vectorized divmod. The pyqubo string labels 'x[v][j]' are produced only when a human-readable dump is needed.
+
+When the QUBO is built with the fixed start symmetry reduction the depot is pinned at position 0 and its variable is
+not part of the BQM, fixed_start keeps track of it so that samples can be lifted back to complete tours.
+"""
+
+import numpy as np
+
+
+class VariableEncoding(object):
+    def __init__(self, n, fixed_start=None):
+        self.n = n
+        self.fixed_start = fixed_start
+
+    def index(self, node, position):
+        return np.asarray(node) * self.n + np.asarray(position)
+
+    def node_position(self, index):
+        return np.divmod(np.asarray(index), self.n)
+
+    def encode_tours(self, tours, variables):
+        # one-hot samples of the tours on the given variables, tours[r][j] is the node visited at position j
+        nodes, positions = self.node_position(np.asarray(variables))
+
+        return (np.asarray(tours)[:, positions] == nodes).astype(np.int8)
+
+    def label(self, index):
+        nodes, positions = self.node_position(np.atleast_1d(index))
+
+        return ['x[{}][{}]'.format(v, j) for v, j in zip(nodes, positions)]
+
+    @staticmethod
+    def parse_label(label):
+        x = label.replace(']', '').split('[')
+
+        return int(x[1]), int(x[2])
+
+    @classmethod
+    def from_labels(cls, labels, fixed_start=None):
+        # the size of the problem is given by the positions, some variables may have been removed from the QUBO
+        positions = [cls.parse_label(label)[1] for label in labels]
+
+        return cls(max(positions) + 1, fixed_start)
+
+    def relabel(self, bqm):
+        # translate the pyqubo labels of a BQM in the integer ones
+        mapping = {label: int(self.index(*self.parse_label(label))) for label in bqm.variables}
+
+        return bqm.relabel_variables(mapping, inplace=False)
@@ -0,0 +1,188 @@
+"""
+Local hybrid workflow, executed without the Leap-bound KerberosSampler. Starting from the best state found by a short
+simulated annealing of the whole BQM, every iteration:
+    (i) decomposes the BQM in disjoint subproblems of at most max_subproblem_size variables, either by energy impact,
+        taking the variables whose flip lowers the energy the most, or by tour segments, taking all the variables of
+        contiguous positions of the tour. When an iteration does not improve the energy the windows roll over the
+        ranking or the positions, so that the next one works on different variables
+    (ii) conditions each subproblem on the current values of the other variables and solves it with the subsolver,
+         simulated annealing, tabu search or the local stand-in of the QPU, all the subproblems at once in a thread or
+         process pool
+    (iii) merges the best sample of each subproblem in the state whenever it lowers the energy of the whole BQM, the
+          energy change is evaluated exactly on the current state, hence the merged subproblems can interact
+
+The workflow stops after max_iter iterations or when the energy did not improve for convergence iterations. The energy
+and the time spent decomposing, solving and merging are recorded for each iteration in info['trace'].
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import dimod
+import numpy as np
+import pandas as pd
+from neal import SimulatedAnnealingSampler
+from dwave.system import EmbeddingComposite
+
+from src.code.quantum_annealing.dense_annealing import get_dense_qubo
+from src.code.quantum_annealing.samplers import get_qpu_sampler
+
+decompositions = ['energy', 'segment']
+trace_columns = ['Read', 'Iteration', 'Energy', 'Subproblems', 'Merged', 'Decompose Time', 'Solve Time', 'Merge Time']
+
+
+def sample_sa(bqm, num_reads, seed, client_conf):
+    return SimulatedAnnealingSampler().sample(bqm, num_reads=num_reads, seed=seed)
+
+
+def sample_tabu(bqm, num_reads, seed, client_conf):
+    from dwave.samplers import TabuSampler
+
+    return TabuSampler().sample(bqm, num_reads=num_reads, seed=seed)
+
+
+def sample_qpu(bqm, num_reads, seed, client_conf):
+    # the subproblems change at every iteration, hence they are embedded on the fly and not stored
+    return EmbeddingComposite(get_qpu_sampler(client_conf)).sample(bqm, num_reads=num_reads)
+
+
+subsolvers = {
+    'sa': sample_sa,
+    'tabu': sample_tabu,
+    'qpu': sample_qpu
+}
+
+
+def solve_subproblem(subsolver, linear, quadratic, num_reads, seed, client_conf):
+    # the subproblem is shipped as arrays, labelled 0..k-1, and the best sample is returned
+    bqm = dimod.BinaryQuadraticModel(linear, np.triu(quadratic, 1), 0.0, dimod.BINARY)
+    sample = subsolvers.get(subsolver, subsolver)(bqm, num_reads, seed, client_conf).first.sample
+
+    return np.array([sample[i] for i in range(len(linear))], dtype=float)
+
+
+def write_trace(trace_df, num_nodes, label):
+    file_path = '../resources/performance/hybrid/' + str(num_nodes) + '/hybrid_trace_' + label + '.csv'
+    trace_df.to_csv(file_path, index=False)
+
+
+class LocalHybridRunner(object):
+    def __init__(self, bqm, encoding=None, decomposition='energy', subsolver='sa', client_conf=None,
+                 max_subproblem_size=50, num_subproblems=4, subproblem_reads=100, num_workers=4, pool='thread',
+                 max_iter=100, convergence=3, init_reads=100, seed=None):
+        if decomposition not in decompositions:
+            raise Exception('Wrong Decomposition for the hybrid workflow')
+        if decomposition == 'segment' and encoding is None:
+            raise Exception('Variable encoding not provided for the decomposition by tour segments')
+        if subsolver == 'qpu' and client_conf is None:
+            raise Exception('Client configuration not provided for the QPU subsolver')
+
+        self.bqm = bqm
+        self.variables = list(bqm.variables)
+        self.h, self.J, self.offset = get_dense_qubo(bqm)
+        self.encoding = encoding
+        self.decomposition = decomposition
+        self.subsolver = subsolver
+        self.client_conf = client_conf
+        self.max_subproblem_size = min(max_subproblem_size, len(self.variables))
+        self.num_subproblems = num_subproblems
+        self.subproblem_reads = subproblem_reads
+        self.num_workers = num_workers
+        self.pool = pool
+        self.max_iter = max_iter
+        self.convergence = convergence
+        self.init_reads = init_reads
+        self.rng = np.random.default_rng(seed)
+
+    def __get_seed(self):
+        return int(self.rng.integers(0, 2 ** 31 - 1))
+
+    def __energy_subproblems(self, x, fields, roll):
+        # variables ranked by the energy change of their flip, the windows start further down when the energy stalls
+        deltas = (1 - 2 * x) * fields
+        ranking = np.roll(np.argsort(deltas, kind='stable'), -roll * self.max_subproblem_size * self.num_subproblems)
+        size = self.max_subproblem_size
+
+        return [ranking[i * size:(i + 1) * size] for i in range(self.num_subproblems) if i * size < len(ranking)]
+
+    def __segment_subproblems(self, roll):
+        # windows of contiguous positions, as many as fit in max_subproblem_size, shifted by one position at each stall
+        n = self.encoding.n
+        _, positions = self.encoding.node_position(np.asarray(self.variables))
+        width = max(1, self.max_subproblem_size // max(1, int(np.bincount(positions).max())))
+
+        shifted = (positions - roll) % n
+        windows = [np.flatnonzero(shifted // width == w) for w in range(-(-n // width))]
+
+        return [window for window in windows if len(window) > 0]
+
+    def __solve(self, executor, x, fields, subproblems):
+        futures = []
+        for subproblem in subproblems:
+            # the fields of the subproblem without the couplings among its own variables
+            quadratic = self.J[np.ix_(subproblem, subproblem)]
+            linear = fields[subproblem] - quadratic @ x[subproblem]
+            futures.append(executor.submit(solve_subproblem, self.subsolver, linear, quadratic, self.subproblem_reads,
+                                           self.__get_seed(), self.client_conf))
+
+        return [future.result() for future in futures]
+
+    def __merge(self, x, fields, subproblems, samples):
+        merged = 0
+        for subproblem, sample in zip(subproblems, samples):
+            # exact energy change of replacing the subproblem with its sample on the current state
+            change = sample - x[subproblem]
+            delta = change @ fields[subproblem] + 0.5 * change @ self.J[np.ix_(subproblem, subproblem)] @ change
+            if delta < 0:
+                x[subproblem] = sample
+                fields += change @ self.J[subproblem, :]
+                merged += 1
+
+        return merged
+
+    def __get_energy(self, x):
+        return x @ self.h + 0.5 * x @ self.J @ x + self.offset
+
+    def __run(self, executor, read, trace):
+        init = SimulatedAnnealingSampler().sample(self.bqm, num_reads=self.init_reads, seed=self.__get_seed()).first
+        x = np.array([init.sample[v] for v in self.variables], dtype=float)
+        fields = self.h + self.J @ x
+        energy, stalls = self.__get_energy(x), 0
+
+        for iteration in range(self.max_iter):
+            start = time.perf_counter_ns()
+            if self.decomposition == 'energy':
+                subproblems = self.__energy_subproblems(x, fields, stalls)
+            else:
+                subproblems = self.__segment_subproblems(stalls)
+            decomposed = time.perf_counter_ns()
+
+            samples = self.__solve(executor, x, fields, subproblems)
+            solved = time.perf_counter_ns()
+
+            merged = self.__merge(x, fields, subproblems, samples)
+            new_energy = self.__get_energy(x)
+            trace.append([read, iteration, new_energy, len(subproblems), merged, decomposed - start,
+                          solved - decomposed, time.perf_counter_ns() - solved])
+
+            stalls = stalls + 1 if new_energy >= energy - 1e-9 else 0
+            energy = new_energy
+            if stalls >= self.convergence:
+                break
+
+        return x
+
+    def sample(self, num_reads=1, label=None):
+        executor_class = ProcessPoolExecutor if self.pool == 'process' else ThreadPoolExecutor
+        trace = []
+
+        start = time.perf_counter_ns()
+        with executor_class(max_workers=self.num_workers) as executor:
+            samples = [self.__run(executor, read, trace) for read in range(num_reads)]
+        wall_time = time.perf_counter_ns() - start
+
+        info = {'timing': {'wall_ns': wall_time}, 'problem_label': label,
+                'trace': pd.DataFrame(trace, columns=trace_columns)}
+
+        return dimod.SampleSet.from_samples_bqm((np.array(samples, dtype=np.int8), self.variables), self.bqm,
+                                                info=info)
@@ -0,0 +1,136 @@
+"""
+Local stand-in of the QPU used to run the whole QPU and tuning pipeline offline. The sampler is structured on a
+Chimera or Pegasus graph built with dwave_networkx and exposes the same properties of the D-Wave solvers that are read
+by the software (annealing_time_range, max_anneal_schedule_points, h_range, j_range, ...), hence it can be wrapped in
+the embedding composites exactly as the DWaveSampler.
+
+Samples are obtained with classical simulated annealing, whose number of sweeps grows with the annealing time given by
+annealing_time or anneal_schedule, and each response carries a synthetic info['timing'] dict with the same keys of the
+QPU one so that TimingPerformance can consume it. An optional latency simulates the round trip of a remote job.
+"""
+
+import time
+
+import dimod
+import dwave_networkx as dnx
+import numpy as np
+from neal import SimulatedAnnealingSampler
+
+default_annealing_time = 20.0   # μs
+sweeps_per_microsecond = 10
+
+
+class LocalQPUSampler(dimod.Sampler, dimod.Structured):
+    def __init__(self, topology='pegasus', size=16, latency=0.0, seed=None):
+        if topology == 'pegasus':
+            graph = dnx.pegasus_graph(size)
+        elif topology == 'chimera':
+            graph = dnx.chimera_graph(size)
+        else:
+            raise Exception('Wrong Topology for the local sampler')
+
+        self.latency = latency
+        self.seed = seed
+        self.__nodelist = sorted(graph.nodes)
+        self.__edgelist = sorted(tuple(sorted(edge)) for edge in graph.edges)
+        self.__properties = {
+            'chip_id': 'local_' + topology,
+            'topology': {'type': topology, 'shape': [size] if topology == 'pegasus' else [size, size, 4]},
+            'qubits': self.__nodelist,
+            'couplers': [list(edge) for edge in self.__edgelist],
+            'annealing_time_range': [0.5, 2000.0],
+            'default_annealing_time': default_annealing_time,
+            'max_anneal_schedule_points': 12,
+            'h_range': [-4.0, 4.0],
+            'j_range': [-1.0, 1.0],
+            'extended_j_range': [-2.0, 1.0],
+            'num_reads_range': [1, 10000],
+            'problem_run_duration_range': [0.0, 1000000.0],
+            'default_programming_thermalization': 1000.0,
+            'default_readout_thermalization': 0.0
+        }
+        self.__parameters = {
+            'num_reads': ['num_reads_range'],
+            'annealing_time': ['annealing_time_range'],
+            'anneal_schedule': ['max_anneal_schedule_points'],
+            'answer_mode': [],
+            'label': [],
+            'num_spin_reversal_transforms': [],
+            'auto_scale': [],
+            'warnings': []
+        }
+
+    @property
+    def nodelist(self):
+        return self.__nodelist
+
+    @property
+    def edgelist(self):
+        return self.__edgelist
+
+    @property
+    def properties(self):
+        return self.__properties
+
+    @property
+    def parameters(self):
+        return self.__parameters
+
+    def __get_annealing_time(self, annealing_time, anneal_schedule):
+        if anneal_schedule is not None:
+            if len(anneal_schedule) > self.__properties['max_anneal_schedule_points']:
+                raise ValueError('Anneal schedule exceeds max_anneal_schedule_points')
+            if anneal_schedule[0][0] != 0.0 or anneal_schedule[0][1] != 0.0 or anneal_schedule[-1][1] != 1.0:
+                raise ValueError('Anneal schedule must start at (0, 0) and end with s = 1')
+
+            annealing_time = anneal_schedule[-1][0]
+        elif annealing_time is None:
+            annealing_time = default_annealing_time
+
+        low, high = self.__properties['annealing_time_range']
+        if not low <= annealing_time <= high:
+            raise ValueError('Annealing time {} outside annealing_time_range'.format(annealing_time))
+
+        return annealing_time
+
+    def __get_timing(self, num_reads, annealing_time):
+        # synthetic timings in μs shaped as the ones returned by the QPU
+        readout_time = 120.0
+        delay_time = 20.0
+        programming_time = 15000.0
+        sampling_time = num_reads * (annealing_time + readout_time + delay_time)
+
+        return {
+            'qpu_sampling_time': sampling_time,
+            'qpu_anneal_time_per_sample': annealing_time,
+            'qpu_readout_time_per_sample': readout_time,
+            'qpu_access_time': sampling_time + programming_time,
+            'qpu_access_overhead_time': 0.0,
+            'qpu_programming_time': programming_time,
+            'qpu_delay_time_per_sample': delay_time,
+            'total_post_processing_time': 0.0,
+            'post_processing_overhead_time': 0.0
+        }
+
+    def sample(self, bqm, num_reads=1, annealing_time=None, anneal_schedule=None, answer_mode='histogram', label=None,
+               **parameters):
+        # as on the QPU the problem must fit the hardware graph
+        nodes = set(self.__nodelist)
+        edges = set(self.__edgelist)
+        if any(v not in nodes for v in bqm.variables) or \
+                any(tuple(sorted((u, v))) not in edges for u, v in bqm.quadratic):
+            raise ValueError('Problem graph incompatible with the {} topology'.format(self.__properties['topology']))
+
+        annealing_time = self.__get_annealing_time(annealing_time, anneal_schedule)
+        num_sweeps = max(10, int(annealing_time * sweeps_per_microsecond))
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        response = SimulatedAnnealingSampler().sample(bqm, num_reads=num_reads, num_sweeps=num_sweeps, seed=self.seed)
+        if answer_mode == 'histogram':
+            response = response.aggregate()
+
+        info = {'timing': self.__get_timing(num_reads, annealing_time), 'problem_label': label}
+
+        return dimod.SampleSet(response.record, response.variables, info, response.vartype)
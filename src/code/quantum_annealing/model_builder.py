@@ -1,22 +1,72 @@
 import dimod
 
+from src.code.quantum_annealing.encoding import VariableEncoding
+from src.code.quantum_annealing.results.result import Result
+from src.code.quantum_annealing.results.held_karp import OptimumCache
+
 
 class ModelBuilder(object):
     model = None
+    instance = None
+    optimum = None
+    postprocessor = None
 
-    def __init__(self, hamiltonian):
+    def __init__(self, hamiltonian, encoding=None):
+        # the encoding maps the integer labels of the BQM to (node, position), it is required for the BQMs emitted by
+        # the QuboBuilder while for pyqubo hamiltonians it is derived from the compiled labels
         self.hamiltonian = hamiltonian
+        self.encoding = encoding
         self.qubo, self.BQM = self.__build_model()
 
     def __build_model(self):
+        # the QuboBuilder already emits the BQM, hence there is nothing to compile
+        if isinstance(self.hamiltonian, dimod.BinaryQuadraticModel):
+            if self.encoding is None:
+                raise Exception('Variable encoding not provided for the BQM')
+
+            qubo, _ = self.hamiltonian.to_qubo()
+
+            return qubo, self.hamiltonian
+
         self.model = self.hamiltonian.compile()
         qubo, _ = self.model.to_qubo()
 
-        # build the BQM from the qubo
+        # build the BQM from the qubo and move from the pyqubo labels to the integer ones
         BQM = dimod.BinaryQuadraticModel.from_qubo(qubo)
+        if self.encoding is None:
+            self.encoding = VariableEncoding.from_labels(BQM.variables)
+        BQM = self.encoding.relabel(BQM)
+        qubo, _ = BQM.to_qubo()
 
         return qubo, BQM
 
+    def set_instance(self, D_matrix, Q_array, norm_dict, adjacency=None):
+        # once the instance is known every result is also evaluated on the real LTSP objective
+        self.instance = (D_matrix, Q_array, norm_dict, adjacency)
+
+        # the exact optimum is the ground truth for the optimality gap and the success probability of the results
+        fixed_start = self.encoding.fixed_start if self.encoding is not None else None
+        optimum = OptimumCache().get_optimum(D_matrix, Q_array, norm_dict, fixed_start, adjacency)
+        self.optimum = optimum['cost'] if optimum is not None else None
+
+    def set_postprocessor(self, postprocessor):
+        # the postprocessor repairs and polishes the samples of the final solves, never those of the tuning
+        self.postprocessor = postprocessor
+
+    def build_result(self, response, do_print, postprocess=False):
+        result = Result(response, do_print=do_print, encoding=self.encoding)
+        if self.instance is not None:
+            result.evaluate(*self.instance, optimum=self.optimum)
+
+        # the repaired tours are attached to the result, which keeps the raw response
+        if postprocess and self.postprocessor is not None:
+            result.set_repaired_tours(*self.postprocessor.process(result))
+
+        if self.instance is not None and do_print:
+            result.print_evaluation()
+
+        return result
+
     def __execute_model(self, num_reads, chain_strength, label):
         pass
 
@@ -0,0 +1,76 @@
+"""
+Simulated annealing spread across a process pool. neal executes all the reads of a job on a single core, while the
+reads are independent from each other, hence:
+    (i) num_reads is split in num_shards shards of almost the same size, each one sampled by neal with its own seed
+        generated by a SeedSequence, the shards do not depend on the number of workers, so that a fixed seed gives the
+        same result with a single worker and with a pool of any size
+    (ii) the BQM is shipped once to each worker through the initializer of the pool and not once per shard
+    (iii) the partial samplesets are concatenated in the order of the shards into a single SampleSet, whose timing
+          holds the sum of the timings of the shards and the wall time of the whole job
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import dimod
+import numpy as np
+from neal import SimulatedAnnealingSampler
+
+# reads are split in num_shards shards whatever the number of workers
+num_shards = 16
+
+worker_bqm = None
+
+
+def init_worker(bqm):
+    global worker_bqm
+    worker_bqm = bqm
+
+
+def sample_shard(num_reads, seed, parameters):
+    return SimulatedAnnealingSampler().sample(worker_bqm, num_reads=num_reads, seed=seed, **parameters)
+
+
+def split_reads(num_reads, num_shards):
+    num_shards = max(1, min(num_shards, num_reads))
+
+    return [len(shard) for shard in np.array_split(np.arange(num_reads), num_shards)]
+
+
+def get_seeds(seed, num_shards):
+    # the states of the SeedSequence are independent streams, shifted to fit the signed 32 bits seeds of neal
+    return (np.random.SeedSequence(seed).generate_state(num_shards) >> 1).tolist()
+
+
+def merge_samplesets(samplesets, wall_time):
+    response = dimod.concatenate(samplesets)
+
+    timing = {}
+    for sampleset in samplesets:
+        for key, value in sampleset.info.get('timing', {}).items():
+            timing[key] = timing.get(key, 0) + value
+    timing['wall_ns'] = wall_time
+
+    info = dict(samplesets[0].info)
+    info['timing'] = timing
+    info['num_shards'] = len(samplesets)
+
+    return dimod.SampleSet(response.record, response.variables, info, response.vartype)
+
+
+def sample_parallel(bqm, num_reads, num_workers, seed=None, **parameters):
+    shards = split_reads(num_reads, num_shards)
+    seeds = get_seeds(seed, len(shards))
+    num_workers = min(num_workers, len(shards))
+
+    start = time.perf_counter_ns()
+    if num_workers > 1:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker, initargs=(bqm,)) as executor:
+            samplesets = list(executor.map(sample_shard, shards, seeds, [parameters] * len(shards)))
+    else:
+        # a single worker samples the same shards without the overhead of the pool
+        sampler = SimulatedAnnealingSampler()
+        samplesets = [sampler.sample(bqm, num_reads=shard, seed=shard_seed, **parameters)
+                      for shard, shard_seed in zip(shards, seeds)]
+
+    return merge_samplesets(samplesets, time.perf_counter_ns() - start)
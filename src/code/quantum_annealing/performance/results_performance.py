@@ -2,9 +2,10 @@ import numpy as np
 import pandas as pd
 
 from src.code.quantum_annealing.performance.time_performance import TimingPerformance
+from src.code.quantum_annealing.tuning.abc_prescreen import rank_candidates
 
 
-def __compare_results(couple_array, file_path, perf_type):
+def __compare_results(couple_array, file_path, perf_type, objectives=None):
     """ Compares a list of results executed on the QPU
 
     Compares a list of results by checking the following properties contained in each response.
@@ -15,6 +16,17 @@ def __compare_results(couple_array, file_path, perf_type):
         4) Access time to the QPU
         5) Programming Time of the QPU
 
+    When the results have been evaluated on the instance, the rate of feasible tours and the best LTSP cost are also
+    written for each result, together with the optimality gap of the best tour and the probability of sampling an
+    optimal one when the exact optimum of the instance is known.
+
+    The number of reads of each result is written as well: when the reads were allocated adaptively, only the results
+    with the full number of reads compete for the best one, since the others are not comparable on these properties.
+
+    When the objectives minimized by the tuning are given, they are written as well and the best result is the one with
+    the lowest objective instead. The energies of different normalization dicts are not comparable either, hence the
+    evaluated results of the A, B and C tuning are ranked by feasible rate and then by the cost of their best tour.
+
     """
     results_list = couple_array[0]
     performance_list = couple_array[1]
@@ -26,12 +38,22 @@ def __compare_results(couple_array, file_path, perf_type):
         performance_key = "Chain Strength"
     elif perf_type == 'Annealing':
         performance_key = "Schedule"
+    elif perf_type == 'Joint':
+        performance_key = "Chain Strength"   # each configuration is a couple (chain strength, schedule)
     else:   # if other performance types will be needed, add them here
         print("Wrong Performance Type")
         return
 
-    columns = ["Energy", "Mean Energy", "Correct Sol Num", "QPU Access Time", "QPU Programming Time"]
+    columns = ["Energy", "Mean Energy", "Correct Sol Num", "Reads", "QPU Access Time", "QPU Programming Time"]
     columns.insert(0, performance_key)
+    if perf_type == 'Joint':
+        columns.insert(1, "Schedule")
+
+    evaluated = all(result.feasible is not None for result in results_list)
+    if evaluated:
+        columns += ["Feasible Rate", "Best Cost", "Optimality Gap", "Success Probability"]
+    if objectives is not None:
+        columns.append("Objective")
 
     performance_df = pd.DataFrame(index=range(len(results_list)), columns=columns, data=None)
 
@@ -43,6 +65,7 @@ def __compare_results(couple_array, file_path, perf_type):
         "qpu_programming_time": 1000000000,
     }
     best_index = None
+    reads = [result.occurrences.sum() for result in results_list]
 
     for i in range(len(results_list)):
         result = results_list[i]
@@ -51,7 +74,9 @@ def __compare_results(couple_array, file_path, perf_type):
         correct_solutions, _ = result.split_solution()
         time_perf = TimingPerformance('res_' + str(i), response)
 
-        if energy < comp_dict['energy']:
+        if reads[i] < max(reads):
+            pass    # discarded by the adaptive allocation of the reads, written but not ranked
+        elif energy < comp_dict['energy']:
             comp_dict['energy'] = energy
             best_index = i
         elif energy == comp_dict['energy']:
@@ -72,14 +97,32 @@ def __compare_results(couple_array, file_path, perf_type):
                             best_index = i
         # all the missing elses are: DOES NOTHING -> the best index remains the one of the previous iteration
 
-        performance_df.iloc[i] = {
+        performance_row = {
             performance_key: performance_list[i],
             "Energy": energy,
             "Mean Energy": mean_energy,
             "Correct Sol Num": len(correct_solutions),
+            "Reads": reads[i],
             "QPU Access Time": time_perf.get_time('qpu_access_time'),
             "QPU Programming Time": time_perf.get_time('qpu_programming_time')
         }
+        if perf_type == 'Joint':
+            performance_row[performance_key], performance_row["Schedule"] = performance_list[i]
+        if evaluated:
+            performance_row["Feasible Rate"] = result.get_feasible_rate()
+            performance_row["Best Cost"] = result.get_best_cost()
+            performance_row["Optimality Gap"] = result.get_optimality_gap()
+            performance_row["Success Probability"] = result.get_success_probability()
+        if objectives is not None:
+            performance_row["Objective"] = objectives[i]
+
+        performance_df.iloc[i] = performance_row
+
+    if objectives is not None:
+        best_index = int(np.argmin(objectives))
+    elif evaluated and perf_type in ['Norm_A', 'Norm_B']:
+        best_index = rank_candidates([(result.get_feasible_rate(), result.get_best_cost())
+                                      for result in results_list])[0]
 
     performance_df['Best'] = 0
     performance_df.loc[best_index, 'Best'] = 1
@@ -118,3 +161,10 @@ def anneal_comparer(results_schedules, anneal_mode, num_nodes, anneal_time, paus
         file_path += '.csv'
 
     return __compare_results(results_schedules, file_path, 'Annealing')
+
+
+def joint_comparer(results_configs, num_nodes, objectives=None):
+    file_path = '../resources/performance/joint/' + str(num_nodes) + '/FINAL_joint_tuning_' + \
+                str(len(results_configs[1])) + '.csv'
+
+    return __compare_results(results_configs, file_path, 'Joint', objectives)
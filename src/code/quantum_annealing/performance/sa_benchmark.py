@@ -0,0 +1,64 @@
+"""
+Time to target energy of the simulated annealing samplers. Every sampler is executed repeats times on the same BQM and
+for each execution:
+    (i) the success probability p is the fraction of the reads whose energy is within tolerance of the target energy,
+        which is the lowest energy found by any of the samplers unless given
+    (ii) the time to target is TTS = t * ln(1 - confidence) / ln(1 - p), the time needed to find the target at least
+         once with the given confidence by repeating executions of wall time t, infinite when the target is never found
+The median over the repeats of each sampler is written in a csv, one for each size of the problem.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.code.quantum_annealing.SA_model import SA_Model
+
+default_samplers = ['neal', 'dense', 'tempering']
+confidence = 0.99
+tolerance = 1e-6
+
+
+def get_time_to_target(wall_time, success_probability):
+    if success_probability >= 1:
+        return wall_time
+    if success_probability <= 0:
+        return np.inf
+
+    return wall_time * np.log(1 - confidence) / np.log(1 - success_probability)
+
+
+def __execute(bqm, encoding, sampler, num_reads, seed):
+    sa_model = SA_Model(bqm, encoding, seed=seed, sampler=sampler)
+
+    start = time.perf_counter()
+    response = sa_model.sample(num_reads, None, 'sa_benchmark_' + sampler)
+
+    return time.perf_counter() - start, response.record.energy
+
+
+def benchmark_samplers(bqm, encoding, num_nodes, num_reads, samplers=None, repeats=3, target_energy=None, seed=None):
+    samplers = default_samplers if samplers is None else samplers
+    seeds = np.random.SeedSequence(seed).generate_state(repeats) >> 1
+
+    runs = {sampler: [__execute(bqm, encoding, sampler, num_reads, int(s)) for s in seeds] for sampler in samplers}
+    if target_energy is None:
+        target_energy = min(energies.min() for sampler_runs in runs.values() for _, energies in sampler_runs)
+
+    columns = ["Sampler", "Target Energy", "Min Energy", "Success Probability", "Wall Time", "TTS99"]
+    benchmark_df = pd.DataFrame(index=range(len(samplers)), columns=columns, data=None)
+
+    for i, sampler in enumerate(samplers):
+        wall_times = np.array([wall_time for wall_time, _ in runs[sampler]])
+        probabilities = np.array([np.mean(energies <= target_energy + tolerance) for _, energies in runs[sampler]])
+        tts = [get_time_to_target(t, p) for t, p in zip(wall_times, probabilities)]
+
+        benchmark_df.loc[i] = [sampler, target_energy, min(energies.min() for _, energies in runs[sampler]),
+                               np.median(probabilities), np.median(wall_times), np.median(tts)]
+
+    file_path = '../resources/performance/sa_benchmark/' + str(num_nodes) + '/sa_benchmark_' + str(num_reads) + \
+                '_reads.csv'
+    benchmark_df.to_csv(file_path, index=False)
+
+    return benchmark_df
@@ -0,0 +1,140 @@
+"""
+Classical post-processing of the samples returned by the samplers. Most of the reads on 10+ nodes are not tours, even
+though many of them are one or two bit flips away from a valid one, hence once the Result of a final solve is built:
+    (i) every infeasible sample is projected on the nearest permutation, solving with the Hungarian method the
+        assignment of nodes to positions that keeps as many of its bits as possible
+    (ii) every tour is polished with a 2-opt and Or-opt local search on the LTSP objective, all the moves of a tour are
+         evaluated at once as a batch of candidate tours and the best improving one is applied until none is left
+    (iii) the polished tours and their costs are attached to the Result next to the raw response, which is left as it
+          was sampled, so that the energies and the tuning keep measuring the solver alone
+
+The local search is spread across a process pool, and the number of reads that were rescued from being infeasible is
+reported together with the polished tours.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from src.code.quantum_annealing.results.tour_evaluator import evaluate_tours, get_tour_costs
+
+
+def repair_samples(grid, fixed_start=None):
+    # the permutation closest to each reads x n x n sample is the assignment maximizing the bits kept
+    tours = np.empty(grid.shape[:2], dtype=int)
+    for r in range(grid.shape[0]):
+        weights = grid[r].astype(float)
+        if fixed_start is not None:
+            weights[fixed_start, 0] = grid.shape[1] ** 2
+
+        nodes, positions = linear_sum_assignment(weights, maximize=True)
+        tours[r, positions] = nodes
+
+    return tours
+
+
+@lru_cache(maxsize=None)
+def get_moves(n, first):
+    # index arrays of all the 2-opt and Or-opt moves, candidate = tour[move], positions before first are never moved
+    moves = []
+    for i in range(first, n - 1):
+        for k in range(i + 1, n):
+            move = np.arange(n)
+            move[i:k + 1] = move[i:k + 1][::-1]
+            moves.append(move)
+
+    for length in range(1, 4):
+        for i in range(first, n - length + 1):
+            segment = list(range(i, i + length))
+            rest = [p for p in range(n) if p not in segment]
+            for j in range(first, len(rest) + 1):
+                if j == i:
+                    continue
+                moves.append(np.array(rest[:j] + segment + rest[j:]))
+
+    return np.unique(np.array(moves), axis=0)
+
+
+def get_costs(tours, D_matrix, Q_array, norm_dict, adjacency=None):
+    valid, duration, charge_penalty = evaluate_tours(tours, D_matrix, Q_array, adjacency)
+
+    return np.where(valid, get_tour_costs(duration, charge_penalty, norm_dict), np.inf)
+
+
+def local_search(tours, D_matrix, Q_array, norm_dict, adjacency=None, fixed_start=None, max_iter=100,
+                 batch_size=256):
+    n = tours.shape[1]
+    moves = get_moves(n, 0 if fixed_start is None else 1)
+    tours = tours.copy()
+
+    # tours are polished in batches to bound the memory of the (tours x moves x n) candidates
+    for start in range(0, len(tours), batch_size):
+        batch = tours[start:start + batch_size]
+        costs = get_costs(batch, D_matrix, Q_array, norm_dict, adjacency)
+
+        for _ in range(max_iter):
+            candidates = batch[:, moves]
+            candidate_costs = get_costs(candidates.reshape(-1, n), D_matrix, Q_array, norm_dict, adjacency)
+            candidate_costs = candidate_costs.reshape(candidates.shape[:2])
+
+            best = candidate_costs.argmin(axis=1)
+            best_costs = candidate_costs[np.arange(len(batch)), best]
+            improved = best_costs < costs - 1e-12
+            if not improved.any():
+                break
+
+            batch[improved] = candidates[improved, best[improved]]
+            costs[improved] = best_costs[improved]
+
+    return tours
+
+
+class PostProcessor(object):
+    def __init__(self, D_matrix, Q_array, norm_dict, adjacency=None, num_workers=None, max_iter=100):
+        self.D_matrix = D_matrix
+        self.Q_array = Q_array
+        self.norm_dict = norm_dict
+        self.adjacency = adjacency
+        self.num_workers = num_workers
+        self.max_iter = max_iter
+        self.rescued_reads = 0
+
+    def __polish(self, tours, fixed_start):
+        # the local search is executed once for each distinct tour, spreading the tours across the process pool
+        unique_tours, inverse = np.unique(tours, axis=0, return_inverse=True)
+        chunks = np.array_split(unique_tours, max(1, min(self.num_workers or 1, len(unique_tours))))
+
+        if len(chunks) == 1:
+            polished = [local_search(chunks[0], self.D_matrix, self.Q_array, self.norm_dict, self.adjacency,
+                                     fixed_start, self.max_iter)]
+        else:
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                polished = list(executor.map(local_search, chunks,
+                                             *[[arg] * len(chunks) for arg in (self.D_matrix, self.Q_array,
+                                                                               self.norm_dict, self.adjacency,
+                                                                               fixed_start, self.max_iter)]))
+
+        return np.concatenate(polished)[inverse.ravel()]
+
+    def process(self, result):
+        # the samples of the result are read back as a reads x n x n grid, the fixed depot is already set in it
+        n = result.n
+        grid = np.unpackbits(result.packed_samples, axis=1, count=n * n).reshape(-1, n, n)
+        fixed_start = result.encoding.fixed_start
+
+        # the reads already feasible are the permutations whose tour uses only existing edges
+        feasible = result.valid & np.isfinite(get_costs(result.tours.astype(int), self.D_matrix, self.Q_array,
+                                                        self.norm_dict, self.adjacency))
+
+        tours = self.__polish(repair_samples(grid, fixed_start), fixed_start)
+        costs = get_costs(tours, self.D_matrix, self.Q_array, self.norm_dict, self.adjacency)
+
+        # a read is rescued when the polished tour is feasible while the original sample was not
+        occurrences = result.occurrences
+        self.rescued_reads = int(occurrences[np.isfinite(costs) & ~feasible].sum())
+        print("Post-processing rescued {} of {} infeasible reads".format(self.rescued_reads,
+                                                                          occurrences[~feasible].sum()))
+
+        return tours, costs, self.rescued_reads
@@ -0,0 +1,196 @@
+"""
+Vectorized counterpart of the HamiltonianBuilder. Instead of building the Hamiltonian as a pyqubo expression in nested
+loops and compiling it, the QUBO coefficients are emitted directly from D_matrix and Q_array as index/coefficient
+arrays over the (node, position) grid and handed to dimod as a BinaryQuadraticModel.
+
+The variable (v, j) meaning "node v is visited at position j" is stored and labelled with the index v * n + j of the
+VariableEncoding, the BQM has the same energies of the one obtained through ModelBuilder. As in ModelBuilder the
+constant offset of the expanded squares is dropped.
+
+Since every tour appears n times, once per rotation, a depot node can be pinned to position 0 through fixed_start. The
+variables of the depot row and of the first column are then fixed and removed, leaving a (n-1)x(n-1) QUBO whose energy
+on a sample equals the one of the complete QUBO on the lifted sample.
+
+For graphs that are not fully connected an adjacency mask can be provided. Durations and charges are then coupled only
+for the allowed (u, v, consecutive position) triples, instead of weighting missing edges with a huge distance, and the
+non-edges are enforced by the H_a3 penalty restricted to them, on the same scale of the other constraints. Together
+with the symmetry reduction, the nodes that are not connected to the depot are also eliminated from positions 1 and
+n-1.
+"""
+
+import dimod
+import numpy as np
+
+from src.code.quantum_annealing.encoding import VariableEncoding
+
+
+class QuboBuilder(object):
+    def __init__(self, D_matrix, Q_array=None, fixed_start=None, adjacency=None, non_edge_penalty=1.0):
+        self.n = D_matrix.shape[0]
+        self.D_matrix = np.asarray(D_matrix, dtype=float)
+        self.Q_array = None if Q_array is None else np.asarray(Q_array, dtype=float)
+        self.fixed_start = fixed_start
+        self.adjacency = None if adjacency is None else np.asarray(adjacency, dtype=bool)
+        self.non_edge_penalty = non_edge_penalty
+        self.encoding = VariableEncoding(self.n, fixed_start)
+
+        # value of each variable, -1 for the free ones and 0 or 1 for those fixed by the symmetry reduction
+        self.fixed = np.full(self.n * self.n, -1)
+        if fixed_start is not None:
+            self.fixed[self.__index(fixed_start, np.arange(self.n))] = 0
+            self.fixed[self.__index(np.arange(self.n), 0)] = 0
+            self.fixed[self.__index(fixed_start, 0)] = 1
+
+            # the nodes visited right after and right before the depot must be connected to it
+            if self.adjacency is not None:
+                self.fixed[self.__index(np.flatnonzero(~self.adjacency[fixed_start]), 1)] = 0
+                self.fixed[self.__index(np.flatnonzero(~self.adjacency[:, fixed_start]), self.n - 1)] = 0
+
+    @staticmethod
+    def get_adjacency(D_matrix, missing_distance):
+        # missing edges are encoded in the instances with a distance larger or equal than missing_distance
+        return np.asarray(D_matrix) < missing_distance
+
+    def __index(self, v, j):
+        return self.encoding.index(v, j)
+
+    def __build_H_A(self):
+        # for binary variables (1 - sum_j x_j)^2 = 1 - sum_j x_j + 2 * sum_{j<k} x_j x_k, hence every variable gets -1
+        # from its row constraint and -1 from its column constraint while every couple in a row or column gets 2
+        n = self.n
+        linear = np.full(n * n, -2.0)
+
+        j, k = np.triu_indices(n, 1)
+        v = np.arange(n)[:, None]
+        row_i, row_j = self.__index(v, j), self.__index(v, k)
+        col_i, col_j = self.__index(j, v), self.__index(k, v)
+
+        rows = np.concatenate([row_i.ravel(), col_i.ravel()])
+        cols = np.concatenate([row_j.ravel(), col_j.ravel()])
+        data = np.full(rows.shape[0], 2.0)
+
+        # H_a3 penalizes the couples of nodes without an edge visited at consecutive positions
+        if self.adjacency is not None and self.non_edge_penalty > 0:
+            u, v, j = self.__consecutive(n, allowed=False)
+            rows = np.concatenate([rows, self.__index(u, j)])
+            cols = np.concatenate([cols, self.__index(v, (j + 1) % n)])
+            data = np.concatenate([data, np.full(u.shape[0], float(self.non_edge_penalty))])
+
+        return linear, rows, cols, data
+
+    def __consecutive(self, num_positions, allowed=True):
+        # (u, v, j) triples with u visited at position j and v at position j + 1, when an adjacency mask is given only
+        # the allowed edges are returned, or the missing ones if allowed is False
+        n = self.n
+        u, v, j = np.meshgrid(np.arange(n), np.arange(n), np.arange(num_positions), indexing='ij')
+
+        if self.adjacency is not None:
+            edges = self.adjacency[u, v] if allowed else ~self.adjacency[u, v]
+            mask = edges & (u != v)
+            return u[mask], v[mask], j[mask]
+
+        return u.ravel(), v.ravel(), j.ravel()
+
+    def __build_H_B(self):
+        # couples x[u][j] and x[v][j + 1] with weight D[u][v], the last position is connected back to the first one
+        n = self.n
+        u, v, j = self.__consecutive(n)
+
+        rows = self.__index(u, j)
+        cols = self.__index(v, (j + 1) % n)
+        data = self.D_matrix[u, v]
+
+        return rows, cols, data
+
+    def __build_H_C(self):
+        if self.Q_array is None:
+            raise Exception('Hamiltonian built without Saturation modeling, Hamiltonian H_C not present')
+
+        # couples x[u][j] and x[v][j + 1] with weight (Q_v - Q_u)^2, the tour is not closed for the charges
+        u, v, j = self.__consecutive(self.n - 1)
+
+        rows = self.__index(u, j)
+        cols = self.__index(v, j + 1)
+        data = (self.Q_array[v] - self.Q_array[u]) ** 2
+
+        return rows, cols, data
+
+    def __to_bqm(self, linear, rows, cols, data):
+        # products of a variable with itself are linear terms for binary variables
+        diagonal = rows == cols
+        linear = linear + np.bincount(rows[diagonal], weights=data[diagonal], minlength=linear.shape[0])
+
+        # null couplings, as the ones of the durations of a node with itself, are not emitted
+        emitted = ~diagonal & (data != 0)
+        rows, cols, data = rows[emitted], cols[emitted], data[emitted]
+
+        # couples with a variable fixed to 1 become linear terms of the other one, those with a variable fixed to 0
+        # vanish and the terms left on fixed variables only are moved in the offset
+        row_values, col_values = self.fixed[rows], self.fixed[cols]
+        free = self.fixed < 0
+        offset = linear[self.fixed == 1].sum() + data[(row_values == 1) & (col_values == 1)].sum()
+        linear = linear + np.bincount(rows[(row_values < 0) & (col_values == 1)],
+                                      weights=data[(row_values < 0) & (col_values == 1)], minlength=linear.shape[0])
+        linear = linear + np.bincount(cols[(row_values == 1) & (col_values < 0)],
+                                      weights=data[(row_values == 1) & (col_values < 0)], minlength=linear.shape[0])
+
+        kept = (row_values < 0) & (col_values < 0)
+        free_index = np.cumsum(free) - 1
+        quadratic = (free_index[rows[kept]], free_index[cols[kept]], data[kept])
+
+        # repeated (row, col) couples are summed up by dimod
+        return dimod.BinaryQuadraticModel.from_numpy_vectors(linear[free], quadratic, offset, dimod.BINARY,
+                                                             variable_order=np.flatnonzero(free).tolist())
+
+    @staticmethod
+    def __get_weights(norm_dict):
+        return {
+            'A': norm_dict['A_Normalization'],
+            'B': norm_dict['B_Normalization'],
+            'C': norm_dict['C_Normalization']
+        }
+
+    def __build_components(self):
+        # the three Hamiltonians without their normalization factor as (linear, rows, cols, data) arrays
+        linear, a_rows, a_cols, a_data = self.__build_H_A()
+        components = {'A': (linear, a_rows, a_cols, a_data)}
+
+        # H_B models the durations
+        if self.D_matrix is not None:
+            components['B'] = (np.zeros(self.n * self.n),) + self.__build_H_B()
+
+        # H_C models the saturations, for testing purpose if Q_Array is None we build H without it
+        if self.Q_array is not None:
+            components['C'] = (np.zeros(self.n * self.n),) + self.__build_H_C()
+
+        return components
+
+    def get_bqm(self, norm_dict):
+        weights = QuboBuilder.__get_weights(norm_dict)
+
+        components = self.__build_components()
+        linear = sum(weights[key] * component[0] for key, component in components.items())
+        rows = np.concatenate([component[1] for component in components.values()])
+        cols = np.concatenate([component[2] for component in components.values()])
+        data = np.concatenate([weights[key] * component[3] for key, component in components.items()])
+
+        return self.__to_bqm(linear, rows, cols, data)
+
+    def get_encoding(self):
+        return self.encoding
+
+    def get_components(self):
+        # each Hamiltonian is built once without its normalization factor, a sweep over A, B and C then only needs to
+        # reweigh them through weigh_components instead of building the whole model again
+        return {key: self.__to_bqm(*component) for key, component in self.__build_components().items()}
+
+    @staticmethod
+    def weigh_components(components, norm_dict):
+        weights = QuboBuilder.__get_weights(norm_dict)
+
+        # all the components share the same variables, hence the sum is a linear combination of their biases
+        bqm = dimod.BinaryQuadraticModel(dimod.BINARY)
+        for key, component in components.items():
+            bqm.update(weights[key] * component)
+
+        return bqm
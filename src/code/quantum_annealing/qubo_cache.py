@@ -0,0 +1,120 @@
+"""
+Persistent cache of the compiled QUBOs. Every BQM is stored as a compressed npz file holding the arrays of its linear
+and quadratic biases, and it is identified by a hash of the content of the instance: distance matrix, charge array,
+normalization factors and encoding options. When the same experiment is executed again the BQM is loaded from the disk
+and the build of the Hamiltonian is skipped entirely.
+
+The cache is bounded in size: each hit refreshes the modification time of its file and, whenever the total size
+exceeds max_size, the least recently used files are removed first.
+"""
+
+import hashlib
+import json
+import os
+
+import dimod
+import numpy as np
+
+cache_path = '../resources/cache/qubo/'
+max_cache_size = 512 * 1024 * 1024   # bytes
+
+
+class QuboCache(object):
+    def __init__(self, path=cache_path, max_size=max_cache_size):
+        self.path = path
+        self.max_size = max_size
+        self.stats_path = os.path.join(path, 'stats.json')
+        self.hits = 0
+        self.misses = 0
+        self.total_stats = {'hits': 0, 'misses': 0}
+
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def get_key(distance_matrix, charge_array, norm_dict, options=None):
+        key_hash = hashlib.sha256()
+
+        for array in (distance_matrix, charge_array):
+            if array is None:
+                key_hash.update(b'None')
+            else:
+                array = np.ascontiguousarray(array, dtype=float)
+                key_hash.update(str(array.shape).encode())
+                key_hash.update(array.tobytes())
+
+        key_hash.update(json.dumps(norm_dict, sort_keys=True, default=str).encode())
+        key_hash.update(json.dumps(options or {}, sort_keys=True, default=str).encode())
+
+        return key_hash.hexdigest()
+
+    def __file_path(self, key):
+        return os.path.join(self.path, key + '.npz')
+
+    def load(self, key):
+        file_path = self.__file_path(key)
+        if not os.path.exists(file_path):
+            return None
+
+        with np.load(file_path) as data:
+            labels = data['labels'].tolist()
+            bqm = dimod.BinaryQuadraticModel.from_numpy_vectors(data['linear'],
+                                                                (data['rows'], data['cols'], data['quadratic']),
+                                                                float(data['offset']), dimod.BINARY,
+                                                                variable_order=labels)
+
+        # refresh the file so that it becomes the most recently used one
+        os.utime(file_path)
+
+        return bqm
+
+    def store(self, key, bqm):
+        labels = list(bqm.variables)
+        linear, (rows, cols, quadratic), offset = bqm.to_numpy_vectors(variable_order=labels)
+
+        np.savez_compressed(self.__file_path(key), labels=np.array(labels), linear=linear, rows=rows, cols=cols,
+                            quadratic=quadratic, offset=offset)
+        self.__evict()
+
+    def __evict(self):
+        files = [os.path.join(self.path, f) for f in os.listdir(self.path) if f.endswith('.npz')]
+        files.sort(key=os.path.getmtime)
+        total_size = sum(os.path.getsize(f) for f in files)
+
+        # remove the least recently used files until the cache fits its size, the newest one is always kept
+        while total_size > self.max_size and len(files) > 1:
+            oldest = files.pop(0)
+            total_size -= os.path.getsize(oldest)
+            os.remove(oldest)
+
+    def __update_stats(self, hit):
+        stats = {'hits': 0, 'misses': 0}
+        if os.path.exists(self.stats_path):
+            with open(self.stats_path) as stats_file:
+                stats = json.load(stats_file)
+
+        stats['hits' if hit else 'misses'] += 1
+        with open(self.stats_path, 'w') as stats_file:
+            json.dump(stats, stats_file)
+
+        return stats
+
+    def get_bqm(self, distance_matrix, charge_array, norm_dict, build, options=None):
+        # build is called only on a miss and it must return the BQM of the instance
+        key = self.get_key(distance_matrix, charge_array, norm_dict, options)
+        bqm = self.load(key)
+        hit = bqm is not None
+
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+            bqm = build()
+            self.store(key, bqm)
+
+        self.total_stats = self.__update_stats(hit)
+
+        return bqm
+
+    def report(self):
+        print("QUBO cache: {} hits and {} misses in this run, {} hits and {} misses overall".format(
+            self.hits, self.misses, self.total_stats['hits'], self.total_stats['misses']))
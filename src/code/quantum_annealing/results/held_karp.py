@@ -0,0 +1,114 @@
+"""
+Exact optimum of the LTSP objective with the Held-Karp dynamic program, used as ground truth for the optimality gap and
+the success probability of the results. The objective is the one of the tours, B * duration + C * charge penalty, where
+the duration is closed and the charge penalty is open, hence the first node of the tour matters and for each start s:
+    (i) dp[S][j] is the cheapest path that starts from s, visits the nodes of the bitmask S and ends in j, built layer
+        by layer over the number of nodes in S: all the subsets of a layer are extended at once with a (subsets x nodes)
+        minimum over the previous node, so that the program is a few array operations per layer and per end node
+    (ii) the tour is closed with the duration from the last node back to s, and the cheapest over the starts is kept
+With the fixed start only the depot is tried. The program takes O(2^n n^2) per start and it is meant for n <= 16.
+
+Optima are stored in a json file per instance, identified by the same hash of the QUBO cache, so that every instance is
+solved once.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from src.code.quantum_annealing.qubo_cache import QuboCache
+from src.code.quantum_annealing.tour_annealing import get_weights
+
+optimum_path = '../resources/cache/optimum/'
+max_exact_nodes = 16
+
+
+def __get_layers(n):
+    masks = np.arange(1 << n)
+    sizes = np.array([bin(mask).count('1') for mask in range(1 << n)])
+
+    return [masks[sizes == k] for k in range(n + 1)]
+
+
+def __solve_from(start, W, W_wrap, layers):
+    n = len(W)
+    dp = np.full((1 << n, n), np.inf)
+    parent = np.zeros((1 << n, n), dtype=np.int8)
+    dp[1 << start, start] = 0.0
+
+    for layer in layers[2:]:
+        layer = layer[(layer >> start) & 1 == 1]
+        for j in range(n):
+            if j == start:
+                continue
+
+            # subsets of the layer ending in j, extended from the best previous node
+            masks = layer[(layer >> j) & 1 == 1]
+            candidates = dp[masks ^ (1 << j)] + W[:, j]
+            parent[masks, j] = candidates.argmin(axis=1)
+            dp[masks, j] = candidates[np.arange(len(masks)), parent[masks, j]]
+
+    full = (1 << n) - 1
+    closed = dp[full] + W_wrap[:, start]
+    last = int(closed.argmin())
+
+    # the tour is read backwards from the parents
+    tour, mask = [last], full
+    while len(tour) < n:
+        previous = int(parent[mask, tour[-1]])
+        mask ^= 1 << tour[-1]
+        tour.append(previous)
+
+    return closed[last], tour[::-1]
+
+
+def solve_held_karp(D_matrix, Q_array, norm_dict, fixed_start=None, adjacency=None):
+    n = D_matrix.shape[0]
+    if n > max_exact_nodes:
+        raise Exception('Held-Karp is limited to {} nodes'.format(max_exact_nodes))
+
+    W, W_wrap = get_weights(D_matrix, Q_array, norm_dict)
+    if adjacency is not None:
+        # missing edges can never be part of a tour
+        missing = ~np.asarray(adjacency, dtype=bool)
+        W, W_wrap = np.where(missing, np.inf, W), np.where(missing, np.inf, W_wrap)
+
+    if n == 1:
+        return 0.0, [0]
+
+    layers = __get_layers(n)
+    starts = range(n) if fixed_start is None else [fixed_start]
+    solutions = [__solve_from(start, W, W_wrap, layers) for start in starts]
+
+    return min(solutions, key=lambda solution: solution[0])
+
+
+class OptimumCache(object):
+    def __init__(self, path=optimum_path):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def __file_path(self, key):
+        return os.path.join(self.path, key + '.json')
+
+    def get_optimum(self, D_matrix, Q_array, norm_dict, fixed_start=None, adjacency=None):
+        # the optimum is computed only on a miss, None when the instance is too large for the exact solver
+        if D_matrix.shape[0] > max_exact_nodes:
+            return None
+
+        options = {'fixed_start': fixed_start,
+                   'adjacency': None if adjacency is None else np.asarray(adjacency).tolist(),
+                   'solver': 'held_karp'}
+        file_path = self.__file_path(QuboCache.get_key(D_matrix, Q_array, norm_dict, options))
+
+        if os.path.exists(file_path):
+            with open(file_path) as optimum_file:
+                return json.load(optimum_file)
+
+        cost, tour = solve_held_karp(D_matrix, Q_array, norm_dict, fixed_start, adjacency)
+        optimum = {'cost': float(cost), 'tour': [int(node) for node in tour]}
+        with open(file_path, 'w') as optimum_file:
+            json.dump(optimum, optimum_file)
+
+        return optimum
@@ -1,75 +1,154 @@
-import math
+import numpy as np
+
+from src.code.quantum_annealing.encoding import VariableEncoding
+from src.code.quantum_annealing.results.tour_evaluator import evaluate_tours, get_tour_costs, rank_tours
+
+optimum_tolerance = 1e-9
 
 
 class Result(object):
-    def print_response_data(self, do_print):
-        n = 0
-        pos_sets = []
-        pos_energies = []
-        response = self.response.aggregate().lowest()
-        if do_print:
-            # ------- Print results to user -------
-            print('-' * 130)
-            print('{:>45s}{:>60s}{:>22s}'.format('Set 1', 'Energy', "Count"))
-            print('-' * 130)
-        for sample, E, occ in response.data(fields=['sample', 'energy', "num_occurrences"]):
-            bool_energy = False
-            S0 = []
-            S1 = []
-            E1 = None
-            for k, v in sample.items():
-                if v == 0:
-                    S0.append(k)
-                else:
-                    if not bool_energy:
-                        E1 = E
-                        bool_energy = True
-                    S1.append(k)
-
-            pos_sets.append(S1)
-            pos_energies.append(E1)
-            n = int(math.sqrt(len(S0) + len(S1)))
-            if do_print:
-                print('{:>30s}{:^30s}{:^15s}'.format(str(S1), str(E), str(occ)))
-
-        return n, pos_sets, pos_energies
-
-    def __init__(self, response, do_print):
+    feasible = None
+    costs = None
+    optimum = None
+    # tours of the post-processing, one for each sample of the raw response, and the reads they rescued
+    repaired_tours = None
+    repaired_costs = None
+    rescued_reads = None
+
+    def __init__(self, response, do_print, encoding=None):
         self.response = response
-        self.n, self.pos_sets, self.pos_energies = self.print_response_data(do_print)
 
-    @staticmethod
-    def map_variables(pos_set):
-        m_set = []
-        for i in range(len(pos_set)):
-            x = pos_set[i].replace(']', '').split('[')
-            m_set.append([int(x[1]), int(x[2])])
+        # responses with the pyqubo labels are translated in the integer encoding
+        if encoding is None:
+            encoding = VariableEncoding.from_labels(response.variables)
+            self.response = response.relabel_variables(
+                {label: int(encoding.index(*encoding.parse_label(label))) for label in response.variables},
+                inplace=False)
+        self.encoding = encoding
+        self.n = encoding.n
+
+        self.decode_response()
+        if do_print:
+            self.print_response_data()
 
-        return m_set
+    def decode_response(self):
+        # the aggregated samples are decoded all at once from the record as a reads x n x n grid of (node, position)
+        response = self.response.aggregate()
+        record = response.record
+        nodes, positions = self.encoding.node_position(np.asarray(response.variables))
 
-    def split_solution(self):
-        correct_solutions = []
-        wrong_solutions = []
+        grid = np.zeros((len(record), self.n, self.n), dtype=np.int8)
+        grid[:, nodes, positions] = record.sample
 
-        for p_set in self.pos_sets:
-            correct = True
-            m_set = self.map_variables(p_set)
-            s_res = sorted(m_set, key=lambda x: x[1])
+        # with the symmetry reduction the depot is pinned at position 0 and it is not part of the samples
+        if self.encoding.fixed_start is not None:
+            grid[:, self.encoding.fixed_start, 0] = 1
 
-            if len(s_res) != self.n:
-                correct = False
-            else:
-                for i in range(0, int(len(s_res)), 2):
-                    start_node = (s_res[i + 0])[0]
-                    end_node = (s_res[i + 1])[0]
+        # a sample is a tour when each node is visited once and each position holds exactly one node
+        self.valid = (grid.sum(axis=1) == 1).all(axis=1) & (grid.sum(axis=2) == 1).all(axis=1)
 
-                    if abs(start_node - end_node) > 1:
-                        correct = False
+        # tours[r][j] is the node visited at position j, meaningful only for the valid samples, while the complete
+        # samples are kept bit-packed for the ones that have to be inspected
+        self.tours = grid.argmax(axis=1).astype(np.min_scalar_type(self.n))
+        self.packed_samples = np.packbits(grid.reshape(len(record), -1), axis=1)
+        self.energies = record.energy
+        self.occurrences = record.num_occurrences
 
-            if correct:
-                correct_solutions.append(s_res)
-            else:
-                wrong_solutions.append(s_res)
+        # as before only the samples with the lowest energy are considered as solutions
+        self.lowest = np.array([], dtype=int)
+        if len(record) > 0:
+            self.lowest = np.flatnonzero(np.isclose(self.energies, self.energies.min()))
+        self.pos_energies = self.energies[self.lowest].tolist()
+
+    def evaluate(self, D_matrix, Q_array, norm_dict, adjacency=None, optimum=None):
+        # real duration and charge penalty of every decoded sample, so that they can be ranked by the LTSP objective
+        tour_valid, self.durations, self.charge_penalties = evaluate_tours(self.tours, D_matrix, Q_array, adjacency)
+        self.feasible = self.valid & tour_valid
+        self.costs = get_tour_costs(self.durations, self.charge_penalties, norm_dict)
+        self.ranking = rank_tours(self.feasible, self.costs)
+
+        # cost of the optimal tour given by the exact solver, None when it is unknown
+        self.optimum = optimum
+
+    def set_repaired_tours(self, tours, costs, rescued_reads):
+        # the raw response is kept as it was sampled, the repaired tours are attached next to it
+        self.repaired_tours = tours
+        self.repaired_costs = costs
+        self.rescued_reads = rescued_reads
+
+    def get_repaired_best_cost(self):
+        if self.repaired_costs is None or not np.isfinite(self.repaired_costs).any():
+            return np.nan
+
+        return self.repaired_costs.min()
+
+    def get_feasible_rate(self):
+        return self.occurrences[self.feasible].sum() / self.occurrences.sum()
+
+    def get_best_cost(self):
+        return self.costs[self.ranking[0]] if len(self.ranking) > 0 else np.nan
+
+    def get_optimality_gap(self):
+        # relative distance of the best tour from the optimum, nan when there is no tour or no optimum
+        if self.optimum is None or len(self.ranking) == 0:
+            return np.nan
+
+        gap = self.get_best_cost() - self.optimum
+
+        return gap / self.optimum if self.optimum > 0 else gap
+
+    def get_success_probability(self):
+        # fraction of the reads that are optimal tours
+        if self.optimum is None:
+            return np.nan
+
+        optimal = self.feasible & np.isclose(self.costs, self.optimum, rtol=optimum_tolerance, atol=optimum_tolerance)
+
+        return self.occurrences[optimal].sum() / self.occurrences.sum()
+
+    def print_evaluation(self):
+        print('Feasible Rate: {:.4f}, Best Cost: {:.6f}, Optimum: {}, Optimality Gap: {:.4%}, '
+              'Success Probability: {:.4f}'.format(self.get_feasible_rate(), self.get_best_cost(), self.optimum,
+                                                   self.get_optimality_gap(), self.get_success_probability()))
+        if self.repaired_tours is not None:
+            print('Rescued Reads: {}, Repaired Best Cost: {:.6f}'.format(self.rescued_reads,
+                                                                          self.get_repaired_best_cost()))
+
+    def get_sample_grid(self, i):
+        grid = np.unpackbits(self.packed_samples[i], count=self.n * self.n)
+
+        return grid.reshape(self.n, self.n)
+
+    def print_response_data(self):
+        # ------- Print results to user -------
+        print('-' * 130)
+        print('{:>45s}{:>60s}{:>22s}'.format('Set 1', 'Energy', "Count"))
+        print('-' * 130)
+        for i in self.lowest:
+            nodes, positions = np.nonzero(self.get_sample_grid(i))
+            S1 = self.encoding.label(self.encoding.index(nodes, positions))
+            print('{:>30s}{:^30s}{:^15s}'.format(str(S1), str(self.energies[i]), str(self.occurrences[i])))
+
+    def map_variables(self, i):
+        # [node, position] couples of the sample i sorted by position
+        nodes, positions = np.nonzero(self.get_sample_grid(i))
+        order = np.argsort(positions, kind='stable')
+
+        return np.stack([nodes[order], positions[order]], axis=1).tolist()
+
+    def split_solution(self):
+        if self.feasible is not None:
+            correct = self.feasible[self.lowest]
+        else:
+            # without the instance correct tours are the ones visiting the couples of nodes (2i, 2i + 1) one after the
+            # other, as in the test problems
+            half = self.n // 2
+            tours = self.tours[self.lowest].astype(int)
+            paired = (np.abs(tours[:, 0:2 * half:2] - tours[:, 1:2 * half:2]) <= 1).all(axis=1)
+            correct = self.valid[self.lowest] & paired
+
+        correct_solutions = [self.map_variables(i) for i in self.lowest[correct]]
+        wrong_solutions = [self.map_variables(i) for i in self.lowest[~correct]]
 
         return correct_solutions, wrong_solutions
 
@@ -16,6 +16,14 @@ def __get_best_lines(dataframe, parameter_type):
     # drop Mean Enery and Best columns
     dataframe = dataframe.drop(columns=['Mean Energy', 'Best'])
 
+    # the lines with fewer reads were discarded by the adaptive allocation of the reads and are not comparable
+    if 'Reads' in dataframe.columns:
+        dataframe = dataframe.loc[dataframe['Reads'] == dataframe['Reads'].max()]
+
+    # the configurations of the joint tuning are ranked by the objective minimized by its surrogate
+    if 'Objective' in dataframe.columns:
+        dataframe = dataframe.loc[dataframe['Objective'] == dataframe['Objective'].min()]
+
     # first get all the lines that have at least a solution
     df_with_sol = dataframe.loc[dataframe['Correct Sol Num'] >= 1]
 
@@ -28,6 +36,10 @@ def __get_best_lines(dataframe, parameter_type):
     return df_best_lines
 
 
+def __has_csv(path):
+    return os.path.isdir(path) and len(os.listdir(path)) > 0
+
+
 def write_results(num_nodes):
     # first of all we add to the paths the directory of the experiment executed
     results_path = '../resources/results/' + str(num_nodes) + '/'
@@ -36,30 +48,42 @@ def write_results(num_nodes):
     chain_path = csv_path + 'chain_strength/' + str(num_nodes)
     anneal_path = csv_path + 'anneal_schedule/' + str(num_nodes)
 
-    # once we have the paths we can read the datasets
-    chain_csv = os.listdir(chain_path)
-    anneal_csv = os.listdir(anneal_path)
-
-    chain_df = read_input(os.path.join(chain_path, chain_csv[0]), ',')  # change it if only one chain csv is present
-    chain_df = chain_df.rename(columns={'Chain Strength': 'Parameter'})
-    pause_df = read_input(os.path.join(anneal_path, anneal_csv[0]), ',')  # anneal csv are always ordered as: p,pq and q
-    pause_df = pause_df.rename(columns={'Schedule': 'Parameter'})
-    quench_df = read_input(os.path.join(anneal_path, anneal_csv[2]), ',')
-    quench_df = quench_df.rename(columns={'Schedule': 'Parameter'})
-    pause_quench_df = read_input(os.path.join(anneal_path, anneal_csv[1]), ',')
-    pause_quench_df = pause_quench_df.rename(columns={'Schedule': 'Parameter'})
-
     # create the results dataframe
     results_df = pd.DataFrame(columns=['Parameter', 'Type', 'Energy', 'Correct Sol Num', 'QPU Access Time',
                                        'QPU Programming Time'])
 
+    # the separate chain and anneal tunings can be replaced by the joint one, hence their csv are read only if present
     # for each csv line we keep all lines that have at least one correct solution and those that have the minimum energy
     # 0 -> chain type
     # 1 -> pause, quench, pause or quench
-    results_df = pd.concat([results_df, __get_best_lines(chain_df, 0)], axis=0)
-    results_df = pd.concat([results_df, __get_best_lines(pause_df, 1)], axis=0)
-    results_df = pd.concat([results_df, __get_best_lines(quench_df, 2)], axis=0)
-    results_df = pd.concat([results_df, __get_best_lines(pause_quench_df, 3)], axis=0)
+    if __has_csv(chain_path):
+        chain_csv = os.listdir(chain_path)
+        chain_df = read_input(os.path.join(chain_path, chain_csv[0]), ',')  # change it if only one chain csv is present
+        chain_df = chain_df.rename(columns={'Chain Strength': 'Parameter'})
+        results_df = pd.concat([results_df, __get_best_lines(chain_df, 0)], axis=0)
+
+    if __has_csv(anneal_path):
+        anneal_csv = os.listdir(anneal_path)
+        pause_df = read_input(os.path.join(anneal_path, anneal_csv[0]), ',')  # anneal csv are always ordered as: p,pq,q
+        pause_df = pause_df.rename(columns={'Schedule': 'Parameter'})
+        quench_df = read_input(os.path.join(anneal_path, anneal_csv[2]), ',')
+        quench_df = quench_df.rename(columns={'Schedule': 'Parameter'})
+        pause_quench_df = read_input(os.path.join(anneal_path, anneal_csv[1]), ',')
+        pause_quench_df = pause_quench_df.rename(columns={'Schedule': 'Parameter'})
+
+        results_df = pd.concat([results_df, __get_best_lines(pause_df, 1)], axis=0)
+        results_df = pd.concat([results_df, __get_best_lines(quench_df, 2)], axis=0)
+        results_df = pd.concat([results_df, __get_best_lines(pause_quench_df, 3)], axis=0)
+
+    # the configurations of the joint tuning are couples, each one gives a chain line and a schedule line
+    # 4 -> joint tuning schedule
+    joint_path = csv_path + 'joint/' + str(num_nodes)
+    if __has_csv(joint_path):
+        joint_df = read_input(os.path.join(joint_path, os.listdir(joint_path)[0]), ',')
+        joint_chain_df = joint_df.drop(columns=['Schedule']).rename(columns={'Chain Strength': 'Parameter'})
+        joint_schedule_df = joint_df.drop(columns=['Chain Strength']).rename(columns={'Schedule': 'Parameter'})
+        results_df = pd.concat([results_df, __get_best_lines(joint_chain_df, 0)], axis=0)
+        results_df = pd.concat([results_df, __get_best_lines(joint_schedule_df, 4)], axis=0)
 
     # finally once the results dataframe is built we can write it
     results_path += 'performance_results.csv'
@@ -0,0 +1,44 @@
+"""
+Batched evaluation of decoded tours on the real LTSP objective. Tours are given as a (reads x n) array where tours[r][j]
+is the node visited at position j, and all of them are evaluated at once with a few array operations:
+    (i) validity: the tour is a permutation of the nodes and, when an adjacency mask is given, it only uses edges
+        present in the graph
+    (ii) duration: the sum of D_matrix along the tour, closed from the last position back to the first one as in H_B
+    (iii) charge penalty: the sum of (Q_v - Q_u)^2 between consecutive positions, not closed as in H_C
+
+The cost of a tour is the same weighted sum the Hamiltonian is built on, B * duration + C * charge penalty, so that
+tours can be ranked by the objective instead of by the QUBO energy.
+"""
+
+import numpy as np
+
+
+def evaluate_tours(tours, D_matrix, Q_array=None, adjacency=None):
+    tours = np.asarray(tours, dtype=int)
+    n = D_matrix.shape[0]
+    following = np.roll(tours, -1, axis=1)
+
+    valid = (np.sort(tours, axis=1) == np.arange(n)).all(axis=1)
+    if adjacency is not None:
+        valid &= np.asarray(adjacency, dtype=bool)[tours, following].all(axis=1)
+
+    duration = np.asarray(D_matrix)[tours, following].sum(axis=1)
+
+    if Q_array is not None:
+        Q_array = np.asarray(Q_array)
+        charge_penalty = ((Q_array[tours[:, 1:]] - Q_array[tours[:, :-1]]) ** 2).sum(axis=1)
+    else:
+        charge_penalty = np.zeros(tours.shape[0])
+
+    return valid, duration, charge_penalty
+
+
+def get_tour_costs(duration, charge_penalty, norm_dict):
+    return norm_dict['B_Normalization'] * duration + norm_dict['C_Normalization'] * charge_penalty
+
+
+def rank_tours(valid, costs):
+    # indices of the valid tours from the cheapest to the most expensive one
+    valid_index = np.flatnonzero(valid)
+
+    return valid_index[np.argsort(costs[valid_index], kind='stable')]
@@ -0,0 +1,45 @@
+"""
+Construction of the QPU samplers from the client configuration. The profile selects one of the solvers present in the
+client_config.conf file, while the 'local' profile selects the LocalQPUSampler, so that every QPU path of the software
+can also be executed offline, optionally with the round trip latency given by the 'latency' entry of the configuration.
+
+Building a sampler opens a client, connects to the solver and fetches its properties, hence samplers are kept in a pool
+keyed by (config_path, profile, kind) and shared by QPU_Model, Hybrid_Model and all the tuning modules of the process:
+a sweep of the tuning pays a single client setup, and the solver properties, nodelist and edgelist fetched by the first
+construction are then read from the pooled sampler.
+"""
+
+from dwave.system.samplers import DWaveSampler, LeapHybridSampler
+
+from src.code.quantum_annealing.local_sampler import LocalQPUSampler
+
+local_profile = 'local'
+
+sampler_pool = {}
+
+
+def __get_key(client_conf, kind):
+    return client_conf['config_path'], client_conf['profile'], kind
+
+
+def get_pooled_sampler(client_conf, kind, build):
+    # build is called only the first time a sampler of the given kind is requested for the client configuration
+    key = __get_key(client_conf, kind)
+    if key not in sampler_pool:
+        sampler_pool[key] = build()
+
+    return sampler_pool[key]
+
+
+def get_qpu_sampler(client_conf):
+    if client_conf['profile'] == local_profile:
+        return get_pooled_sampler(client_conf, 'qpu', lambda: LocalQPUSampler(latency=client_conf.get('latency', 0.0)))
+
+    return get_pooled_sampler(client_conf, 'qpu', lambda: DWaveSampler(config_file=client_conf['config_path'],
+                                                                       profile=client_conf['profile']))
+
+
+def get_hybrid_sampler(client_conf):
+    return get_pooled_sampler(client_conf, 'hybrid', lambda: LeapHybridSampler(config_file=client_conf['config_path'],
+                                                                               profile=client_conf['profile']))
+
@@ -0,0 +1,147 @@
+"""
+Structured embeddings of the n x n grid of variables of the LTSP. The interaction graph of an instance of size n does
+not depend on the instance: every variable x[v][j] is coupled to its row and to its column by H_A and to all the
+variables of the positions j - 1 and j + 1 by H_B and H_C, hence an embedding of the complete grid is valid for every
+BQM of that size, whatever the weights, the pruned edges or the fixed variables are.
+
+Embeddings are built deterministically:
+    (i) while the variables fit a native clique of the target graph, the clique embedding found by busclique is used,
+        its chains have all the same length, close to the minimum for the number of variables, and it is found in a
+        fraction of a second
+    (ii) beyond that size the grid is embedded by minorminer with a fixed seed, so that the same embedding is produced
+         on every machine
+
+The library holds the embeddings of n = 4, ..., 16 for the ideal Pegasus and Chimera graphs, both for the complete grid
+and for the (n - 1) x (n - 1) grid left by the symmetry reduction. Chains are stored as a list in the order of the free
+variables of the encoding: all the reduced grids are isomorphic whatever the depot is, hence a single entry serves all
+of them. On a real solver with broken qubits an embedding of the library may not be valid, in that case the clique
+embedding is built again on the working graph of the solver, or the EmbeddingStore falls back to its heuristic search.
+"""
+
+import itertools
+import json
+import os
+
+import dwave_networkx as dnx
+import minorminer
+from dwave.embedding import is_valid_embedding
+from minorminer import busclique
+
+from src.code.quantum_annealing.encoding import VariableEncoding
+
+library_path = '../resources/embeddings/'
+library_sizes = range(4, 17)
+fallback_timeout = 600      # seconds
+
+
+def get_grid_edges(n, fixed_start=None):
+    # couplings of the complete grid restricted to the free variables of the encoding
+    encoding = VariableEncoding(n, fixed_start)
+    free = [(v, j) for v in range(n) for j in range(n)
+            if fixed_start is None or (v != fixed_start and j != 0)]
+
+    edges = set()
+    for (u, i), (v, j) in itertools.combinations(free, 2):
+        if u == v or i == j or (j - i) % n in (1, n - 1):
+            edges.add((int(encoding.index(u, i)), int(encoding.index(v, j))))
+
+    return [int(encoding.index(v, j)) for v, j in free], sorted(edges)
+
+
+def get_topology_graph(topology, shape, node_list=None, edge_list=None):
+    # busclique requires the dwave_networkx graph of the topology, defective qubits are the ones missing from node_list,
+    # None for the topologies without structured embeddings, such as zephyr
+    if topology == 'pegasus':
+        return dnx.pegasus_graph(shape[0], node_list=node_list, edge_list=edge_list)
+    elif topology == 'chimera':
+        return dnx.chimera_graph(*shape, node_list=node_list, edge_list=edge_list)
+
+    return None
+
+
+def get_target_graph(sampler):
+    topology = sampler.properties['topology']
+
+    return get_topology_graph(topology['type'], topology['shape'], sampler.nodelist, sampler.edgelist)
+
+
+def build_grid_embedding(n, fixed_start, target_graph, timeout=fallback_timeout, fallback=True):
+    variables, edges = get_grid_edges(n, fixed_start)
+
+    embedding = busclique.find_clique_embedding(variables, target_graph)
+    if not embedding and fallback:
+        embedding = minorminer.find_embedding(edges, target_graph.edges, random_seed=0, timeout=timeout)
+
+    return {v: list(chain) for v, chain in embedding.items()}
+
+
+class EmbeddingLibrary(object):
+    def __init__(self, path=library_path):
+        self.path = path
+        self.libraries = {}
+
+    @staticmethod
+    def get_entry(n, fixed_start):
+        return '{}_{}'.format(n, 'full' if fixed_start is None else 'reduced')
+
+    def __file_path(self, topology, size):
+        return os.path.join(self.path, '{}_{}.json'.format(topology, size))
+
+    def __load(self, topology, size):
+        if (topology, size) not in self.libraries:
+            library = {}
+            if os.path.exists(self.__file_path(topology, size)):
+                with open(self.__file_path(topology, size)) as library_file:
+                    library = json.load(library_file)
+            self.libraries[(topology, size)] = library
+
+        return self.libraries[(topology, size)]
+
+    def generate(self, topology, size, sizes=library_sizes, timeout=fallback_timeout):
+        # precompute the embeddings of the ideal target graph, the ones that cannot be found are left out
+        target_graph = get_topology_graph(topology, [size] if topology == 'pegasus' else [size, size, 4])
+        if target_graph is None:
+            raise Exception('Wrong Topology for the structured embeddings')
+        library = self.__load(topology, size)
+
+        for n in sizes:
+            for fixed_start in (None, 0):
+                entry = self.get_entry(n, fixed_start)
+                if entry in library:
+                    continue
+
+                variables, _ = get_grid_edges(n, fixed_start)
+                embedding = build_grid_embedding(n, fixed_start, target_graph, timeout)
+                if embedding:
+                    library[entry] = [[int(q) for q in embedding[v]] for v in variables]
+                    print("Structured embedding {} on {} {}: max chain {}".format(
+                        entry, topology, size, max(len(chain) for chain in library[entry])))
+                else:
+                    print("Structured embedding {} on {} {} not found".format(entry, topology, size))
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.__file_path(topology, size), 'w') as library_file:
+            json.dump(library, library_file)
+
+    def get_embedding(self, encoding, sampler):
+        # embedding of the grid of the encoding on the sampler, None when there is no structured one
+        variables, edges = get_grid_edges(encoding.n, encoding.fixed_start)
+        topology = sampler.properties.get('topology', {})
+        shape = topology.get('shape', [None])
+
+        chains = self.__load(topology.get('type'), shape[0]).get(self.get_entry(encoding.n, encoding.fixed_start))
+        if chains is not None:
+            embedding = dict(zip(variables, chains))
+            if is_valid_embedding(embedding, edges, sampler.edgelist):
+                return embedding
+
+        # the embeddings of the library are built on the ideal graph, broken qubits require a new one, which is
+        # searched here only when it is a clique since the heuristic search is left to the embedding store, as for
+        # the topologies without structured embeddings
+        target_graph = get_target_graph(sampler)
+        if target_graph is None:
+            return None
+
+        embedding = build_grid_embedding(encoding.n, encoding.fixed_start, target_graph, fallback=False)
+
+        return embedding or None
@@ -0,0 +1,223 @@
+"""
+Simulated annealing over the tours instead of over the one-hot QUBO. The state of each replica is a permutation, hence
+the annealing never leaves the feasible set and every read is a tour. The objective is the same of the Hamiltonian,
+B * duration + C * charge penalty, written as a sum over the slots of the tour: slot s joins the positions s and s + 1
+and costs W[u, v] = B * D[u, v] + C * (Q_v - Q_u)^2, except the last slot n - 1 that closes the tour back to position 0
+and costs only B * D[u, v] since the charge penalty is not closed. When an adjacency mask is given, a slot over a
+missing edge costs A * non_edge_penalty instead, as the H_a3 penalty of the QUBO, so that the replicas can cross the
+tours with missing edges but settle on the ones without.
+
+Each step proposes one move per replica, chosen at random among:
+    (i) swap of the nodes at positions i < j, changing the slots i - 1, i, j - 1 and j
+    (ii) 2-opt reversal of the positions i..j, changing the slots i - 1 and j, while the reversed slots in between cost
+         the difference of W and its transpose along the tour, read in O(1) from a prefix sum (zero when symmetric)
+    (iii) Or-opt move of a segment of 1 to 3 positions after position k, changing three slots
+
+so that the delta of every move is evaluated in O(1) from a few lookups in W. All the replicas are advanced at once,
+every step is a handful of array operations on (replicas,) vectors, with a geometric temperature schedule and the
+Metropolis acceptance. With the fixed start the depot is kept at position 0 and the moves never touch it.
+
+The prefix sum of the reversals depends on the whole tour, hence when W is not symmetric it is recomputed after every
+step for the replicas that accepted a move, a cumulative sum over the n slots vectorized across them: the moves are
+still evaluated in O(1), but their application costs O(n) per accepted replica instead of O(1).
+"""
+
+import numpy as np
+
+default_num_sweeps = 200
+min_temperature_ratio = 1e-3
+
+
+def get_weights(D_matrix, Q_array, norm_dict):
+    duration = norm_dict['B_Normalization'] * np.asarray(D_matrix, dtype=float)
+    if Q_array is None:
+        return duration, duration
+
+    Q_array = np.asarray(Q_array, dtype=float)
+    charge = norm_dict['C_Normalization'] * (Q_array[None, :] - Q_array[:, None]) ** 2
+
+    return duration + charge, duration
+
+
+class TourAnnealer(object):
+    def __init__(self, D_matrix, Q_array, norm_dict, fixed_start=None, adjacency=None, num_sweeps=default_num_sweeps,
+                 seed=None, non_edge_penalty=1.0):
+        self.n = D_matrix.shape[0]
+        self.W, self.W_wrap = get_weights(D_matrix, Q_array, norm_dict)
+        if adjacency is not None:
+            # a finite penalty, the replicas start from random tours that can use missing edges
+            missing = ~np.asarray(adjacency, dtype=bool)
+            penalty = norm_dict['A_Normalization'] * non_edge_penalty
+            self.W, self.W_wrap = np.where(missing, penalty, self.W), np.where(missing, penalty, self.W_wrap)
+        self.symmetric = np.allclose(self.W, self.W.T)
+        # flat table of the slot costs, the closing slot reads the second half
+        self.slot_table = np.concatenate([self.W.ravel(), self.W_wrap.ravel()])
+        self.fixed_start = fixed_start
+        self.first = 0 if fixed_start is None else 1
+        self.num_sweeps = num_sweeps
+        self.rng = np.random.default_rng(seed)
+
+    def __slot_costs(self, u, v, slots):
+        closing = slots % self.n == self.n - 1
+
+        return self.slot_table[(closing * self.n + u) * self.n + v]
+
+    def get_costs(self, tours):
+        slots = np.arange(self.n)[None, :]
+
+        return self.__slot_costs(tours, np.roll(tours, -1, axis=1), slots).sum(axis=1)
+
+    def __get_prefix(self, tours):
+        # prefix[r][s] is the cost change of reversing the slots 0..s - 1 of the tour r
+        if self.symmetric:
+            return np.zeros(tours.shape)
+
+        u, v = tours[:, :-1], tours[:, 1:]
+        prefix = np.zeros(tours.shape)
+        prefix[:, 1:] = np.cumsum(self.W[v, u] - self.W[u, v], axis=1)
+
+        return prefix
+
+    def __init_tours(self, num_replicas):
+        nodes = np.arange(self.n)
+        if self.fixed_start is None:
+            return self.rng.permuted(np.tile(nodes, (num_replicas, 1)), axis=1)
+
+        others = np.tile(nodes[nodes != self.fixed_start], (num_replicas, 1))
+        start = np.full((num_replicas, 1), self.fixed_start)
+
+        return np.hstack([start, self.rng.permuted(others, axis=1)])
+
+    def __sample_pairs(self, num_replicas):
+        # two distinct positions i < j among the movable ones
+        i = self.rng.integers(self.first, self.n, num_replicas)
+        j = self.rng.integers(self.first, self.n - 1, num_replicas)
+        j += j >= i
+
+        return np.minimum(i, j), np.maximum(i, j)
+
+    def __delta(self, old, new):
+        # old and new are lists of (slot, u, v, weight) with the nodes joined by the slots changed by a move
+        delta = 0.0
+        for slot, u, v, weight in new:
+            delta += weight * self.__slot_costs(u, v, slot)
+        for slot, u, v, weight in old:
+            delta -= weight * self.__slot_costs(u, v, slot)
+
+        return delta
+
+    def __swap(self, tours, rows, i, j):
+        n = self.n
+        at = lambda p: tours.ravel()[rows * n + p % n]
+        swapped = lambda p: np.where(p % n == i, at(j), np.where(p % n == j, at(i), at(p)))
+
+        # adjacent positions share a slot, as the first and last one do through the closing slot
+        weights = [1.0, 1.0, (j - 1 != i).astype(float), (j % n != (i - 1) % n).astype(float)]
+        slots = [i - 1, i, j - 1, j]
+        old = [(s, at(s), at(s + 1), w) for s, w in zip(slots, weights)]
+        new = [(s, swapped(s), swapped(s + 1), w) for s, w in zip(slots, weights)]
+
+        return self.__delta(old, new)
+
+    def __reverse(self, tours, rows, i, j, prefix):
+        n = self.n
+        at = lambda p: tours.ravel()[rows * n + p % n]
+
+        old = [(i - 1, at(i - 1), at(i), 1.0), (j, at(j), at(j + 1), 1.0)]
+        new = [(i - 1, at(i - 1), at(j), 1.0), (j, at(i), at(j + 1), 1.0)]
+        delta = self.__delta(old, new) + prefix[rows, j] - prefix[rows, i]
+
+        # reversing the whole tour moves the closing slot, it is never proposed
+        return np.where(j - i == n - 1, np.inf, delta)
+
+    def __or_opt(self, tours, rows, i, length, k):
+        n = self.n
+        at = lambda p: tours.ravel()[rows * n + p % n]
+        e = i + length - 1
+        forward = k > e
+
+        old = [(i - 1, at(i - 1), at(i), 1.0), (e, at(e), at(e + 1), 1.0), (k, at(k), at(k + 1), 1.0)]
+        new_forward = [(i - 1, at(i - 1), at(e + 1), 1.0), (i + k - e - 1, at(k), at(i), 1.0),
+                       (k, at(e), at(k + 1), 1.0)]
+        new_backward = [(k, at(k), at(i), 1.0), (k + length, at(e), at(k + 1), 1.0), (e, at(i - 1), at(e + 1), 1.0)]
+        delta = np.where(forward, self.__delta(old, new_forward),
+                         self.__delta(old, new_backward))
+
+        # k must be outside the segment, and the moves that rotate the whole tour are never proposed
+        valid = (forward | (k < i - 1)) & ~((i == 0) & (k == n - 1)) & ~((k == -1) & (e == n - 1))
+
+        return np.where(valid, delta, np.inf)
+
+    def __permutations(self, moves, i, j, length, k):
+        # index arrays applying the moves, new_tour = tour[permutation]
+        p = np.arange(self.n)[None, :]
+        i, j, length, k = i[:, None], j[:, None], length[:, None], k[:, None]
+        e = i + length - 1
+
+        swap = np.where(p == i, j, np.where(p == j, i, p))
+        reverse = np.where((p >= i) & (p <= j), i + j - p, p)
+        forward = np.where((p >= i) & (p < i + k - e), p + length,
+                           np.where((p >= i + k - e) & (p <= k), p - (k - e), p))
+        backward = np.where((p > k) & (p <= k + length), p - (k + 1) + i,
+                            np.where((p > k + length) & (p <= e), p - length, p))
+        or_opt = np.where(k > e, forward, backward)
+
+        return np.choose(moves[:, None], [swap, reverse, or_opt])
+
+    def __sample_moves(self, tours, prefix):
+        num_replicas = len(tours)
+        rows = np.arange(num_replicas)
+        moves = self.rng.integers(0, 3, num_replicas)
+
+        i, j = self.__sample_pairs(num_replicas)
+        max_length = min(3, self.n - self.first - 1)
+        length = self.rng.integers(1, max_length + 1, num_replicas)
+        segment = self.rng.integers(self.first, self.n - length + 1)
+        k = self.rng.integers(self.first - 1, self.n, num_replicas)
+
+        deltas = np.choose(moves, [self.__swap(tours, rows, i, j), self.__reverse(tours, rows, i, j, prefix),
+                                   self.__or_opt(tours, rows, segment, length, k)])
+        first = np.where(moves == 2, segment, i)
+
+        return deltas, moves, first, j, length, k
+
+    def __get_temperatures(self, tours, prefix):
+        # the initial temperature accepts half of the average uphill moves, the final one almost none of them
+        deltas = self.__sample_moves(tours, prefix)[0]
+        uphill = deltas[np.isfinite(deltas) & (deltas > 0)]
+        initial = uphill.mean() / np.log(2) if len(uphill) > 0 else 1.0
+
+        return np.geomspace(initial, initial * min_temperature_ratio, self.num_sweeps * self.n)
+
+    def anneal(self, num_replicas):
+        tours = self.__init_tours(num_replicas)
+        if self.n - self.first < 3:
+            return tours, self.get_costs(tours)
+
+        costs = self.get_costs(tours)
+        prefix = self.__get_prefix(tours)
+        best_tours, best_costs = tours.copy(), costs.copy()
+
+        for temperature in self.__get_temperatures(tours, prefix):
+            deltas, moves, i, j, length, k = self.__sample_moves(tours, prefix)
+
+            with np.errstate(over='ignore'):
+                accepted = (deltas <= 0) | (self.rng.random(num_replicas) < np.exp(-deltas / temperature))
+            accepted &= np.isfinite(deltas)
+            if not accepted.any():
+                continue
+
+            permutations = self.__permutations(moves[accepted], i[accepted], j[accepted], length[accepted],
+                                               k[accepted])
+            tours[accepted] = np.take_along_axis(tours[accepted], permutations, axis=1)
+            costs[accepted] += deltas[accepted]
+            # O(n) for each accepted replica, the only step that is not O(1) on the asymmetric instances
+            if not self.symmetric:
+                prefix[accepted] = self.__get_prefix(tours[accepted])
+
+            improved = costs < best_costs
+            best_tours[improved] = tours[improved]
+            best_costs[improved] = costs[improved]
+
+        # the costs are evaluated again on the tours to drop the rounding accumulated by the deltas
+        return best_tours, self.get_costs(best_tours)
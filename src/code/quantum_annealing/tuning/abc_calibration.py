@@ -0,0 +1,107 @@
+"""
+Analytic calibration of the normalization factors A, B and C from the statistics of the instance, used as the default
+normalization of the QUBO so that a new instance does not need any sweep. With A fixed, the factors are written through
+the two fractions t_C and t_B of the bounds of the A, B and C tuning:
+                                    C = t_C * A / max(Q_v - Q_u)^2
+                                    B = t_B * C / max(D_uv)
+so that 0 < C * max(Q_v - Q_u)^2 < A and 0 < B * max(D_uv) < C hold for every 0 < t_C, t_B < 1. The fractions are
+chosen on a grid to minimize the dynamic range of the problem on the QPU:
+    (i) the Ising h and J of H_A, H_B and H_C are computed once, those of every (A, B, C) are their linear combination,
+        and the QPU scales them by the largest ratio between a bias and the bound of its h_range or j_range
+    (ii) the two smallest gaps that the QPU has to resolve are the lightest edge of the objective, min W_uv, and the
+         margin of the constraints over the heaviest one, A - max W_uv, with W_uv = B * D_uv + C * (Q_v - Q_u)^2
+    (iii) the dynamic range is the ratio between the bound of the QPU and the smaller of the two gaps once scaled, the
+          fractions with the lowest one are kept
+"""
+
+import numpy as np
+
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+
+default_h_range = [-4.0, 4.0]
+default_j_range = [-1.0, 1.0]
+default_a = 1.0
+grid_fractions = np.linspace(0.05, 0.95, 19)
+grid_batch_size = 16
+
+
+def __get_ising(components):
+    # h and J of each component on the common variables and couplers, the rows follow the order of the weights
+    variables = list(components['A'].variables)
+    vectors = [components[key].spin.to_numpy_vectors(variable_order=variables) for key in ['A', 'B', 'C']]
+
+    # couplers identified by their ordered couple of indices, so that the couplers of the components can be aligned
+    keys = [np.minimum(rows, cols) * len(variables) + np.maximum(rows, cols) for _, (rows, cols, _), _ in vectors]
+    couplers = np.unique(np.concatenate(keys))
+
+    h = np.stack([linear for linear, _, _ in vectors])
+    J = np.zeros((len(vectors), len(couplers)))
+    for row, (key, (_, (_, _, quadratic), _)) in enumerate(zip(keys, vectors)):
+        np.add.at(J[row], np.searchsorted(couplers, key), quadratic)
+
+    return h, J
+
+
+def __get_scales(weights, h, J, h_range, j_range):
+    # the QPU divides the biases by the largest ratio to the bounds of the ranges, the grid is processed in batches
+    scales = []
+    for start in range(0, len(weights), grid_batch_size):
+        batch_h = weights[start:start + grid_batch_size] @ h
+        batch_J = weights[start:start + grid_batch_size] @ J
+        scales.append(np.maximum.reduce([batch_h.max(axis=1) / h_range[1], batch_h.min(axis=1) / h_range[0],
+                                         batch_J.max(axis=1) / j_range[1], batch_J.min(axis=1) / j_range[0]]))
+
+    return np.concatenate(scales)
+
+
+def calibrate_norm_dict(D_matrix, Q_array, fixed_start=None, adjacency=None, properties=None, A=default_a):
+    if Q_array is None:
+        raise Exception('Calibration of the normalization factors requires the charges')
+
+    D_matrix = np.asarray(D_matrix, dtype=float)
+    h_range = default_h_range if properties is None else properties['h_range']
+    j_range = default_j_range if properties is None else properties['j_range']
+
+    # only the durations and the charges of the edges that can be part of a tour are considered
+    edges = ~np.eye(D_matrix.shape[0], dtype=bool)
+    if adjacency is not None:
+        edges &= np.asarray(adjacency, dtype=bool)
+    durations = D_matrix[edges]
+    charges = (np.asarray(Q_array, dtype=float)[None, :] - np.asarray(Q_array, dtype=float)[:, None]) ** 2
+    max_charge = charges[edges].max()
+    max_duration = durations.max()
+    if max_charge <= 0 or max_duration <= 0:
+        raise Exception('Calibration of the normalization factors requires distinct durations and charges')
+
+    t_c, t_b = [grid.ravel() for grid in np.meshgrid(grid_fractions, grid_fractions, indexing='ij')]
+    C = t_c * A / max_charge
+    B = t_b * C / max_duration
+    weights = np.stack([np.full(len(C), float(A)), B, C], axis=1)
+
+    # lightest edge and margin of the constraints over the heaviest one, also the closing edges weighted only by B
+    W = B[:, None] * durations + C[:, None] * charges[edges]
+    W_wrap = B[:, None] * durations
+    lightest = np.where(W > 0, W, np.inf).min(axis=1)
+    lightest = np.minimum(lightest, np.where(W_wrap > 0, W_wrap, np.inf).min(axis=1))
+    margin = A - np.maximum(W.max(axis=1), W_wrap.max(axis=1))
+
+    # both gaps are QUBO coefficients, hence a quarter of them reaches the J of the Ising problem
+    h, J = __get_ising(QuboBuilder(D_matrix, Q_array, fixed_start, adjacency).get_components())
+    # the scales vanish only when A does, then the check below reports it
+    with np.errstate(divide='ignore', invalid='ignore'):
+        resolution = np.minimum(lightest, margin) / 4 / __get_scales(weights, h, J, h_range, j_range)
+    resolution[margin <= 0] = 0.0
+    best = int(np.argmax(resolution))
+
+    # without a positive margin on the grid the constraints cannot dominate the objective for any fractions
+    if not resolution[best] > 0:
+        heaviest = max(np.maximum(W.max(axis=1), W_wrap.max(axis=1)).min(), 0.0)
+        raise ValueError('A = {} is too small to calibrate the normalization factors of the instance, the constraints '
+                         'have a positive margin only for A > {:.6g}'.format(A, heaviest))
+
+    norm_dict = {'A_Normalization': float(A), 'B_Normalization': float(B[best]), 'C_Normalization': float(C[best])}
+    print("Calibrated normalization factors A = {}, B = {:.6g}, C = {:.6g}, dynamic range {:.1f}".format(
+        norm_dict['A_Normalization'], norm_dict['B_Normalization'], norm_dict['C_Normalization'],
+        min(abs(bound) for bound in j_range) / resolution[best]))
+
+    return norm_dict
@@ -0,0 +1,72 @@
+"""
+Classical prescreening of the normalization dicts of the A, B and C tuning. The weights shape the landscape of the QUBO
+much more than they depend on the hardware, hence most of the candidates can be discarded without spending QPU time:
+    (i) H_A, H_B and H_C of the instance are built once and shipped once to each worker through the initializer of the
+        pool, every candidate only reweighs them into its own BQM
+    (ii) all the candidates are annealed at the same time across a process pool with neal, each one with its own seed
+         generated by a SeedSequence
+    (iii) the samples are decoded and evaluated on the real LTSP objective with the reference dict, so that the tour
+          costs of the candidates are comparable even though their energies are not
+
+The candidates are ranked by feasible rate and then by the cost of their best tour, and only the first ones are sent
+to the QPU.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from neal import SimulatedAnnealingSampler
+
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+from src.code.quantum_annealing.parallel_sa import get_seeds
+from src.code.quantum_annealing.results.result import Result
+
+prescreen_reads = 1000
+num_qpu_candidates = 3
+
+worker_components = None
+worker_encoding = None
+worker_instance = None
+
+
+def init_worker(components, encoding, instance):
+    global worker_components, worker_encoding, worker_instance
+    worker_components = components
+    worker_encoding = encoding
+    worker_instance = instance
+
+
+def screen_candidate(norm_dict, num_reads, seed):
+    bqm = QuboBuilder.weigh_components(worker_components, norm_dict)
+    response = SimulatedAnnealingSampler().sample(bqm, num_reads=num_reads, seed=seed)
+
+    result = Result(response, False, worker_encoding)
+    result.evaluate(*worker_instance)
+
+    return result.get_feasible_rate(), result.get_best_cost()
+
+
+def rank_candidates(scores):
+    # higher feasible rate first, then lower tour cost, the candidates without any tour are the last ones
+    return sorted(range(len(scores)), key=lambda i: (-scores[i][0], np.inf if np.isnan(scores[i][1]) else scores[i][1]))
+
+
+def prescreen_dicts(norm_dicts, components, encoding, D_matrix, Q_array, reference_dict, num_workers=None,
+                    num_reads=prescreen_reads, num_candidates=num_qpu_candidates, seed=None):
+    instance = (D_matrix, Q_array, reference_dict)
+    seeds = get_seeds(seed, len(norm_dicts))
+
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker,
+                             initargs=(components, encoding, instance)) as executor:
+        futures = [executor.submit(screen_candidate, norm_dict, num_reads, candidate_seed)
+                   for norm_dict, candidate_seed in zip(norm_dicts, seeds)]
+        scores = [future.result() for future in futures]
+
+    ranking = rank_candidates(scores)
+    for i in ranking:
+        print("Prescreen A = {}, B = {}, C = {}: Feasible Rate {:.4f}, Best Cost {:.6f}".format(
+            norm_dicts[i]['A_Normalization'], norm_dicts[i]['B_Normalization'], norm_dicts[i]['C_Normalization'],
+            scores[i][0], scores[i][1]))
+
+    # the selected dicts keep the order in which they were generated
+    return [norm_dicts[i] for i in sorted(ranking[:num_candidates])]
@@ -12,13 +12,20 @@ import numpy as np
 import math
 import random
 
-from src.code.quantum_annealing.hamiltonian_builder import HamiltonianBuilder
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+from src.code.quantum_annealing.qubo_cache import QuboCache
 from src.code.quantum_annealing.QPU_model import QPU_Model
 from src.dataset.parse_experiments import get_embedding
 from src.code.quantum_annealing.performance.results_performance import dicts_comparer
+from src.code.quantum_annealing.tuning.tuning_journal import TuningJournal
+from src.code.quantum_annealing.tuning.abc_prescreen import prescreen_dicts
 
 num_samples = 5
 np_num_reads = 5000
+# with the prescreen the dicts are first ranked by simulated annealing and only the best ones are executed on the QPU,
+# the results of the QPU are then ranked in the same way, by feasible rate and cost of the best tour
+sa_prescreen = True
+prescreen_workers = 8
 
 
 """
@@ -43,30 +50,63 @@ Then we should try to automatize also the choice of A, we avoid it for now to fi
 """
 
 
-def __build_hamiltonian(distance_matrix, charge_array, norm_dict):
-    hamiltonian_with_charge = HamiltonianBuilder(distance_matrix, charge_array)
-    H_with_charge = hamiltonian_with_charge.get_hamiltonian(norm_dict)
+def __build_components(distance_matrix, charge_array):
+    # H_A, H_B and H_C are built once per instance, every normalization dict only reweighs them
+    hamiltonian_with_charge = QuboBuilder(distance_matrix, charge_array)
+    components = hamiltonian_with_charge.get_components()
 
-    return H_with_charge
+    return components, hamiltonian_with_charge.get_encoding()
 
 
-def __execute_exp(tuning_mode, exp, distance_matrix, charge_array, client_conf, norm_dict):
-    hamiltonian = __build_hamiltonian(distance_matrix, charge_array, norm_dict)
-    exp_model = QPU_Model(hamiltonian, client_conf, get_embedding())
-    exp_res = exp_model.solve(np_num_reads, exp.qpu_experiment.chain_strength,
-                              'normalization parameters fine tuning starting from ' + tuning_mode +
-                              ' num_reads = ' + str(np_num_reads),
-                              do_print=False)
+def __execute_exp(tuning_mode, exp, components, encoding, instance, client_conf, norm_dict, reference_dict, journal):
+    hamiltonian = QuboBuilder.weigh_components(components, norm_dict)
+    exp_model = QPU_Model(hamiltonian, client_conf, get_embedding(), False, encoding)
+    # the tours of every dict are evaluated with the reference dict, so that their costs are comparable
+    exp_model.set_instance(*instance, reference_dict)
+    label = 'normalization parameters fine tuning starting from ' + tuning_mode + ' num_reads = ' + str(np_num_reads)
+
+    # the dicts already sampled by an interrupted tuning are loaded from the journal
+    exp_response = journal.sample(norm_dict, np_num_reads,
+                                  lambda: exp_model.sample(np_num_reads, exp.qpu_experiment.chain_strength, label))
+    exp_res = exp_model.build_result(exp_response, False)
 
     return exp_res
 
 
-def __compare_results_on_norm_dicts(mode, results_dicts, mode_parameters):
-    best_index = dicts_comparer(mode, results_dicts, mode_parameters)
+def __compare_results_on_norm_dicts(mode, results_dicts, mode_parameters, num_nodes):
+    best_index = dicts_comparer(mode, results_dicts, mode_parameters, num_nodes)
 
     return (results_dicts[1])[best_index]
 
 
+def __execute_dicts(tuning_mode, exp, components, encoding, instance, client_conf, def_norm_dict, tuned_dicts,
+                    journal):
+    results_dicts = []
+
+    # build hamiltonian and execute model for default dict
+    exp_res = __execute_exp(tuning_mode, exp, components, encoding, instance, client_conf, def_norm_dict,
+                            def_norm_dict, journal)
+    results_dicts.append([exp_res])
+    results_dicts.append([np.array(list(def_norm_dict.values()))])
+
+    # the selected dicts are kept in the journal, a resumed tuning does not prescreen again
+    if sa_prescreen:
+        tuned_dicts = journal.get_configs(lambda: prescreen_dicts(tuned_dicts, components, encoding, *instance,
+                                                                  def_norm_dict, num_workers=prescreen_workers),
+                                          'prescreen')
+
+    for tuned_dict in tuned_dicts:
+        # once we have A, B and C we build the hamiltonian and execute the model
+        tuned_res = __execute_exp(tuning_mode, exp, components, encoding, instance, client_conf, tuned_dict,
+                                  def_norm_dict, journal)
+
+        # now we can append result and dict to the double array
+        results_dicts[0].append(tuned_res)
+        results_dicts[1].append(np.array(list(tuned_dict.values())))
+
+    return results_dicts
+
+
 # Methods for tuning normalization hyperparameters starting from the value present in the default dict
 
 
@@ -105,34 +145,25 @@ def __get_random_bs_cs(default_a, max_W, max_Q):
     return bs_cs
 
 
-def __fine_tune_a(exp, distance_matrix, charge_array, client_conf, def_norm_dict, default_a, max_W, max_Q):
-    results_dicts = []
-
-    # build hamiltonian and execute model for default dict
-    exp_res = __execute_exp('A', exp, distance_matrix, charge_array, client_conf, def_norm_dict)
-    results_dicts.append([exp_res])
-    results_dicts.append([np.array(list(def_norm_dict.values()))])
+def __fine_tune_a(exp, components, encoding, instance, client_conf, def_norm_dict, default_a, max_W, max_Q, journal):
+    tuned_dicts = []
 
-    # for every couple of B and C generated we set the dictionary and execute the model
-    bs_cs = __get_random_bs_cs(default_a, max_W, max_Q)
+    # for every couple of B and C generated we set the dictionary
+    bs_cs = journal.get_configs(lambda: __get_random_bs_cs(default_a, max_W, max_Q))
     for i in range(len(bs_cs[0])):
         B = (bs_cs[0])[i]
         C = (bs_cs[1])[i]
 
-        tuned_dict = {
+        tuned_dicts.append({
             'A_Normalization': default_a,
             'B_Normalization': B,
             'C_Normalization': C
-        }
-
-        # once we have A, B and C we build the hamiltonian and execute the model
-        tuned_res = __execute_exp('A', exp, distance_matrix, charge_array, client_conf, tuned_dict)
-
-        # now we can append result and dict to the double array
-        results_dicts[0].append(tuned_res)
-        results_dicts[1].append(np.array(list(tuned_dict.values())))
+        })
 
-    best_dict = __compare_results_on_norm_dicts('A', results_dicts, default_a)
+    # the default dict and the tuned ones are executed on the QPU
+    results_dicts = __execute_dicts('A', exp, components, encoding, instance, client_conf, def_norm_dict, tuned_dicts,
+                                    journal)
+    best_dict = __compare_results_on_norm_dicts('A', results_dicts, default_a, exp.num_nodes)
 
     return best_dict
 
@@ -149,33 +180,24 @@ def __init_b(default_b):
     return b_list
 
 
-def __fine_tune_b(exp, distance_matrix, charge_array, client_conf, def_norm_dict, random_bs, max_W, max_Q):
-    results_dicts = []
-
-    # build hamiltonian and execute model for default dict
-    exp_res = __execute_exp('B', exp, distance_matrix, charge_array, client_conf, def_norm_dict)
-    results_dicts.append([exp_res])
-    results_dicts.append([np.array(list(def_norm_dict.values()))])
+def __fine_tune_b(exp, components, encoding, instance, client_conf, def_norm_dict, random_bs, max_W, max_Q, journal):
+    tuned_dicts = []
 
-    # for every B in random_bs compute A and C and execute the model
+    # for every B in random_bs compute A and C
     for B in random_bs:
         C = B * max_W * 100
         A = C * max_Q
 
-        tuned_dict = {
+        tuned_dicts.append({
             'A_Normalization': A,
             'B_Normalization': B,
             'C_Normalization': C
-        }
-
-        # once we have A, B and C we build the hamiltonian and execute the model
-        tuned_res = __execute_exp('B', exp, distance_matrix, charge_array, client_conf, tuned_dict)
-
-        # now we can append result and dict to the double array
-        results_dicts[0].append(tuned_res)
-        results_dicts[1].append(np.array(list(tuned_dict.values())))
+        })
 
-    best_dict = __compare_results_on_norm_dicts('B', results_dicts, random_bs)
+    # the default dict and the tuned ones are executed on the QPU
+    results_dicts = __execute_dicts('B', exp, components, encoding, instance, client_conf, def_norm_dict, tuned_dicts,
+                                    journal)
+    best_dict = __compare_results_on_norm_dicts('B', results_dicts, random_bs, exp.num_nodes)
 
     return {'A_Normalization': best_dict[0], 'B_Normalization': best_dict[1], 'C_Normalization': best_dict[2]}
 
@@ -187,15 +209,26 @@ def tune_norm_parameters_abc(mode, exp, def_norm_dict, distance_matrix, charge_a
     min_charge = np.amin(charge_array)
     max_Q = (max_charge - min_charge)**2
 
+    # the hamiltonians do not depend on the normalization factors, hence they are compiled only once
+    components, encoding = __build_components(distance_matrix, charge_array)
+    instance = (distance_matrix, charge_array)
+
+    # the random B and C are kept in the journal, so that an interrupted tuning resumes on the same ones
+    journal = TuningJournal('norm_abc_' + mode, {'instance': QuboCache.get_key(distance_matrix, charge_array,
+                                                                               def_norm_dict),
+                                                 'chain_strength': exp.qpu_experiment.chain_strength,
+                                                 'num_reads': np_num_reads})
+
     if mode == 'A':
         default_a = def_norm_dict['A_Normalization']
-        tuned_dict = __fine_tune_a(exp, distance_matrix, charge_array, client_conf, def_norm_dict, default_a, max_W,
-                                   max_Q)
+        tuned_dict = __fine_tune_a(exp, components, encoding, instance, client_conf, def_norm_dict, default_a, max_W,
+                                   max_Q, journal)
     else:
         # randomly initialize B
         default_b = def_norm_dict['B_Normalization']
-        random_bs = __init_b(default_b)
-        tuned_dict = __fine_tune_b(exp, distance_matrix, charge_array, client_conf, def_norm_dict, random_bs, max_W,
-                                   max_Q)
+        random_bs = journal.get_configs(lambda: __init_b(default_b))
+        tuned_dict = __fine_tune_b(exp, components, encoding, instance, client_conf, def_norm_dict, random_bs, max_W,
+                                   max_Q, journal)
+    journal.report()
 
     return tuned_dict
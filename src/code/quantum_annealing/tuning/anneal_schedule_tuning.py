@@ -28,11 +28,16 @@ from bokeh.io import reset_output
 from bokeh.layouts import gridplot
 from bokeh.plotting import figure, show
 from src.code.quantum_annealing.QPU_model import QPU_Model
-from dwave.system.composites import EmbeddingComposite
 from src.code.quantum_annealing.performance.results_performance import anneal_comparer
-from src.code.quantum_annealing.results.result import Result
+from src.code.quantum_annealing.tuning.sweep_executor import run_sweep
+from src.code.quantum_annealing.tuning.successive_halving import run_successive_halving
+from src.code.quantum_annealing.tuning.tuning_journal import TuningJournal, get_bqm_hash
+from src.code.quantum_annealing.tuning.schedule_engine import get_max_slope, get_pause_schedules, \
+    get_quench_schedules, get_pause_quench_schedules, select_schedules
 
 as_num_reads = 2000
+# with adaptive reads the schedules are pruned by successive halving instead of all receiving as_num_reads
+adaptive_reads = True
 plot_schedules = False
 testing = False
 
@@ -49,7 +54,7 @@ else:
 
 
 def get_annealing_slope(annealing_time_range):
-    max_slope = 1.0 / annealing_time_range[0]
+    max_slope = get_max_slope(annealing_time_range)
     print("Annealing time range: {}".format(annealing_time_range))
     print("Maximum slope:", max_slope)
     return max_slope
@@ -90,143 +95,104 @@ def __compare_results_on_anneal_schedule(num_nodes, results_schedules, anneal_mo
     return (results_schedules[1])[best_index]
 
 
-def __get_pause_schedule(model: QPU_Model, num_points, s_low, s_high):
-    results_schedules = []
-    sampler_embedded = EmbeddingComposite(model.sampler)
+def __sample_schedules(model: QPU_Model, sweep, label):
+    sampler_embedded = model.get_embedded_sampler()
     BQM = model.BQM
-    pause_start = np.linspace(s_low, s_high, num=num_points)
+    journal = TuningJournal('anneal_schedule', {'label': label, 'bqm': get_bqm_hash(BQM), 'sweep': sweep,
+                                                'adaptive_reads': adaptive_reads})
+
+    # every job goes through the journal, the ones already sampled by an interrupted tuning are loaded from it
+    def submit(schedule, num_reads):
+        return journal.sample(schedule, num_reads,
+                              lambda: sampler_embedded.sample(BQM, anneal_schedule=schedule, num_reads=num_reads,
+                                                              answer_mode='raw', label=label,
+                                                              num_spin_reversal_transforms=1))
+
+    if adaptive_reads:
+        results = run_successive_halving(sweep, submit, lambda response: model.build_result(response, False),
+                                         as_num_reads)
+    else:
+        results = run_sweep(sweep, lambda schedule: submit(schedule, as_num_reads),
+                            lambda response: model.build_result(response, False))
+    journal.report()
+
+    return results
 
+
+def __plot_schedules(family, get_title):
+    # one row of the grid for each anneal time, get_title(anneal, parameter) gives the title of each schedule
     schedules = []
-    first = True
-    for anneal in anneal_time:
+    for a, anneal in enumerate(anneal_time):
         an_schedules = []
-        for pause in pause_duration:
-            for start in pause_start:
-                schedule = [[0.0, 0.0], [start * anneal, start], [start * anneal + pause, start], [anneal + pause, 1.0]]
-                response = sampler_embedded.sample(BQM, anneal_schedule=schedule, num_reads=as_num_reads,
-                                                   answer_mode='raw',
-                                                   label='Anneal Schedule Pause Tuning - num_reads = ' +
-                                                         str(as_num_reads),
-                                                   num_spin_reversal_transforms=1)
-                result = Result(response, False)
-                if first:
-                    results_schedules.append([result])
-                    results_schedules.append([schedule])
-
-                    first = False
-                else:
-                    results_schedules[0].append(result)
-                    results_schedules[1].append(schedule)
-
-                if plot_schedules:
-                    p = figure(title=f"Anneal Schedule of Time={anneal} with Pause={pause}", x_axis_label='Time [us]',
-                               y_axis_label='Annealing Parameter s')
-                    p.line(*np.array(schedule).T)
-                    an_schedules.append(p)
+        for k in range(family.shape[1]):
+            for schedule in family[a, k]:
+                p = figure(title=get_title(anneal, k), x_axis_label='Time [us]', y_axis_label='Annealing Parameter s')
+                p.line(*schedule.T)
+                an_schedules.append(p)
 
         schedules.append(an_schedules)
 
+    grid = gridplot(schedules)
+    show(grid)
+    reset_output()
+
+
+def __select_schedules(model: QPU_Model, family):
+    # only the distinct schedules satisfying the rules of the solver are sampled
+    return select_schedules(family, model.get_sampler_properties('annealing_time_range'),
+                            model.get_sampler_properties('max_anneal_schedule_points'))
+
+
+def __get_pause_schedule(model: QPU_Model, num_points, s_low, s_high):
+    pause_start = np.linspace(s_low, s_high, num=num_points)
+
+    # the schedules of the sweep are generated and validated first and then sampled concurrently
+    family = get_pause_schedules(anneal_time, pause_duration, pause_start)
+
     if plot_schedules:
-        grid = gridplot(schedules)
-        show(grid)
-        reset_output()
+        __plot_schedules(family, lambda anneal, k: f"Anneal Schedule of Time={anneal} with Pause={pause_duration[k]}")
 
-    return results_schedules
+    sweep = __select_schedules(model, family)
+    label = 'Anneal Schedule Pause Tuning - num_reads = ' + str(as_num_reads)
+    results = __sample_schedules(model, sweep, label)
+
+    return [results, sweep]
 
 
 def __get_quench_schedule(model, num_points, s_low, s_high):
-    results_schedules = []
-    sampler_embedded = EmbeddingComposite(model.sampler)
-    BQM = model.BQM
     quench_start = np.linspace(s_low, s_high, num=num_points)
 
-    schedules = []
-    first = True
-    for anneal in anneal_time:
-        an_schedules = []
-        for quench in quench_slopes:
-            for start in quench_start:
-                schedule = [[0.0, 0.0], [start * anneal, start], [(1 - start + quench * start * anneal) / quench, 1.0]]
-                response = sampler_embedded.sample(BQM, anneal_schedule=schedule, num_reads=as_num_reads,
-                                                   answer_mode='raw',
-                                                   label='Anneal Schedule Quench Tuning - num_reads = ' +
-                                                         str(as_num_reads),
-                                                   num_spin_reversal_transforms=1)
-                result = Result(response, False)
-                if first:
-                    results_schedules.append([result])
-                    results_schedules.append([schedule])
-
-                    first = False
-                else:
-                    results_schedules[0].append(result)
-                    results_schedules[1].append(schedule)
-
-                if plot_schedules:
-                    p = figure(title=f"Anneal Schedule of Time={anneal} with Quench={quench}", x_axis_label='Time [us]',
-                               y_axis_label='Annealing Parameter s')
-                    p.line(*np.array(schedule).T)
-                    an_schedules.append(p)
-
-        schedules.append(an_schedules)
+    # the schedules of the sweep are generated and validated first and then sampled concurrently
+    family = get_quench_schedules(anneal_time, quench_slopes, quench_start)
 
     if plot_schedules:
-        grid = gridplot(schedules)
-        show(grid)
-        reset_output()
+        __plot_schedules(family, lambda anneal, k: f"Anneal Schedule of Time={anneal} with Quench={quench_slopes[k]}")
+
+    sweep = __select_schedules(model, family)
+    label = 'Anneal Schedule Quench Tuning - num_reads = ' + str(as_num_reads)
+    results = __sample_schedules(model, sweep, label)
 
-    return results_schedules
+    return [results, sweep]
 
 
 def __get_pause_quench_schedule(model, num_points, s_low, s_high):
-    results_schedules = []
-    sampler_embedded = EmbeddingComposite(model.sampler)
-    BQM = model.BQM
     pause_quench_start = np.linspace(s_low, s_high, num=num_points)
 
     # delta_s specifies the difference between s0 and s1
     delta_s = 0.2
 
-    schedules = []
-    first = True
-    for anneal in anneal_time:
-        an_schedules = []
-        for pause, quench in zip(pause_duration, quench_fast_slopes):
-            for start in pause_quench_start:
-                s0 = start
-                s1 = start + delta_s
-                schedule = [[0.0, 0.0], [s0 * anneal, s0], [s0 * anneal + pause, s0], [2 * s0 * anneal + pause, s1],
-                            [(1 - s1 + quench * (2 * s0 * anneal + pause)) / quench, 1.0]]
-                response = sampler_embedded.sample(BQM, anneal_schedule=schedule, num_reads=as_num_reads,
-                                                   answer_mode='raw',
-                                                   label='Anneal Schedule Pause&Quench Tuning - num_reads = ' +
-                                                         str(as_num_reads),
-                                                   num_spin_reversal_transforms=1)
-                result = Result(response, False)
-                if first:
-                    results_schedules.append([result])
-                    results_schedules.append([schedule])
-
-                    first = False
-                else:
-                    results_schedules[0].append(result)
-                    results_schedules[1].append(schedule)
-
-                if plot_schedules:
-                    p = figure(title=f"Anneal Schedule of Time={anneal} with Pause={pause} and Quench={quench}",
-                               x_axis_label='Time [us]',
-                               y_axis_label='Annealing Parameter s')
-                    p.line(*np.array(schedule).T)
-                    an_schedules.append(p)
-
-        schedules.append(an_schedules)
+    # the schedules of the sweep are generated and validated first and then sampled concurrently
+    family = get_pause_quench_schedules(anneal_time, pause_duration, quench_fast_slopes, pause_quench_start, delta_s)
 
     if plot_schedules:
-        grid = gridplot(schedules)
-        show(grid)
-        reset_output()
+        __plot_schedules(family, lambda anneal, k: f"Anneal Schedule of Time={anneal} with Pause={pause_duration[k]} "
+                                                   f"and Quench={quench_fast_slopes[k]}")
+
+    sweep = __select_schedules(model, family)
+    label = 'Anneal Schedule Pause&Quench Tuning - num_reads = ' + str(as_num_reads)
+    results = __sample_schedules(model, sweep, label)
 
-    return results_schedules
+    return [results, sweep]
 
 
 def tune_anneal_schedule(model: QPU_Model, pause_or_quench, num_nodes, num_points, s_low, s_high):
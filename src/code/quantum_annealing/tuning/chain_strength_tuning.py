@@ -11,17 +11,32 @@ import random
 from dwave.embedding.chain_strength import uniform_torque_compensation
 from src.code.quantum_annealing.QPU_model import QPU_Model
 from src.code.quantum_annealing.performance.results_performance import chain_comparer
-from dwave.system import EmbeddingComposite, DWaveSampler
+from src.code.quantum_annealing.tuning.sweep_executor import run_sweep
+from src.code.quantum_annealing.tuning.successive_halving import run_successive_halving
+from src.code.quantum_annealing.tuning.tuning_journal import TuningJournal, get_bqm_hash
 
 cs_num_reads = 5000
+# with adaptive reads the chain strengths are pruned by successive halving instead of all receiving cs_num_reads
+adaptive_reads = True
 
 
-def tune_chain_strength(model, exp_chain_strength, num_nodes, client_conf):
+def __get_prefactors():
     int_list = random.sample(range(100, 250), 10)
     prefactor_list = [x/1000 for x in int_list]
     prefactor_list.insert(0, 1.414)     # insert default prefactor
 
-    chain_strength = __fine_tune(model, num_nodes, client_conf, exp_chain_strength, prefactor_list)
+    return prefactor_list
+
+
+def tune_chain_strength(model, exp_chain_strength, num_nodes, client_conf):
+    # the random prefactors are kept in the journal, so that an interrupted tuning resumes on the same ones
+    journal = TuningJournal('chain_strength', {'num_nodes': num_nodes, 'bqm': get_bqm_hash(model.BQM),
+                                               'chain_strength': exp_chain_strength, 'num_reads': cs_num_reads,
+                                               'adaptive_reads': adaptive_reads})
+    prefactor_list = journal.get_configs(__get_prefactors)
+
+    chain_strength = __fine_tune(model, num_nodes, client_conf, exp_chain_strength, prefactor_list, journal)
+    journal.report()
 
     return chain_strength
 
@@ -32,33 +47,33 @@ def __compare_results_on_chain_strength(results_strengths, prefactor_list, num_n
     return (results_strengths[1])[best_index]
 
 
-def __fine_tune(model: QPU_Model, num_nodes, client_conf, exp_chain_strength, prefactor_list):
+def __fine_tune(model: QPU_Model, num_nodes, client_conf, exp_chain_strength, prefactor_list, journal):
     # chain strength tuning is done on chain strength obtained in this order:
     # 1) Chain strength from experiment
     # 2) Chain strength obtained with torque with default prefactor
     # 3) Chain strenghts obtained with torque and random prefactors
-    results_strengths = []
     BQM = model.BQM
+    # the stored embedding only with the fixed composite, the torque compensation works on the BQM also without it
+    embedding = model.get_embedding()
+    label = 'chain_strength fine tuning, num_reads = ' + str(cs_num_reads)
 
-    # first of all we add the result corresponding to the chain strength present in the experiment
-    exp_res = model.solve(cs_num_reads, exp_chain_strength, 'chain_strength fine tuning, num_reads = ' +
-                          str(cs_num_reads), do_print=False)
-    results_strengths.append([exp_res])
-    results_strengths.append([exp_chain_strength])
-
-    # for each prefactor we get a chain strength, execute the model and after comparing all the models we keep the chain
-    # that corresponds to the model which returned the best result
+    # for each prefactor we get a chain strength, all the chain strengths are sampled concurrently and after comparing
+    # all the models we keep the chain that corresponds to the model which returned the best result
+    chain_strengths = [exp_chain_strength]
     for prefactor in prefactor_list:
-        chain_strength = uniform_torque_compensation(BQM,
-                                                     embedding=EmbeddingComposite(
-                                                         DWaveSampler(config_file=client_conf['config_path'],
-                                                                      profile=client_conf['profile'])),
-                                                     prefactor=prefactor)
-        res_p = model.solve(cs_num_reads, chain_strength, 'chain_strength fine tuning, num_reads = ' +
-                            str(cs_num_reads), do_print=False)
-
-        results_strengths[0].append(res_p)
-        results_strengths[1].append(chain_strength)
+        chain_strengths.append(uniform_torque_compensation(BQM, embedding=embedding, prefactor=prefactor))
+
+    # every job goes through the journal, the ones already sampled by an interrupted tuning are loaded from it
+    def submit(chain_strength, num_reads):
+        return journal.sample(chain_strength, num_reads, lambda: model.sample(num_reads, chain_strength, label))
+
+    if adaptive_reads:
+        results = run_successive_halving(chain_strengths, submit, lambda response: model.build_result(response, False),
+                                         cs_num_reads)
+    else:
+        results = run_sweep(chain_strengths, lambda chain_strength: submit(chain_strength, cs_num_reads),
+                            lambda response: model.build_result(response, False))
+    results_strengths = [results, chain_strengths]
 
     best_strength = __compare_results_on_chain_strength(results_strengths, prefactor_list, num_nodes)
 
@@ -0,0 +1,174 @@
+"""
+Joint tuning of the chain strength and of the anneal schedule. Instead of tuning the chain strength and the schedule
+independently over fixed grids, a Gaussian process surrogate is fitted on the configurations sampled so far and new
+ones are proposed where the expected improvement is the largest. Each configuration is a point of the unit box over:
+    (i) the prefactor of the uniform torque compensation giving the chain strength
+    (ii) the anneal time T, the time to reach the pause point s_pause with the maximum annealing slope 1 / T
+    (iii) the pause point s_pause and the pause duration
+    (iv) the slope of the quench from s_pause to s = 1
+
+The schedule is [[0, 0], [s_pause T, s_pause], [s_pause T + pause, s_pause], [s_pause T + pause + quench, 1]], with
+quench = (1 - s_pause) / slope, and it is built so that it respects the rules of the solver: T is never below the
+minimum annealing time, the quench slope is never above the maximum slope and the pause is shortened so that the
+schedule ends within the annealing_time_range.
+
+The sweep starts from num_initial random configurations and then proposes batches of batch_size points, one after the
+other with the kriging believer: the surrogate is updated with its own prediction of each proposed point, so that the
+points of a batch are spread out and sampled concurrently by the sweep executor. The objective to minimize is the mean
+energy of the best tenth of the reads, smoother than the minimum energy, and the configuration returned is the one with
+the lowest objective. The whole trace is written with its objectives in the csv of the joint tuning read by
+results_writer.
+"""
+
+import numpy as np
+from scipy.stats import norm
+
+from dwave.embedding.chain_strength import uniform_torque_compensation
+from src.code.quantum_annealing.QPU_model import QPU_Model
+from src.code.quantum_annealing.performance.results_performance import joint_comparer
+from src.code.quantum_annealing.tuning.sweep_executor import run_sweep, max_in_flight
+
+jt_num_reads = 2000
+num_initial = 8
+num_evaluations = 32
+best_fraction = 0.1
+
+# bounds of the configurations: prefactor, anneal time, s_pause, pause duration, quench slope
+prefactor_bounds = [0.1, 2.0]
+anneal_time_bounds = [10.0, 200.0]
+s_pause_bounds = [0.2, 0.7]
+pause_bounds = [1.0, 100.0]
+quench_slope_bounds = [0.05, 2.0]
+
+length_scales = [0.1, 0.2, 0.3, 0.5, 1.0]
+noise = 1e-2
+num_candidates = 2000
+
+
+def matern_kernel(X1, X2, length_scale):
+    # Matern 5/2 kernel on the unit box
+    distances = np.sqrt(((X1[:, None, :] - X2[None, :, :]) ** 2).sum(axis=2)) * np.sqrt(5) / length_scale
+
+    return (1 + distances + distances ** 2 / 3) * np.exp(-distances)
+
+
+class GaussianProcess(object):
+    def __init__(self, X, y):
+        self.X = X
+        self.mean, self.std = y.mean(), y.std() if y.std() > 0 else 1.0
+        self.y = (y - self.mean) / self.std
+
+        # the length scale is the one with the largest marginal likelihood
+        self.length_scale = max(length_scales, key=self.__log_likelihood)
+        K = matern_kernel(X, X, self.length_scale) + noise * np.eye(len(X))
+        self.L = np.linalg.cholesky(K)
+        self.alpha = np.linalg.solve(self.L.T, np.linalg.solve(self.L, self.y))
+
+    def __log_likelihood(self, length_scale):
+        K = matern_kernel(self.X, self.X, length_scale) + noise * np.eye(len(self.X))
+        L = np.linalg.cholesky(K)
+        alpha = np.linalg.solve(L.T, np.linalg.solve(L, self.y))
+
+        return -0.5 * self.y @ alpha - np.log(np.diag(L)).sum()
+
+    def predict(self, X):
+        K_star = matern_kernel(X, self.X, self.length_scale)
+        mu = K_star @ self.alpha
+        v = np.linalg.solve(self.L, K_star.T)
+        sigma = np.sqrt(np.maximum(1 - (v ** 2).sum(axis=0), 1e-12))
+
+        return mu * self.std + self.mean, sigma * self.std
+
+
+def expected_improvement(mu, sigma, best):
+    z = (best - mu) / sigma
+
+    return (best - mu) * norm.cdf(z) + sigma * norm.pdf(z)
+
+
+def propose_batch(X, y, batch_size, rng):
+    X, y = X.copy(), y.copy()
+    batch = []
+    for _ in range(batch_size):
+        gp = GaussianProcess(X, y)
+        candidates = rng.random((num_candidates, X.shape[1]))
+        mu, sigma = gp.predict(candidates)
+        best = candidates[np.argmax(expected_improvement(mu, sigma, y.min()))]
+
+        # kriging believer, the proposed point is added with the value predicted by the surrogate
+        batch.append(best)
+        X = np.vstack([X, best])
+        y = np.append(y, gp.predict(best[None, :])[0])
+
+    return np.array(batch)
+
+
+def __scale(u, bounds):
+    return bounds[0] + u * (bounds[1] - bounds[0])
+
+
+def build_schedule(point, annealing_time_range):
+    max_slope = 1.0 / annealing_time_range[0]
+    anneal = max(__scale(point[1], anneal_time_bounds), annealing_time_range[0])
+    s_pause = __scale(point[2], s_pause_bounds)
+    slope = min(__scale(point[4], quench_slope_bounds), max_slope)
+
+    pause_start = s_pause * anneal
+    quench_time = (1 - s_pause) / slope
+    pause = min(__scale(point[3], pause_bounds), annealing_time_range[1] - pause_start - quench_time)
+
+    schedule = [[0.0, 0.0], [pause_start, s_pause], [pause_start + pause, s_pause],
+                [pause_start + pause + quench_time, 1.0]]
+
+    return [[float(t), float(s)] for t, s in schedule]
+
+
+def get_objective(result):
+    # occurrence weighted mean energy of the best fraction of the reads
+    order = np.argsort(result.energies, kind='stable')
+    energies, occurrences = result.energies[order], result.occurrences[order]
+    num_best = max(1, int(np.ceil(best_fraction * occurrences.sum())))
+    weights = np.minimum(occurrences, np.maximum(num_best - np.cumsum(occurrences) + occurrences, 0))
+
+    return (energies * weights).sum() / weights.sum()
+
+
+def tune_joint(model: QPU_Model, num_nodes, batch_size=max_in_flight, seed=None):
+    rng = np.random.default_rng(seed)
+    sampler_embedded = model.get_embedded_sampler()
+    BQM = model.BQM
+    embedding = model.get_embedding()
+    annealing_time_range = model.get_sampler_properties('annealing_time_range')
+    label = 'Joint Chain Strength and Anneal Schedule Tuning - num_reads = ' + str(jt_num_reads)
+
+    def get_config(point):
+        chain_strength = uniform_torque_compensation(BQM, embedding=embedding,
+                                                     prefactor=__scale(point[0], prefactor_bounds))
+
+        return chain_strength, build_schedule(point, annealing_time_range)
+
+    def submit(config):
+        return sampler_embedded.sample(BQM, chain_strength=config[0], anneal_schedule=config[1],
+                                       num_reads=jt_num_reads, answer_mode='raw', label=label)
+
+    points = rng.random((num_initial, 5))
+    explored = np.empty((0, 5))
+    configs, results, objectives = [], [], []
+    while len(configs) < num_evaluations:
+        batch = [get_config(point) for point in points]
+        batch_results = run_sweep(batch, submit, lambda response: model.build_result(response, False))
+
+        configs += batch
+        results += batch_results
+        objectives += [get_objective(result) for result in batch_results]
+
+        # the next batch is proposed by the surrogate fitted on all the configurations sampled so far
+        explored = np.vstack([explored, points])
+        size = min(batch_size, num_evaluations - len(configs))
+        if size > 0:
+            points = propose_batch(explored, np.array(objectives), size, rng)
+
+    # the csv ranks the configurations by the same objective minimized by the surrogate
+    best_index = joint_comparer([results, configs], num_nodes, objectives)
+
+    return configs[best_index]
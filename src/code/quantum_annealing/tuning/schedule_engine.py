@@ -0,0 +1,100 @@
+"""
+Vectorized generation and validation of the anneal schedules of the tuning. A family of schedules is an array of shape
+(anneal times, parameters, starts, points, 2), built at once by broadcasting instead of point by point, whose last axis
+holds the (t, s) pairs. Before the submission the schedules of a family are checked in bulk against the rules of the
+solver:
+    (i) the first point is (0, 0)
+    (ii) t increases and s does not decrease from a point to the next one
+    (iii) the final s is 1 and the final t does not exceed the maximum of the annealing_time_range property
+    (iv) there are at least 2 and at most max_anneal_schedule_points points
+    (v) the slope of each segment does not exceed the maximum slope, 1 / min(annealing_time_range)
+
+The invalid schedules, which would only waste a round trip to the solver, are dropped together with the duplicates, so
+that only distinct valid schedules reach the sweep.
+"""
+
+import numpy as np
+
+slope_tolerance = 1e-9
+# schedules equal up to this number of decimals are considered the same
+schedule_decimals = 9
+
+
+def get_max_slope(annealing_time_range):
+    return 1.0 / annealing_time_range[0]
+
+
+def __broadcast(anneal_times, parameters, starts):
+    # grids of shape (anneal times, parameters, starts), following the order of the nested loops of the sweeps
+    anneal = np.asarray(anneal_times, dtype=float)[:, None, None]
+    parameters = np.asarray(parameters, dtype=float)
+    start = np.asarray(starts, dtype=float)[None, None, :]
+
+    return anneal, parameters.reshape((1, -1, 1) + parameters.shape[1:]), start
+
+
+def __stack(points):
+    # (t, s) pairs of grids and scalars broadcast to a common shape, stacked into the (..., points, 2) family
+    grids = np.broadcast_arrays(*[value for point in points for value in point])
+
+    return np.stack(grids, axis=-1).reshape(grids[0].shape + (len(points), 2))
+
+
+def get_pause_schedules(anneal_times, pause_durations, starts):
+    anneal, pause, start = __broadcast(anneal_times, pause_durations, starts)
+
+    return __stack([(0.0, 0.0), (start * anneal, start), (start * anneal + pause, start), (anneal + pause, 1.0)])
+
+
+def get_quench_schedules(anneal_times, quench_slopes, starts):
+    anneal, quench, start = __broadcast(anneal_times, quench_slopes, starts)
+
+    return __stack([(0.0, 0.0), (start * anneal, start), ((1 - start + quench * start * anneal) / quench, 1.0)])
+
+
+def get_pause_quench_schedules(anneal_times, pause_durations, quench_slopes, starts, delta_s):
+    # the pauses and the quenches are taken in pairs, as many as the shorter of the two lists
+    num_pairs = min(len(pause_durations), len(quench_slopes))
+    pairs = np.stack([pause_durations[:num_pairs], quench_slopes[:num_pairs]], axis=-1)
+    anneal, pairs, start = __broadcast(anneal_times, pairs, starts)
+    pause, quench = pairs[..., 0], pairs[..., 1]
+    s0, s1 = start, start + delta_s
+    end_pause = s0 * anneal + pause
+
+    return __stack([(0.0, 0.0), (s0 * anneal, s0), (end_pause, s0), (end_pause + s0 * anneal, s1),
+                    ((1 - s1 + quench * (end_pause + s0 * anneal)) / quench, 1.0)])
+
+
+def validate_schedules(schedules, annealing_time_range, max_points):
+    # one flag for each schedule of the (..., points, 2) family
+    schedules = np.asarray(schedules, dtype=float)
+    t, s = schedules[..., 0], schedules[..., 1]
+    dt, ds = np.diff(t, axis=-1), np.diff(s, axis=-1)
+    num_points = schedules.shape[-2]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(dt > 0, ds / dt, np.inf)
+
+    valid = np.isclose(t[..., 0], 0.0) & np.isclose(s[..., 0], 0.0)
+    valid &= (dt > 0).all(axis=-1) & (ds >= 0).all(axis=-1)
+    valid &= np.isclose(s[..., -1], 1.0) & (t[..., -1] <= annealing_time_range[1])
+    valid &= (slopes <= get_max_slope(annealing_time_range) + slope_tolerance).all(axis=-1)
+
+    return valid & (2 <= num_points <= max_points)
+
+
+def select_schedules(schedules, annealing_time_range, max_points):
+    # the distinct valid schedules of the family as lists of [t, s] points, in the order of the family
+    schedules = np.asarray(schedules, dtype=float)
+    num_points = schedules.shape[-2]
+    schedules = schedules.reshape(-1, num_points, 2)
+    valid = validate_schedules(schedules, annealing_time_range, max_points)
+
+    keys = np.round(schedules[valid].reshape(-1, num_points * 2), schedule_decimals)
+    _, first = np.unique(keys, axis=0, return_index=True)
+    selected = schedules[valid][np.sort(first)]
+
+    print("Anneal schedules: {} generated, {} invalid, {} duplicated, {} selected".format(
+        len(schedules), len(schedules) - valid.sum(), valid.sum() - len(selected), len(selected)))
+
+    return selected.tolist()
@@ -0,0 +1,99 @@
+"""
+Adaptive allocation of the reads of a tuning sweep with successive halving. Sampling every configuration with the full
+number of reads spends most of the QPU time on configurations that are clearly bad after a few hundred reads, hence:
+    (i) all the configurations start with min_reads reads, sampled concurrently by the sweep executor
+    (ii) after each round the configurations are ranked by an upper confidence bound on their success probability, the
+         fraction of reads that are optimal tours when the optimum is known and otherwise the fraction of reads at the
+         lowest energy found by the sweep, ties broken by the minimum energy. Only the best 1 / eta of them survive
+    (iii) the survivors are sampled again with eta times the reads of the previous round, and their responses are merged
+          with the previous ones, until a single configuration is left or the survivors reached the reads of the full
+          sweep. The last survivors are then topped up to the full number of reads
+
+During the rounds a result is built only on the response of each job and the scores sum the statistics of the parts, so
+that the cost of a round does not grow with the reads already received. At the end every configuration gets a single
+result built on all its reads, so that the comparers write the same csv files of the full sweep, and the reads saved
+with respect to it are reported. Since the discarded configurations received fewer reads, only the ones that reached
+the full reads compete for the best one.
+"""
+
+import math
+
+import dimod
+import numpy as np
+
+from src.code.quantum_annealing.tuning.sweep_executor import run_sweep
+
+default_eta = 2
+default_min_reads = 100
+confidence_delta = 0.05
+energy_tolerance = 1e-9
+
+
+def __merge_responses(responses):
+    # the timings of the merged response are the sums of the ones of its parts, as if it was a single job
+    response = dimod.concatenate(responses)
+
+    timing = {}
+    for part in responses:
+        for key, value in part.info.get('timing', {}).items():
+            timing[key] = timing.get(key, 0) + value
+
+    info = dict(responses[-1].info)
+    info['timing'] = timing
+
+    return dimod.SampleSet(response.record, response.variables, info, response.vartype)
+
+
+def __get_score(parts, target_energy):
+    # the results of the parts are combined through their counts, without building a result on the merged response
+    num_reads = sum(part.occurrences.sum() for part in parts)
+    if parts[0].optimum is not None:
+        hits = sum(part.get_success_probability() * part.occurrences.sum() for part in parts)
+    else:
+        hits = sum(part.occurrences[part.energies <= target_energy + energy_tolerance].sum() for part in parts)
+    success = hits / num_reads
+
+    # Hoeffding upper confidence bound, the configurations with few reads are not discarded by chance
+    upper_bound = success + math.sqrt(math.log(1 / confidence_delta) / (2 * num_reads))
+
+    return upper_bound, -min(part.energies.min() for part in parts)
+
+
+def run_successive_halving(configs, submit, collect, full_reads, min_reads=default_min_reads, eta=default_eta):
+    # submit(config, num_reads) samples a configuration and collect(response) builds its result
+    responses = [[] for _ in configs]
+    parts = [[] for _ in configs]
+    reads = np.zeros(len(configs), dtype=int)
+
+    survivors = list(range(len(configs)))
+    round_reads = min(min_reads, full_reads)
+    while True:
+        sampled = run_sweep(survivors, lambda i: submit(configs[i], int(round_reads)),
+                            lambda response: (response, collect(response)))
+        for i, (response, part) in zip(survivors, sampled):
+            responses[i].append(response)
+            parts[i].append(part)
+            reads[i] += round_reads
+
+        remaining = full_reads - reads[survivors[0]]
+        if remaining <= 0:
+            break
+
+        if len(survivors) > 1:
+            target_energy = min(min(part.energies.min() for part in parts[i]) for i in survivors)
+            ranking = sorted(survivors, key=lambda i: __get_score(parts[i], target_energy), reverse=True)
+            survivors = sorted(ranking[:max(1, math.ceil(len(survivors) / eta))])
+
+        # the survivors get eta times more reads, the single one left is topped up to the full reads
+        round_reads = remaining if len(survivors) == 1 else min(round_reads * eta, remaining)
+
+    # a single result for each configuration on all its reads, the ones sampled once reuse the result of their job
+    results = [parts[i][0] if len(parts[i]) == 1 else collect(__merge_responses(responses[i]))
+               for i in range(len(configs))]
+
+    full_sweep_reads = full_reads * len(configs)
+    saved = full_sweep_reads - reads.sum()
+    print("Successive halving used {} reads instead of {}, {} reads saved ({:.1%})".format(
+        reads.sum(), full_sweep_reads, saved, saved / full_sweep_reads))
+
+    return results
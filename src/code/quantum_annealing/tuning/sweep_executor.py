@@ -0,0 +1,35 @@
+"""
+Concurrent execution of the sweeps of the tuning. Each point of a sweep is an independent sampling job, and most of its
+time is spent waiting for the round trip to the solver, hence instead of submitting a job and blocking on its response:
+    (i) all the configurations of the sweep are submitted up front as futures, a pool of max_in_flight threads bounds
+        the number of jobs that are waiting on the solver at the same time
+    (ii) responses are collected as soon as they complete and their Result is built while the other jobs are still
+         running
+    (iii) results are returned in the order of the configurations, so that the comparers and their csv files see the
+          sweep exactly as if it had been executed sequentially
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+max_in_flight = 8
+
+
+def __sample(submit, config):
+    # the response of a remote solver is a future itself, it is resolved inside the worker thread
+    response = submit(config)
+    if hasattr(response, 'resolve'):
+        response.resolve()
+
+    return response
+
+
+def run_sweep(configs, submit, collect, in_flight=max_in_flight):
+    # submit(config) samples a configuration and collect(response) builds its result
+    results = [None] * len(configs)
+
+    with ThreadPoolExecutor(max_workers=max(1, in_flight)) as executor:
+        futures = {executor.submit(__sample, submit, config): i for i, config in enumerate(configs)}
+        for future in as_completed(futures):
+            results[futures[future]] = collect(future.result())
+
+    return results
@@ -0,0 +1,137 @@
+"""
+Journal of the tuning sweeps, so that a sweep interrupted by a timeout, a quota hit or a crash can be resumed without
+sampling again the configurations that were already paid for. Each sweep is identified by its name and by the parameters
+it was launched with, and its journal is a directory holding:
+    (i) the list of the configurations of the sweep, written before the first job, so that the sweeps with random
+        configurations (the chain strength prefactors, the B and C of the normalization tuning and the dicts selected
+        by its prescreen) resume on the same ones
+    (ii) journal.jsonl, where a line is appended as soon as a job completes, with its configuration, the number of
+         reads, its metrics and the name of the file holding the raw sampleset
+    (iii) the samplesets, serialized as json
+
+A job already present in the journal is never submitted again: its sampleset is loaded from the disk and it is handed
+to the sweep as if it came from the solver, hence the results and the final ranking of a resumed sweep are computed
+from the journal. Deleting the directory of a journal restarts its sweep from scratch.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import dimod
+import numpy as np
+
+journal_path = '../resources/journal/'
+
+
+def __to_json(value):
+    return value.tolist() if hasattr(value, 'tolist') else str(value)
+
+
+def dumps(value):
+    return json.dumps(value, sort_keys=True, default=__to_json)
+
+
+def get_bqm_hash(bqm):
+    # the journals of the sweeps on different problems must never be mixed
+    linear, (rows, cols, quadratic), offset = bqm.to_numpy_vectors(variable_order=sorted(bqm.variables))
+    bqm_hash = hashlib.sha256()
+    for array in (linear, rows, cols, quadratic, np.array([offset])):
+        bqm_hash.update(np.ascontiguousarray(array).tobytes())
+
+    return bqm_hash.hexdigest()
+
+
+def get_metrics(response):
+    energies = response.record.energy
+    occurrences = response.record.num_occurrences
+
+    return {
+        'num_reads': int(occurrences.sum()),
+        'min_energy': float(energies.min()),
+        'mean_energy': float(np.average(energies, weights=occurrences)),
+        'qpu_access_time': response.info.get('timing', {}).get('qpu_access_time')
+    }
+
+
+class TuningJournal(object):
+    def __init__(self, name, params, path=journal_path):
+        key = hashlib.sha256(dumps(params).encode()).hexdigest()[:16]
+        self.path = os.path.join(path, name + '_' + key)
+        self.journal_file = os.path.join(self.path, 'journal.jsonl')
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.resumed = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'params.json'), 'w') as params_file:
+            params_file.write(dumps(params))
+
+        self.entries = {}
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file) as journal:
+                for line in journal:
+                    # a line truncated by a crash is the last one, the job is simply submitted again
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.entries[entry['key']] = entry
+
+    def get_configs(self, generate, name='configs'):
+        # the configurations are generated only the first time, a resumed sweep reads them back
+        file_path = os.path.join(self.path, name + '.json')
+        if os.path.exists(file_path):
+            with open(file_path) as configs_file:
+                return json.load(configs_file)
+
+        configs = generate()
+        with open(file_path, 'w') as configs_file:
+            configs_file.write(dumps(configs))
+
+        return json.loads(dumps(configs))
+
+    def __get_key(self, config, num_reads):
+        # the same configuration can be sampled more than once, for example in the rounds of the successive halving
+        config_key = dumps([config, num_reads])
+        with self.lock:
+            call = self.calls.get(config_key, 0)
+            self.calls[config_key] = call + 1
+
+        return hashlib.sha256(dumps([config_key, call]).encode()).hexdigest()
+
+    def __load(self, entry):
+        with open(os.path.join(self.path, entry['sampleset'])) as sampleset_file:
+            return dimod.SampleSet.from_serializable(json.load(sampleset_file))
+
+    def __store(self, key, config, num_reads, response):
+        sampleset = key + '.json'
+        with open(os.path.join(self.path, sampleset), 'w') as sampleset_file:
+            sampleset_file.write(dumps(response.to_serializable()))
+
+        entry = {'key': key, 'config': config, 'num_reads': num_reads, 'metrics': get_metrics(response),
+                 'sampleset': sampleset}
+        with self.lock:
+            self.entries[key] = entry
+            with open(self.journal_file, 'a') as journal:
+                journal.write(dumps(entry) + '\n')
+
+    def sample(self, config, num_reads, submit):
+        # submit() samples the configuration, it is called only when the job is not in the journal
+        key = self.__get_key(config, num_reads)
+        if key in self.entries:
+            with self.lock:
+                self.resumed += 1
+            return self.__load(self.entries[key])
+
+        response = submit()
+        if hasattr(response, 'resolve'):
+            response.resolve()
+        self.__store(key, config, num_reads, response)
+
+        return response
+
+    def report(self):
+        print("Tuning journal {}: {} jobs resumed, {} jobs in the journal".format(self.path, self.resumed,
+                                                                                 len(self.entries)))
@@ -29,8 +29,11 @@ def parse_experiments():
         exp_label = exp['label']
         sa_qpu_exps = exp['sa_qpu']
         num_nodes = int(exp['num_nodes'])
-        abc = exp['norm_factors']
-        norm_factors = {'A_Normalization': abc[0], 'B_Normalization': abc[1], 'C_Normalization': abc[2]}
+        # without norm_factors the normalization factors are calibrated on the instance
+        abc = exp.get('norm_factors')
+        norm_factors = None
+        if abc is not None:
+            norm_factors = {'A_Normalization': abc[0], 'B_Normalization': abc[1], 'C_Normalization': abc[2]}
 
         # parse sa experiment parameters and build sa_exp
         sa_exp = SingleExp(False, (sa_qpu_exps[0])['num_reads_SA'], (sa_qpu_exps[0])['chain_strength_SA'])
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from src.code.quantum_annealing.tuning.abc_calibration import calibrate_norm_dict
+
+
+def get_instance(n, seed):
+    rng = np.random.default_rng(seed)
+    D_matrix = rng.uniform(0, 1, (n, n))
+    np.fill_diagonal(D_matrix, 0)
+
+    return D_matrix, rng.uniform(0, 1, n)
+
+
+def test_calibration_satisfies_bounds():
+    D_matrix, Q_array = get_instance(7, 0)
+    norm_dict = calibrate_norm_dict(D_matrix, Q_array)
+
+    # 0 < C * max(Q_v - Q_u)^2 < A and 0 < B * max(W_uv) < C
+    max_charge = (Q_array.max() - Q_array.min()) ** 2
+    assert 0 < norm_dict['C_Normalization'] * max_charge < norm_dict['A_Normalization']
+    assert 0 < norm_dict['B_Normalization'] * D_matrix.max() < norm_dict['C_Normalization']
+
+
+def test_calibration_reads_solver_ranges():
+    # an instance where the h of the constraints do not dominate the scaling on every point of the grid
+    D_matrix, Q_array = get_instance(8, 3)
+    default = calibrate_norm_dict(D_matrix, Q_array)
+    same = calibrate_norm_dict(D_matrix, Q_array, properties={'h_range': [-4.0, 4.0], 'j_range': [-1.0, 1.0]})
+    wide = calibrate_norm_dict(D_matrix, Q_array, properties={'h_range': [-100.0, 100.0], 'j_range': [-1.0, 1.0]})
+
+    assert default == same
+    assert default != wide
+
+
+def test_calibration_rejects_small_a():
+    D_matrix, Q_array = get_instance(6, 0)
+
+    with pytest.raises(ValueError, match='too small'):
+        calibrate_norm_dict(D_matrix, Q_array, A=0.0)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from src.code.quantum_annealing.SA_model import SA_Model
+from src.code.quantum_annealing.dense_annealing import DenseAnnealer
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+
+norm_dict = {'A_Normalization': 1.0, 'B_Normalization': 0.05, 'C_Normalization': 0.1}
+
+
+def get_builder(n=5, fixed_start=None):
+    rng = np.random.default_rng(0)
+    D_matrix = rng.random((n, n))
+    np.fill_diagonal(D_matrix, 0.0)
+
+    return QuboBuilder(D_matrix, rng.random(n), fixed_start)
+
+
+@pytest.mark.parametrize('fixed_start', [None, 0])
+def test_dense_energies_match_bqm(fixed_start):
+    bqm = get_builder(fixed_start=fixed_start).get_bqm(norm_dict)
+    annealer = DenseAnnealer(bqm, seed=0)
+    X = np.random.default_rng(1).integers(0, 2, (20, len(annealer.variables)))
+
+    np.testing.assert_allclose(annealer.get_energies(X), bqm.energies((X, annealer.variables)))
+
+
+@pytest.mark.parametrize('sampler', ['dense', 'tempering'])
+def test_reported_energies_match_bqm(sampler):
+    builder = get_builder(fixed_start=0)
+    bqm = builder.get_bqm(norm_dict)
+    model = SA_Model(bqm, builder.get_encoding(), seed=0, sampler=sampler)
+
+    response = model.sample(8, None, 'test')
+    samples = (response.record.sample, list(response.variables))
+
+    assert response.record.num_occurrences.sum() == 8
+    np.testing.assert_allclose(response.record.energy, bqm.energies(samples))
+    np.testing.assert_allclose(response.record.energy, DenseAnnealer(bqm).get_energies(response.record.sample))
+
+
+def test_sweeps_track_energies_and_fields():
+    bqm = get_builder().get_bqm(norm_dict)
+    annealer = DenseAnnealer(bqm, seed=0)
+    X, F = annealer._DenseAnnealer__init_states(16)
+    energies = annealer.get_energies(X)
+
+    # the best reads are chosen on the energies updated by the sweeps, they never drift from the ones of the states
+    for beta in np.geomspace(*annealer.beta_range, 50):
+        energies += annealer._DenseAnnealer__sweep(X, F, beta)
+
+    np.testing.assert_allclose(energies, bqm.energies((X, annealer.variables)))
+    np.testing.assert_allclose(F, annealer.h + X @ annealer.J)
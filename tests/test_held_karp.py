@@ -0,0 +1,90 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from src.code.quantum_annealing.results import held_karp
+from src.code.quantum_annealing.results.held_karp import OptimumCache, solve_held_karp
+from src.code.quantum_annealing.tour_annealing import get_weights
+
+norm_dict = {'A_Normalization': 1.0, 'B_Normalization': 0.05, 'C_Normalization': 0.1}
+
+
+def get_instance(n, seed, sparse=False):
+    rng = np.random.default_rng(seed)
+    D_matrix = rng.random((n, n))
+    np.fill_diagonal(D_matrix, 0.0)
+    Q_array = rng.random(n)
+
+    # a random sparse graph that keeps the cycle 0, 1, ..., n - 1 so that it has at least a tour
+    adjacency = None
+    if sparse:
+        adjacency = rng.random((n, n)) < 0.5
+        nodes = np.arange(n)
+        adjacency[nodes, (nodes + 1) % n] = True
+        np.fill_diagonal(adjacency, False)
+
+    return D_matrix, Q_array, adjacency
+
+
+def get_tour_cost(tour, W, W_wrap):
+    return sum(W[u, v] for u, v in zip(tour[:-1], tour[1:])) + W_wrap[tour[-1], tour[0]]
+
+
+def solve_brute_force(D_matrix, Q_array, fixed_start, adjacency):
+    W, W_wrap = get_weights(D_matrix, Q_array, norm_dict)
+    if adjacency is not None:
+        W, W_wrap = np.where(adjacency, W, np.inf), np.where(adjacency, W_wrap, np.inf)
+
+    tours = itertools.permutations(range(len(D_matrix)))
+    if fixed_start is not None:
+        tours = (tour for tour in tours if tour[0] == fixed_start)
+
+    return min(get_tour_cost(tour, W, W_wrap) for tour in tours)
+
+
+@pytest.mark.parametrize('n', [4, 5, 6, 7])
+@pytest.mark.parametrize('fixed_start', [None, 2])
+@pytest.mark.parametrize('sparse', [False, True])
+def test_held_karp_matches_brute_force(n, fixed_start, sparse):
+    D_matrix, Q_array, adjacency = get_instance(n, n, sparse)
+    cost, tour = solve_held_karp(D_matrix, Q_array, norm_dict, fixed_start, adjacency)
+
+    W, W_wrap = get_weights(D_matrix, Q_array, norm_dict)
+    assert sorted(tour) == list(range(n))
+    assert cost == pytest.approx(solve_brute_force(D_matrix, Q_array, fixed_start, adjacency))
+    assert get_tour_cost(tour, W, W_wrap) == pytest.approx(cost)
+    if fixed_start is not None:
+        assert tour[0] == fixed_start
+    if sparse:
+        assert adjacency[tour, np.roll(tour, -1)].all()
+
+
+def test_optimum_cache_hit_and_miss(tmp_path, monkeypatch):
+    calls = []
+
+    def solve(*args):
+        calls.append(args)
+        return solve_held_karp(*args)
+
+    monkeypatch.setattr(held_karp, 'solve_held_karp', solve)
+    cache = OptimumCache(str(tmp_path))
+    D_matrix, Q_array, _ = get_instance(6, 0)
+
+    optimum = cache.get_optimum(D_matrix, Q_array, norm_dict)
+    assert len(calls) == 1 and len(list(tmp_path.iterdir())) == 1
+
+    # the same instance is read back from the disk, also by a new cache
+    assert OptimumCache(str(tmp_path)).get_optimum(D_matrix, Q_array, norm_dict) == optimum
+    assert len(calls) == 1
+
+    # a different normalization or fixed start is another instance
+    cache.get_optimum(D_matrix, Q_array, dict(norm_dict, B_Normalization=0.1))
+    cache.get_optimum(D_matrix, Q_array, norm_dict, fixed_start=0)
+    assert len(calls) == 3 and len(list(tmp_path.iterdir())) == 3
+
+
+def test_optimum_cache_skips_large_instances(tmp_path):
+    D_matrix, Q_array, _ = get_instance(held_karp.max_exact_nodes + 1, 0)
+
+    assert OptimumCache(str(tmp_path)).get_optimum(D_matrix, Q_array, norm_dict) is None
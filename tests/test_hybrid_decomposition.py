@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from src.code.quantum_annealing import Hybrid_model, hybrid_decomposition, samplers
+from src.code.quantum_annealing.Hybrid_model import Hybrid_Model
+from src.code.quantum_annealing.hybrid_decomposition import LocalHybridRunner
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+from src.code.quantum_annealing.results.result import Result
+
+norm_dict = {'A_Normalization': 1.0, 'B_Normalization': 0.05, 'C_Normalization': 0.1}
+
+
+def get_builder(n=5):
+    rng = np.random.default_rng(0)
+    D_matrix = rng.random((n, n))
+    np.fill_diagonal(D_matrix, 0.0)
+
+    return QuboBuilder(D_matrix, rng.random(n))
+
+
+@pytest.fixture
+def no_qpu(monkeypatch):
+    def get_qpu_sampler(client_conf):
+        raise AssertionError('the QPU sampler is built in local mode')
+
+    for module in [Hybrid_model, hybrid_decomposition, samplers]:
+        monkeypatch.setattr(module, 'get_qpu_sampler', get_qpu_sampler)
+    samplers.sampler_pool.clear()
+
+
+def assert_valid_tours(result, n):
+    assert result.valid.all()
+    assert (np.sort(result.tours, axis=1) == np.arange(n)).all()
+
+
+@pytest.mark.parametrize('decomposition', ['energy', 'segment'])
+def test_local_runner_returns_valid_tours(no_qpu, decomposition):
+    builder = get_builder()
+    bqm = builder.get_bqm(norm_dict)
+    runner = LocalHybridRunner(bqm, builder.get_encoding(), decomposition, max_subproblem_size=10, num_subproblems=2,
+                               subproblem_reads=20, num_workers=2, max_iter=5, convergence=2, init_reads=20, seed=0)
+
+    response = runner.sample(2, 'test')
+
+    assert len(response) == 2 and len(response.info['trace']) > 0
+    np.testing.assert_allclose(response.record.energy, bqm.energies((response.record.sample, response.variables)))
+    assert_valid_tours(Result(response, False, builder.get_encoding()), 5)
+    assert samplers.sampler_pool == {}
+
+
+def test_local_workflow_never_builds_the_qpu_sampler(no_qpu):
+    builder = get_builder()
+    client_conf = {'config_path': None, 'profile': 'local', 'latency': 0.0}
+    model = Hybrid_Model(builder.get_bqm(norm_dict), client_conf, builder.get_encoding())
+    model.set_parameters({'workflow': 'local', 'max_subproblem_size': 10, 'max_iter': 5, 'convergence': 2,
+                          'hybrid_num_reads': 1, 'num_workers': 2, 'qpu_params': {'label': 'test'}})
+
+    result = model.solve_hybrid(False)
+
+    assert_valid_tours(result, 5)
+    assert model.qpu_sampler is None
+    assert samplers.sampler_pool == {}
@@ -0,0 +1,47 @@
+import numpy as np
+
+from src.code.quantum_annealing.SA_model import SA_Model
+from src.code.quantum_annealing.parallel_sa import sample_parallel
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+
+norm_dict = {'A_Normalization': 1.0, 'B_Normalization': 0.05, 'C_Normalization': 0.1}
+
+
+def get_builder(n=5):
+    rng = np.random.default_rng(0)
+    D_matrix = rng.random((n, n))
+    np.fill_diagonal(D_matrix, 0.0)
+
+    return QuboBuilder(D_matrix, rng.random(n))
+
+
+def assert_same_samples(response, other):
+    assert list(response.variables) == list(other.variables)
+    np.testing.assert_array_equal(response.record.sample, other.record.sample)
+    np.testing.assert_array_equal(response.record.energy, other.record.energy)
+    np.testing.assert_array_equal(response.record.num_occurrences, other.record.num_occurrences)
+
+
+def test_same_seed_same_samples_for_any_number_of_workers():
+    bqm = get_builder().get_bqm(norm_dict)
+
+    single = sample_parallel(bqm, 50, 1, seed=7, num_sweeps=100)
+    pooled = sample_parallel(bqm, 50, 4, seed=7, num_sweeps=100)
+
+    assert len(single) == 50 and single.info['num_shards'] == pooled.info['num_shards']
+    assert_same_samples(single, pooled)
+    np.testing.assert_allclose(pooled.record.energy, bqm.energies((pooled.record.sample, pooled.variables)))
+
+    other = sample_parallel(bqm, 50, 1, seed=8, num_sweeps=100)
+    assert not np.array_equal(single.record.sample, other.record.sample)
+
+
+def test_sa_model_is_reproducible_across_workers():
+    builder = get_builder()
+    bqm = builder.get_bqm(norm_dict)
+    responses = []
+    for num_workers in [1, 3]:
+        model = SA_Model(bqm, builder.get_encoding(), num_workers=num_workers, seed=3)
+        responses.append(model.sample(20, None, 'test'))
+
+    assert_same_samples(*responses)
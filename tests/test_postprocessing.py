@@ -0,0 +1,39 @@
+import dimod
+import numpy as np
+import pytest
+
+from src.code.quantum_annealing.postprocessing import PostProcessor, get_costs
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+from src.code.quantum_annealing.results.result import Result
+
+norm_dict = {'A_Normalization': 1.0, 'B_Normalization': 0.05, 'C_Normalization': 0.1}
+
+
+@pytest.mark.parametrize('fixed_start', [None, 0])
+def test_repair_gives_permutations_without_increasing_cost(fixed_start):
+    n = 6
+    rng = np.random.default_rng(0)
+    D_matrix = rng.random((n, n))
+    np.fill_diagonal(D_matrix, 0.0)
+    Q_array = rng.random(n)
+    builder = QuboBuilder(D_matrix, Q_array, fixed_start)
+    bqm = builder.get_bqm(norm_dict)
+    variables = list(bqm.variables)
+
+    # a tour, the same tour with a node dropped from its position and with a node visited twice
+    tour = np.array([[0, 3, 1, 5, 2, 4]])
+    samples = np.repeat(builder.get_encoding().encode_tours(tour, variables), 3, axis=0)
+    samples[1, variables.index(3 * n + 1)] = 0
+    samples[2, variables.index(5 * n + 4)] = 1
+    response = dimod.SampleSet.from_samples_bqm((samples, variables), bqm)
+    result = Result(response, False, builder.get_encoding())
+    assert result.valid.sum() == 1
+
+    tours, costs, rescued_reads = PostProcessor(D_matrix, Q_array, norm_dict).process(result)
+
+    assert (np.sort(tours, axis=1) == np.arange(n)).all()
+    if fixed_start is not None:
+        assert (tours[:, 0] == fixed_start).all()
+    assert rescued_reads == 2
+    assert (costs <= get_costs(tour, D_matrix, Q_array, norm_dict)[0] + 1e-12).all()
+    np.testing.assert_allclose(costs, get_costs(tours, D_matrix, Q_array, norm_dict))
@@ -0,0 +1,100 @@
+"""
+Parity of the vectorized QuboBuilder with the pyqubo HamiltonianBuilder compiled by the ModelBuilder. The reference
+energy of a sample is the one of the complete pyqubo QUBO, for the symmetry reduction on the sample lifted with the
+fixed variables and for the pruned edges corrected by the couplings of the missing edges, which are penalized by H_a3
+instead of being weighted as durations and charges.
+"""
+
+import numpy as np
+import pytest
+
+from src.code.quantum_annealing.hamiltonian_builder import HamiltonianBuilder
+from src.code.quantum_annealing.model_builder import ModelBuilder
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+
+norm_dict = {'A_Normalization': 1.0, 'B_Normalization': 0.3, 'C_Normalization': 0.5}
+num_samples = 200
+
+
+def get_instance(n, rng):
+    D_matrix = rng.uniform(1, 10, (n, n))
+    np.fill_diagonal(D_matrix, 0)
+    Q_array = rng.uniform(0, 1, n)
+
+    # a symmetric adjacency with a few missing edges, every node keeps at least two neighbours
+    adjacency = rng.uniform(size=(n, n)) > 0.25
+    adjacency = adjacency & adjacency.T
+    for v in range(n):
+        adjacency[v, (v + 1) % n] = adjacency[(v + 1) % n, v] = True
+    np.fill_diagonal(adjacency, True)
+
+    return D_matrix, Q_array, adjacency
+
+
+def get_samples(n, rng):
+    # random bit strings and random tours, so that both the constraints and the objective are exercised
+    bits = rng.integers(0, 2, (num_samples, n * n))
+    tours = np.zeros((num_samples, n, n), dtype=int)
+    for r in range(num_samples):
+        tours[r, rng.permutation(n), np.arange(n)] = 1
+
+    return np.concatenate([bits, tours.reshape(num_samples, -1)])
+
+
+def get_missing_energy(samples, D_matrix, Q_array, adjacency, n_penalty):
+    # contribution of the couplings x[u][j] x[v][j + 1] of the missing edges, as weighted by pyqubo and as penalized
+    n = D_matrix.shape[0]
+    grid = samples.reshape(len(samples), n, n)
+    weighted = np.zeros(len(samples))
+    penalized = np.zeros(len(samples))
+    for u in range(n):
+        for v in range(n):
+            if u == v or adjacency[u, v]:
+                continue
+            for j in range(n):
+                couple = grid[:, u, j] * grid[:, v, (j + 1) % n]
+                weighted += norm_dict['B_Normalization'] * D_matrix[u, v] * couple
+                if j < n - 1:
+                    weighted += norm_dict['C_Normalization'] * (Q_array[v] - Q_array[u]) ** 2 * couple
+                penalized += norm_dict['A_Normalization'] * n_penalty * couple
+
+    return penalized - weighted
+
+
+@pytest.mark.parametrize('n', [4, 5, 6])
+@pytest.mark.parametrize('fixed_start', [None, 0, 2])
+@pytest.mark.parametrize('pruned', [False, True])
+def test_energies_match_pyqubo(n, fixed_start, pruned):
+    rng = np.random.default_rng(100 * n + 10 * (fixed_start or 0) + pruned)
+    D_matrix, Q_array, adjacency = get_instance(n, rng)
+    adjacency = adjacency if pruned else None
+
+    builder = QuboBuilder(D_matrix, Q_array, fixed_start, adjacency)
+    bqm = builder.get_bqm(norm_dict)
+    reference = ModelBuilder(HamiltonianBuilder(D_matrix, Q_array).get_hamiltonian(norm_dict)).BQM
+
+    # the samples are lifted with the variables fixed by the symmetry reduction
+    samples = get_samples(n, rng)
+    samples = np.where(builder.fixed >= 0, builder.fixed, samples)
+    free = [int(v) for v in bqm.variables]
+
+    energies = bqm.energies((samples[:, free], free))
+    expected = reference.energies((samples, list(range(n * n))))
+    if pruned:
+        expected += get_missing_energy(samples, D_matrix, Q_array, adjacency, builder.non_edge_penalty)
+
+    np.testing.assert_allclose(energies, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_components_match_bqm():
+    rng = np.random.default_rng(0)
+    D_matrix, Q_array, adjacency = get_instance(6, rng)
+    builder = QuboBuilder(D_matrix, Q_array, 1, adjacency)
+
+    # reweighing the components gives the same BQM built in one shot
+    bqm = builder.get_bqm(norm_dict)
+    weighted = QuboBuilder.weigh_components(builder.get_components(), norm_dict)
+    samples = rng.integers(0, 2, (num_samples, bqm.num_variables))
+    variables = list(bqm.variables)
+
+    np.testing.assert_allclose(weighted.energies((samples, variables)), bqm.energies((samples, variables)))
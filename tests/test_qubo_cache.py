@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+from src.code.quantum_annealing.qubo_cache import QuboCache
+
+norm_dict = {'A_Normalization': 1.0, 'B_Normalization': 0.05, 'C_Normalization': 0.1}
+
+
+def get_instance(n, seed):
+    rng = np.random.default_rng(seed)
+    D_matrix = rng.random((n, n))
+    np.fill_diagonal(D_matrix, 0.0)
+
+    return D_matrix, rng.random(n)
+
+
+def test_npz_round_trip(tmp_path):
+    D_matrix, Q_array = get_instance(5, 0)
+    options = {'fixed_start': 0}
+    bqm = QuboBuilder(D_matrix, Q_array, fixed_start=0).get_bqm(norm_dict)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return bqm
+
+    assert QuboCache(str(tmp_path)).get_bqm(D_matrix, Q_array, norm_dict, build, options) is bqm
+
+    # a new cache, as in a new execution, loads the same BQM with its offset and labels without building it
+    cache = QuboCache(str(tmp_path))
+    loaded = cache.get_bqm(D_matrix, Q_array, norm_dict, build, options)
+    assert len(builds) == 1 and cache.hits == 1
+    assert loaded == bqm and loaded.offset == bqm.offset
+    assert list(loaded.variables) == list(bqm.variables)
+    assert cache.total_stats == {'hits': 1, 'misses': 1}
+
+
+def test_lru_eviction(tmp_path):
+    bqms = {seed: QuboBuilder(*get_instance(5, seed)).get_bqm(norm_dict) for seed in range(3)}
+    cache = QuboCache(str(tmp_path / 'cache'))
+    for seed in range(2):
+        cache.store(str(seed), bqms[seed])
+        os.utime(tmp_path / 'cache' / (str(seed) + '.npz'), (1000 + seed, 1000 + seed))
+
+    sizes = QuboCache(str(tmp_path / 'sizes'))
+    sizes.store('2', bqms[2])
+    size = sum(os.path.getsize(tmp_path / path / (key + '.npz')) for path, key in [('cache', '0'), ('cache', '1'),
+                                                                                   ('sizes', '2')])
+
+    # the hit on 0 makes 1 the least recently used one, the first to be evicted when 2 does not fit
+    assert cache.load('0') is not None
+    cache.max_size = size - 1
+    cache.store('2', bqms[2])
+
+    assert cache.load('1') is None
+    assert cache.load('0') == bqms[0]
+    assert cache.load('2') == bqms[2]
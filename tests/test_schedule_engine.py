@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.code.quantum_annealing.tuning.schedule_engine import get_pause_schedules, select_schedules, \
+    validate_schedules
+
+annealing_time_range = [0.5, 2000.0]
+max_points = 12
+
+
+def validate(schedule):
+    return bool(validate_schedules([schedule], annealing_time_range, max_points)[0])
+
+
+def test_valid_schedule():
+    assert validate([[0.0, 0.0], [10.0, 0.4], [20.0, 0.4], [30.0, 1.0]])
+
+
+def test_slope_check():
+    # the maximum slope is 1 / 0.5 = 2 per μs
+    assert validate([[0.0, 0.0], [0.5, 1.0]])
+    assert not validate([[0.0, 0.0], [0.4, 1.0]])
+    assert not validate([[0.0, 0.0], [10.0, 0.4], [10.2, 1.0]])
+
+
+def test_monotonicity_checks():
+    # t strictly increasing, s not decreasing
+    assert validate([[0.0, 0.0], [10.0, 0.4], [20.0, 0.4], [30.0, 1.0]])
+    assert not validate([[0.0, 0.0], [10.0, 0.4], [10.0, 0.5], [30.0, 1.0]])
+    assert not validate([[0.0, 0.0], [10.0, 0.5], [20.0, 0.4], [30.0, 1.0]])
+
+
+def test_endpoints_and_max_time_checks():
+    assert not validate([[1.0, 0.0], [30.0, 1.0]])
+    assert not validate([[0.0, 0.0], [30.0, 0.9]])
+    assert validate([[0.0, 0.0], [2000.0, 1.0]])
+    assert not validate([[0.0, 0.0], [2000.5, 1.0]])
+
+
+def test_max_points_check():
+    t = np.linspace(0.0, 100.0, max_points + 1)
+    schedule = np.stack([t, t / 100.0], axis=-1)
+
+    assert not validate(schedule)
+    assert validate(schedule[::2])
+
+
+def test_select_drops_invalid_and_duplicated_schedules():
+    # the same pause duration twice gives identical schedules, the longest pause exceeds the maximum time
+    family = get_pause_schedules([10.0, 20.0], [5.0, 5.0, 1995.0], [0.3])
+
+    selected = select_schedules(family, annealing_time_range, max_points)
+
+    np.testing.assert_allclose(selected, [[[0.0, 0.0], [3.0, 0.3], [8.0, 0.3], [15.0, 1.0]],
+                                          [[0.0, 0.0], [6.0, 0.3], [11.0, 0.3], [25.0, 1.0]]])
@@ -0,0 +1,28 @@
+import dwave_networkx as dnx
+import pytest
+
+from src.code.quantum_annealing.encoding import VariableEncoding
+from src.code.quantum_annealing.structured_embedding import EmbeddingLibrary, get_topology_graph
+
+
+class ZephyrSampler(object):
+    # stand-in of a solver exposing only what the library reads, on a topology without structured embeddings
+    def __init__(self):
+        graph = dnx.zephyr_graph(2)
+        self.nodelist = sorted(graph.nodes)
+        self.edgelist = sorted(tuple(sorted(edge)) for edge in graph.edges)
+        self.properties = {'topology': {'type': 'zephyr', 'shape': [2, 4]}}
+
+
+def test_unsupported_topology_has_no_graph():
+    assert get_topology_graph('zephyr', [2, 4]) is None
+
+
+def test_unsupported_topology_falls_back(tmp_path):
+    # without a structured embedding the embedding store searches one with minorminer
+    assert EmbeddingLibrary(path=str(tmp_path)).get_embedding(VariableEncoding(4), ZephyrSampler()) is None
+
+
+def test_unsupported_topology_cannot_be_generated(tmp_path):
+    with pytest.raises(Exception):
+        EmbeddingLibrary(path=str(tmp_path)).generate('zephyr', 2)
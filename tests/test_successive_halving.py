@@ -0,0 +1,65 @@
+import threading
+
+import dimod
+import numpy as np
+
+from src.code.quantum_annealing.tuning.successive_halving import run_successive_halving
+
+
+class StubResult(object):
+    optimum = None
+
+    def __init__(self, response):
+        self.energies = response.record.energy
+        self.occurrences = response.record.num_occurrences
+
+
+class StubSampler(object):
+    # the configuration c reads the lowest energy 0 with probability 1 / (c + 2), hence 0 is the best one
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = []
+
+    def submit(self, config, num_reads):
+        with self.lock:
+            seed = [config, sum(job[0] == config for job in self.jobs)]
+            self.jobs.append((config, num_reads))
+
+        energies = np.random.default_rng(seed).integers(0, config + 2, num_reads)
+
+        return dimod.SampleSet.from_samples(np.zeros((num_reads, 1), dtype=np.int8), 'BINARY', energies)
+
+
+def test_rungs_budget_and_saved_reads(capsys):
+    sampler = StubSampler()
+    configs = list(range(8))
+
+    results = run_successive_halving(configs, sampler.submit, StubResult, full_reads=800, min_reads=100, eta=2)
+
+    # 8 configurations with 100 reads, 4 with 200 more, 2 with 400 more and the last one topped up to 800
+    rungs, start = [], 0
+    for size in [8, 4, 2, 1]:
+        rungs.append(sampler.jobs[start:start + size])
+        start += size
+    assert start == len(sampler.jobs)
+    assert [sorted(set(num_reads for _, num_reads in rung)) for rung in rungs] == [[100], [200], [400], [100]]
+    assert [len(set(config for config, _ in rung)) for rung in rungs] == [8, 4, 2, 1]
+    for previous, rung in zip(rungs[:-1], rungs[1:]):
+        assert set(config for config, _ in rung) <= set(config for config, _ in previous)
+    assert rungs[-1][0][0] == 0
+
+    # every configuration keeps a result on all the reads it received
+    reads = [sum(num_reads for config, num_reads in sampler.jobs if config == i) for i in configs]
+    assert [result.occurrences.sum() for result in results] == reads
+    assert max(reads) == 800 and sum(reads) == 2500
+
+    assert 'used 2500 reads instead of 6400, 3900 reads saved' in capsys.readouterr().out
+
+
+def test_single_configuration_gets_full_reads():
+    sampler = StubSampler()
+
+    results = run_successive_halving([0], sampler.submit, StubResult, full_reads=300, min_reads=100)
+
+    assert sampler.jobs == [(0, 100), (0, 200)]
+    assert results[0].occurrences.sum() == 300
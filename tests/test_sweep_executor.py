@@ -0,0 +1,44 @@
+import threading
+
+import dimod
+
+from src.code.quantum_annealing.local_sampler import LocalQPUSampler
+from src.code.quantum_annealing.samplers import get_qpu_sampler
+from src.code.quantum_annealing.tuning.sweep_executor import run_sweep
+
+
+def test_latency_from_client_conf():
+    client_conf = {'config_path': 'test_sweep_executor', 'profile': 'local', 'latency': 0.02}
+
+    assert get_qpu_sampler(client_conf).latency == 0.02
+
+
+def test_sweep_bounds_pending_jobs_and_keeps_order():
+    # the first configurations have the longest latency, hence they complete after the last ones
+    num_configs, in_flight = 9, 3
+    samplers = [LocalQPUSampler(topology='chimera', size=2, latency=0.01 * (num_configs - i), seed=i)
+                for i in range(num_configs)]
+    bqm = dimod.BinaryQuadraticModel({samplers[0].nodelist[0]: 1.0}, {}, 0.0, 'BINARY')
+
+    lock = threading.Lock()
+    pending = [0]
+    max_pending = [0]
+    completed = []
+
+    def submit(i):
+        with lock:
+            pending[0] += 1
+            max_pending[0] = max(max_pending[0], pending[0])
+        response = samplers[i].sample(bqm, num_reads=1, label=i)
+        with lock:
+            pending[0] -= 1
+            completed.append(i)
+
+        return response
+
+    results = run_sweep(list(range(num_configs)), submit, lambda response: response.info['problem_label'],
+                        in_flight=in_flight)
+
+    assert max_pending[0] == in_flight
+    assert completed != sorted(completed)
+    assert results == list(range(num_configs))
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.code.quantum_annealing.qubo_builder import QuboBuilder
+from src.code.quantum_annealing.tour_annealing import TourAnnealer
+
+norm_dict = {'A_Normalization': 1.0, 'B_Normalization': 0.05, 'C_Normalization': 0.1}
+
+
+def get_instance(n, seed):
+    # a random sparse graph that keeps the cycle 0, 1, ..., n - 1 so that it has at least a tour
+    rng = np.random.default_rng(seed)
+    D_matrix = rng.random((n, n))
+    np.fill_diagonal(D_matrix, 0.0)
+    Q_array = rng.random(n)
+
+    adjacency = rng.random((n, n)) < 0.5
+    nodes = np.arange(n)
+    adjacency[nodes, (nodes + 1) % n] = True
+    np.fill_diagonal(adjacency, False)
+
+    return D_matrix, Q_array, adjacency
+
+
+@pytest.mark.parametrize('fixed_start', [None, 0])
+def test_costs_match_bqm_with_adjacency(fixed_start):
+    n = 6
+    D_matrix, Q_array, adjacency = get_instance(n, 0)
+    builder = QuboBuilder(D_matrix, Q_array, fixed_start, adjacency)
+    bqm = builder.get_bqm(norm_dict)
+    annealer = TourAnnealer(D_matrix, Q_array, norm_dict, fixed_start, adjacency)
+
+    rng = np.random.default_rng(1)
+    tours = np.array([rng.permutation(n) for _ in range(50)])
+    if fixed_start is not None:
+        tours = np.array([np.roll(tour, -int(np.flatnonzero(tour == fixed_start)[0])) for tour in tours])
+        # the reduced QUBO has no variables for the missing edges of the depot, only the other tours can be encoded
+        tours = tours[adjacency[fixed_start, tours[:, 1]] & adjacency[tours[:, -1], fixed_start]]
+
+    variables = list(bqm.variables)
+    samples = builder.get_encoding().encode_tours(tours, variables)
+    energies = [bqm.energy(dict(zip(variables, sample))) for sample in samples]
+
+    # on a permutation H_A is -2 n, the rest of the energy is the cost of the tour
+    np.testing.assert_allclose(annealer.get_costs(tours), np.array(energies) + 2 * n * norm_dict['A_Normalization'])
+
+
+def test_anneal_avoids_missing_edges():
+    n = 8
+    D_matrix, Q_array, adjacency = get_instance(n, 2)
+    annealer = TourAnnealer(D_matrix, Q_array, norm_dict, adjacency=adjacency, num_sweeps=50, seed=3)
+
+    tours, _ = annealer.anneal(20)
+
+    assert adjacency[tours, np.roll(tours, -1, axis=1)].all()
@@ -0,0 +1,50 @@
+import dimod
+import numpy as np
+
+from src.code.quantum_annealing.tuning.tuning_journal import TuningJournal
+
+params = {'bqm': 'hash', 'num_reads': 10}
+
+
+def run_sweep(journal, configs, submitted):
+    def submit(config):
+        submitted.append(config)
+        energies = np.arange(10) + config
+        return dimod.SampleSet.from_samples(np.zeros((10, 1), dtype=np.int8), 'BINARY', energies,
+                                            info={'timing': {'qpu_access_time': 100.0}})
+
+    # the same configuration twice, as in the rounds of the successive halving
+    return [journal.sample(config, 10, lambda config=config: submit(config)) for config in configs + configs[:1]]
+
+
+def test_resumed_sweep_never_submits(tmp_path):
+    first, second = [], []
+    responses = run_sweep(TuningJournal('sweep', params, str(tmp_path)), [1.0, 2.0, 3.0], first)
+
+    journal = TuningJournal('sweep', params, str(tmp_path))
+    resumed = run_sweep(journal, [1.0, 2.0, 3.0], second)
+
+    assert first == [1.0, 2.0, 3.0, 1.0]
+    assert second == []
+    assert journal.resumed == 4
+    for response, resumed_response in zip(responses, resumed):
+        np.testing.assert_array_equal(response.record.energy, resumed_response.record.energy)
+
+
+def test_changed_params_start_a_new_journal(tmp_path):
+    run_sweep(TuningJournal('sweep', params, str(tmp_path)), [1.0], [])
+
+    submitted = []
+    journal = TuningJournal('sweep', dict(params, num_reads=20), str(tmp_path))
+    run_sweep(journal, [1.0], submitted)
+
+    assert submitted == [1.0, 1.0]
+    assert journal.resumed == 0
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_configs_are_generated_once(tmp_path):
+    configs = TuningJournal('sweep', params, str(tmp_path)).get_configs(lambda: list(np.random.random(3)))
+    resumed = TuningJournal('sweep', params, str(tmp_path)).get_configs(lambda: list(np.random.random(3)))
+
+    assert resumed == configs